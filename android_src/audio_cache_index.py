@@ -0,0 +1,147 @@
+"""Persistent index of the local audio cache.
+
+``pymusic_audio_cache`` holds ``<md5 key>.<ext>`` files.  Finding the file for
+a track used to mean listing the whole directory; this index maps each key to
+``{path, size, codec, expected_length}`` so a lookup is one dict access plus
+one ``stat`` of the candidate file.  Recency is not kept here: the LRU order
+is the file mtime, which ``media_cache.touch`` bumps on every reuse.
+
+* :func:`record` is called when a download completes and rewrites the index
+  atomically (tmp file + ``os.replace``);
+* :func:`lookup` never writes on a hit; it only drops (and saves) entries
+  whose file vanished or changed size;
+* the index is rebuilt from the directory only when its file is missing,
+  unreadable or belongs to another cache directory.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any
+
+AUDIO_CACHE_INDEX_PATH = "audio_cache_index.json"
+
+_LOCK = threading.RLock()
+_DIR: str | None = None
+_ENTRIES: dict[str, dict[str, Any]] = {}
+
+
+def _key_of(name: str) -> str:
+    return os.path.basename(name).split(".", 1)[0]
+
+
+def _save_locked() -> None:
+    tmp_path = f"{AUDIO_CACHE_INDEX_PATH}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dir": _DIR, "entries": _ENTRIES}, f, ensure_ascii=False)
+        os.replace(tmp_path, AUDIO_CACHE_INDEX_PATH)
+    except Exception as exc:
+        print("[AUDIO-INDEX] save failed:", exc)
+
+
+def _rebuild_locked(cache_dir: str) -> None:
+    entries: dict[str, dict[str, Any]] = {}
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if not entry.is_file() or entry.name.endswith((".part", ".meta", ".tmp", ".json")):
+                    continue
+                st = entry.stat()
+                if st.st_size <= 0:
+                    continue
+                entries[_key_of(entry.name)] = {
+                    "path": entry.path,
+                    "size": st.st_size,
+                    "codec": os.path.splitext(entry.name)[1].lstrip("."),
+                    "expected_length": st.st_size,
+                }
+    except FileNotFoundError:
+        pass
+    _ENTRIES.clear()
+    _ENTRIES.update(entries)
+    _save_locked()
+    print(f"[AUDIO-INDEX] rebuilt from {cache_dir}: {len(entries)} files")
+
+
+def _load_locked(cache_dir: str) -> dict[str, dict[str, Any]]:
+    global _DIR
+    if _DIR == cache_dir:
+        return _ENTRIES
+    _DIR = cache_dir
+    data = None
+    if os.path.exists(AUDIO_CACHE_INDEX_PATH):
+        try:
+            with open(AUDIO_CACHE_INDEX_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as exc:
+            print("[AUDIO-INDEX] index unreadable, rebuilding:", exc)
+    if (
+        isinstance(data, dict)
+        and data.get("dir") == cache_dir
+        and isinstance(data.get("entries"), dict)
+    ):
+        _ENTRIES.clear()
+        _ENTRIES.update(
+            {str(k): v for k, v in data["entries"].items() if isinstance(v, dict) and v.get("path")}
+        )
+    else:
+        _rebuild_locked(cache_dir)
+    return _ENTRIES
+
+
+def lookup(cache_dir: str, key: str) -> dict[str, Any] | None:
+    """Entry for *key* if its file is still there and complete."""
+    if not key:
+        return None
+    with _LOCK:
+        entries = _load_locked(cache_dir)
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        try:
+            size = os.path.getsize(entry["path"])
+        except OSError:
+            size = -1
+        if size <= 0 or size != entry.get("size"):
+            entries.pop(key, None)
+            _save_locked()
+            return None
+        return dict(entry)
+
+
+def record(
+    cache_dir: str,
+    key: str,
+    path: str,
+    *,
+    codec: str = "",
+    expected_length: int | None = None,
+) -> None:
+    """Index a completed download."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    with _LOCK:
+        entries = _load_locked(cache_dir)
+        entries[key] = {
+            "path": path,
+            "size": size,
+            "codec": codec or os.path.splitext(path)[1].lstrip("."),
+            "expected_length": int(expected_length or size),
+        }
+        _save_locked()
+
+
+def forget_path(path: str) -> None:
+    """Drop the entry for a deleted file (eviction, broken stream)."""
+    if not path:
+        return
+    with _LOCK:
+        key = _key_of(path)
+        entry = _ENTRIES.get(key)
+        if entry is not None and entry.get("path") == path:
+            _ENTRIES.pop(key, None)
+            _save_locked()
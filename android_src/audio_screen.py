@@ -19,14 +19,19 @@ import time
 import os
 import re
 import hashlib
-import urllib.request
 import urllib.parse
 import tempfile
-import ssl
 
+import audio_cache_index
+import format_select
+import http_transport
+import local_index
 import media_android as ma
+import media_cache
+import queue_resolver
 import ytdlp_helpers as ydlh
 from headset_listener import headset_router
+from stream_cache import StreamUrlCache, register_revalidator
 from recent_utils import (
     load_recent,
     save_recent,
@@ -37,12 +42,29 @@ from recent_utils import (
     remove_favorite,
     update_favorite_cache,
     load_favorites,
+    get_recent,
+    get_favorite,
 )
 
 # новий імпорт замість локального класу
 from video_player import AndroidVideoPlayer
 
 
+def _revalidate_audio_stream(video_url: str) -> dict:
+    """Свіжий аудіо-URL для персистентного кешу, коли старий скоро протухне."""
+    ydlh.invalidate_video_bundle(video_url)
+    info = ydlh.extract_audio_info(video_url)
+    return {
+        "audio_url": info.get("audio_url") or "",
+        "headers": dict(info.get("http_headers") or {}),
+        "expire_ts": info.get("expire_ts"),
+        "ts_put": time.time(),
+    }
+
+
+register_revalidator("audio", _revalidate_audio_stream)
+
+
 # ==================== STABLE LOCAL THUMBNAIL WIDGET ====================
 
 class ThumbImage(Widget):
@@ -353,6 +375,15 @@ class AudioPlayerScreen(Screen):
     _ms_pause = None
     _ms_repeat = None
 
+    # Спроби докачати файл у кеш (Range з місця обриву) і скільки разів за
+    # одне завантаження можна переотримати протухлий URL через екстрактор.
+    CACHE_DOWNLOAD_ATTEMPTS = 3
+    CACHE_RERESOLVE_ATTEMPTS = 1
+    # Пауза перед повтором після помилки транспорту (подвоюється з кожною спробою).
+    CACHE_RETRY_BACKOFF_SEC = 1.0
+    # Перевірка першого range після -1004: чи сервер справді відхилив URL.
+    STREAM_PROBE_TIMEOUT_SEC = 5
+
     def __init__(self, **kw):
         super().__init__(**kw)
         # Ensure media callbacks are always callable (QS/headset/notification).
@@ -367,6 +398,9 @@ class AudioPlayerScreen(Screen):
         self._user_paused = False
         self._update_ev = None
         self._refresh_ev = None
+        # Свіжий URL поточного треку, отриманий до протухання старого; підміняється
+        # лише на seek / помилці мережі / вичерпаному буфері (_swap_to_fresh_stream).
+        self._fresh_stream = None
 
         self._title = ""
         self._channel = ""
@@ -379,8 +413,8 @@ class AudioPlayerScreen(Screen):
         self._media_session = None
         self._art_path = None
 
-        self._url_cache = {}
-        self._URL_CACHE_MAX = 50
+        # персистентний кеш прямих URL (переживає рестарт процесу)
+        self._url_cache = StreamUrlCache("audio")
 
         # тепер повноцінний обʼєкт замість "сирого" списку + індекс
         self.playlist = Playlist()
@@ -450,6 +484,7 @@ class AudioPlayerScreen(Screen):
         self._similar_render_gen = 0
         self._playlist_collapsed = False
         self._similar_collapsed = False
+        media_cache.set_pin_provider(self._cache_pin_keys)
 
     # ==================== lifecycle ====================
 
@@ -795,6 +830,9 @@ class AudioPlayerScreen(Screen):
         except Exception:
             pos = 0
         target = max(0, int(pos + (delta_sec * 1000)))
+        if self._swap_to_fresh_stream(target, "seek"):
+            self._set_video_controls_visible(True)
+            return
         try:
             ma._mp_seek_to(target)
             self._resume_pos_ms = target
@@ -1085,20 +1123,13 @@ class AudioPlayerScreen(Screen):
                 )
         except Exception:
             pass
-        try:
-            candidates.extend(
-                r for r in load_recent()
-                if isinstance(r, dict) and r.get("url") == video_url
-            )
-        except Exception:
-            pass
-        try:
-            candidates.extend(
-                f for f in load_favorites()
-                if isinstance(f, dict) and f.get("url") == video_url
-            )
-        except Exception:
-            pass
+        for lookup in (get_recent, get_favorite):
+            try:
+                item = lookup(video_url)
+                if isinstance(item, dict) and item.get("url") == video_url:
+                    candidates.append(item)
+            except Exception:
+                pass
 
         for item in candidates:
             title = str(item.get("title") or "").strip()
@@ -1345,6 +1376,9 @@ class AudioPlayerScreen(Screen):
             pass
         if playlist_url:
             self._playlist_url = playlist_url
+        if self._last_video_url and not start_playback:
+            # Черга змінилась під поточним треком - оновлюємо вікно префетчу.
+            self._prefetch_next_track_audio()
         try:
             if self._last_video_url and self._hydrate_metadata_from_known_sources(self._last_video_url):
                 self._publish_media_metadata_now()
@@ -1376,19 +1410,18 @@ class AudioPlayerScreen(Screen):
                     art_path = self._art_cache_path(self._last_video_url)
                 if not art_path:
                     art_path = os.path.join(tempfile.gettempdir(), "pymusic_art.jpg")
-                req = urllib.request.Request(
+                http_transport.download(
                     url,
+                    art_path,
                     headers={
                         "User-Agent": "Mozilla/5.0 (Linux; Android 12; Mobile) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36",
                         "Referer": "https://www.youtube.com",
                         "Accept-Language": "en-US,en;q=0.9",
-                        "Connection": "keep-alive",
                     },
+                    timeout=12,
                 )
-                ctx = ssl._create_unverified_context()
-                with urllib.request.urlopen(req, timeout=12, context=ctx) as resp, open(art_path, "wb") as f:
-                    f.write(resp.read())
                 self._art_path = art_path
+                media_cache.note_added("art")
                 if self._last_video_url:
                     update_recent_art(self._last_video_url, art_path)
                 try:
@@ -1425,19 +1458,17 @@ class AudioPlayerScreen(Screen):
         def _job():
             try:
                 path = self._channel_avatar_cache_path(url)
-                req = urllib.request.Request(
+                http_transport.download(
                     url,
+                    path,
                     headers={
                         "User-Agent": "Mozilla/5.0 (Linux; Android 12; Mobile) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36",
                         "Referer": "https://www.youtube.com",
                         "Accept-Language": "en-US,en;q=0.9",
                         "Accept": "image/jpeg,image/png,image/*;q=0.9,*/*;q=0.8",
-                        "Connection": "keep-alive",
                     },
+                    timeout=10,
                 )
-                ctx = ssl._create_unverified_context()
-                with urllib.request.urlopen(req, timeout=10, context=ctx) as resp, open(path, "wb") as f:
-                    f.write(resp.read())
                 if os.path.exists(path) and os.path.getsize(path) > 0:
                     self._channel_thumb_local = path
                     try:
@@ -1453,6 +1484,16 @@ class AudioPlayerScreen(Screen):
 
         threading.Thread(target=_job, daemon=True).start()
 
+    def _resolve_channel_avatar_async(self, channel_url: str, gen: int):
+        def _job():
+            cthumb = ydlh.channel_thumb_for(channel_url)
+            if not cthumb or not self._is_current_gen(gen) or self._channel_thumb:
+                return
+            self._channel_thumb = cthumb
+            self._download_channel_avatar_async(cthumb)
+
+        threading.Thread(target=_job, daemon=True).start()
+
     def _playlist_thumb_cache_path(self, thumb_url: str) -> str:
         key = self._cache_key(f"pl:{thumb_url}")
         return os.path.join(self._art_cache_dir(), f"pl_{key}.jpg")
@@ -1648,19 +1689,17 @@ class AudioPlayerScreen(Screen):
                     os.remove(tmp)
             except Exception:
                 pass
-            req = urllib.request.Request(
+            http_transport.download(
                 url,
+                tmp,
                 headers={
                     "User-Agent": "Mozilla/5.0 (Linux; Android 12; Mobile) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36",
                     "Referer": "https://www.youtube.com",
                     "Accept-Language": "en-US,en;q=0.9",
                     "Accept": "image/jpeg,image/png,image/*;q=0.9,*/*;q=0.8",
-                    "Connection": "keep-alive",
                 },
+                timeout=12,
             )
-            ctx = ssl._create_unverified_context()
-            with urllib.request.urlopen(req, timeout=12, context=ctx) as resp, open(tmp, "wb") as f:
-                f.write(resp.read())
 
             if os.path.exists(tmp) and os.path.getsize(tmp) > 0:
                 # Перевіряємо, що файл реально відкривається Kivy, щоб не кешувати HTML/помилку.
@@ -2137,6 +2176,7 @@ class AudioPlayerScreen(Screen):
             os.makedirs(cache_dir, exist_ok=True)
         except Exception:
             pass
+        media_cache.register("art", cache_dir)
         return cache_dir
 
     def _art_cache_path(self, video_url: str) -> str:
@@ -2147,17 +2187,17 @@ class AudioPlayerScreen(Screen):
         if not video_url:
             return None
         try:
-            recent = load_recent()
-            for r in recent:
-                if r.get("url") == video_url:
-                    p = str(r.get("art_path") or "")
-                    if p and os.path.exists(p) and os.path.getsize(p) > 0:
-                        return p
+            r = get_recent(video_url, same_video=True) or {}
+            p = str(r.get("art_path") or "")
+            if p and os.path.exists(p) and os.path.getsize(p) > 0:
+                media_cache.touch(p)
+                return p
         except Exception:
             pass
         try:
             path = self._art_cache_path(video_url)
             if os.path.exists(path) and os.path.getsize(path) > 0:
+                media_cache.touch(path)
                 return path
         except Exception:
             pass
@@ -2213,7 +2253,9 @@ class AudioPlayerScreen(Screen):
                     self._resume_pos_ms = pos
                 except Exception:
                     self._resume_pos_ms = 0
-                if self._last_video_url:
+                if self._swap_to_fresh_stream(pos, "buffer_stuck"):
+                    pass
+                elif self._last_video_url:
                     threading.Thread(
                         target=lambda: self._extract_and_start_gen(self._last_video_url, self._load_gen),
                         daemon=True,
@@ -2412,8 +2454,37 @@ class AudioPlayerScreen(Screen):
             os.makedirs(cache_dir, exist_ok=True)
         except Exception:
             pass
+        media_cache.register("audio", cache_dir, on_evict=self._on_cached_audio_evicted)
         return cache_dir
 
+    @staticmethod
+    def _on_cached_audio_evicted(path: str):
+        audio_cache_index.forget_path(path)
+        local_index.forget_cached_file(path)
+        # recent/обране не повинні вказувати на видалений файл
+        for items, update in ((load_recent(), update_recent_cache), (load_favorites(), update_favorite_cache)):
+            for item in items:
+                if item.get("cache_path") == path and item.get("url"):
+                    update(item["url"], None)
+
+    def _cache_pin_keys(self) -> set[str]:
+        """Ключі файлів кешу, які не можна витісняти: обране і поточна черга."""
+        urls = set()
+        if self._last_video_url:
+            urls.add(self._last_video_url)
+        try:
+            if self.playlist and self.playlist.tracks:
+                urls.update(
+                    str(t.get("url") or "") for t in self.playlist.tracks if isinstance(t, dict)
+                )
+        except Exception:
+            pass
+        try:
+            urls.update(str(f.get("url") or "") for f in load_favorites())
+        except Exception:
+            pass
+        return {self._cache_key(u) for u in urls if u}
+
     def _cache_key(self, video_url: str) -> str:
         return hashlib.md5((video_url or "").encode("utf-8")).hexdigest()
 
@@ -2436,27 +2507,31 @@ class AudioPlayerScreen(Screen):
         if not video_url:
             return None
         try:
-            recent = load_recent()
-            for r in recent:
-                if r.get("url") == video_url:
-                    p = str(r.get("cache_path") or "")
-                    if p and os.path.exists(p) and os.path.getsize(p) > 0:
-                        return p
+            # Індекс кешу: один запис за ключем замість os.listdir усієї теки.
+            entry = audio_cache_index.lookup(self._audio_cache_dir(), self._cache_key(video_url))
+            if entry:
+                media_cache.touch(entry["path"])
+                return entry["path"]
         except Exception:
             pass
         try:
-            cache_dir = self._audio_cache_dir()
-            key = self._cache_key(video_url)
-            for name in os.listdir(cache_dir):
-                if name == key or name.startswith(f"{key}."):
-                    path = os.path.join(cache_dir, name)
-                    if os.path.isfile(path) and os.path.getsize(path) > 0:
-                        return path
+            r = get_recent(video_url, same_video=True) or {}
+            p = str(r.get("cache_path") or "")
+            if p and os.path.exists(p) and os.path.getsize(p) > 0:
+                media_cache.touch(p)
+                return p
         except Exception:
             pass
         return None
 
-    def _download_audio_locally(self, video_url: str, audio_url: str, headers: dict | None = None) -> str | None:
+    def _download_audio_locally(
+        self,
+        video_url: str,
+        audio_url: str,
+        headers: dict | None = None,
+        *,
+        resolves_left: int | None = None,
+    ) -> str | None:
         if not audio_url or audio_url.startswith("file://") or "m3u8" in audio_url:
             return None
 
@@ -2469,47 +2544,110 @@ class AudioPlayerScreen(Screen):
         except Exception:
             pass
 
-        headers = headers or {}
-        req_headers = {
-            "User-Agent": headers.get("User-Agent") or "Mozilla/5.0 (Linux; Android 12; Mobile) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36",
-            "Referer": headers.get("Referer") or "https://www.youtube.com",
-            "Accept-Language": headers.get("Accept-Language") or "en-US,en;q=0.9",
-            "Connection": headers.get("Connection") or "keep-alive",
-        }
+        # .part разом з .part.meta (довжина, валідатори) лишаються після збою:
+        # наступна спроба докачує з останнього байта через Range.
+        if resolves_left is None:
+            resolves_left = self.CACHE_RERESOLVE_ATTEMPTS
+        expire_ts = ydlh._parse_expire_ts(audio_url)
+        if expire_ts and expire_ts - time.time() < 60 and resolves_left:
+            resolves_left -= 1
+            fresh = self._reresolve_audio_url(video_url)
+            if fresh:
+                audio_url, headers = fresh
+                if self._guess_audio_ext(audio_url) != ext:
+                    return self._restart_download_as(video_url, path, audio_url, headers, resolves_left)
 
         tmp_path = f"{path}.part"
-        try:
-            ctx = ssl._create_unverified_context()
-            req = urllib.request.Request(audio_url, headers=req_headers)
-            with urllib.request.urlopen(req, timeout=30, context=ctx) as resp, open(tmp_path, "wb") as f:
-                expected_size = 0
+        attempts = self.CACHE_DOWNLOAD_ATTEMPTS
+        backoff = self.CACHE_RETRY_BACKOFF_SEC
+        while True:
+            headers = headers or {}
+            req_headers = {
+                "User-Agent": headers.get("User-Agent") or "Mozilla/5.0 (Linux; Android 12; Mobile) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36",
+                "Referer": headers.get("Referer") or "https://www.youtube.com",
+                "Accept-Language": headers.get("Accept-Language") or "en-US,en;q=0.9",
+            }
+            try:
+                # Неповний файл (не рівно Content-Length) - IOError всередині.
+                size = http_transport.download_resumable(
+                    audio_url,
+                    tmp_path,
+                    headers=req_headers,
+                    timeout=30,
+                    on_chunk=format_select.record_transfer,
+                )
+                break
+            except Exception as e:
+                attempts -= 1
+                status = getattr(getattr(e, "response", None), "status_code", 0)
                 try:
-                    expected_size = int(resp.headers.get("Content-Length") or 0)
+                    print(f"[AUDIO] cache download fail (status={status}, tries left={attempts}):", e)
                 except Exception:
-                    expected_size = 0
-                while True:
-                    chunk = resp.read(512 * 1024)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-            actual_size = os.path.getsize(tmp_path)
-            if expected_size > 0 and actual_size < expected_size:
-                raise IOError(f"incomplete audio cache: {actual_size}/{expected_size} bytes")
+                    pass
+                if attempts <= 0:
+                    return None
+                if status in (403, 410) and resolves_left:
+                    # Підписаний URL протух - новий через екстрактор, докачка триває.
+                    resolves_left -= 1
+                    fresh = self._reresolve_audio_url(video_url)
+                    if not fresh:
+                        return None
+                    audio_url, headers = fresh
+                    if self._guess_audio_ext(audio_url) != ext:
+                        return self._restart_download_as(video_url, path, audio_url, headers, resolves_left)
+                elif status:
+                    return None
+                else:
+                    time.sleep(backoff)
+                    backoff *= 2
+
+        try:
             os.replace(tmp_path, path)
+            audio_cache_index.record(
+                self._audio_cache_dir(), self._cache_key(video_url), path,
+                codec=ext, expected_length=size,
+            )
             update_recent_cache(video_url, path)
             update_favorite_cache(video_url, path)
+            meta = {}
+            if video_url == self._last_video_url:
+                meta = {"title": self._title or "", "channel": self._channel or "", "thumb": self._thumb or ""}
+            local_index.note_cached(video_url, path, **meta)
+            media_cache.note_added("audio")
             return path
         except Exception as e:
             try:
-                print("[AUDIO] cache download fail:", e)
+                print("[AUDIO] cache finalize fail:", e)
             except Exception:
                 pass
+            return None
+
+    def _restart_download_as(self, video_url: str, old_path: str, audio_url: str, headers, resolves_left: int):
+        """Новий URL має інший контейнер: недокачаний старий .part уже не знадобиться."""
+        for stale in (f"{old_path}.part", f"{old_path}.part.meta"):
             try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
+                os.remove(stale)
+            except FileNotFoundError:
                 pass
+            except Exception as e:
+                print(f"[AUDIO] failed to remove stale partial {stale}: {e}")
+        return self._download_audio_locally(video_url, audio_url, headers, resolves_left=resolves_left)
+
+    def _reresolve_audio_url(self, video_url: str):
+        """Свіжий (audio_url, headers) для video_url через екстрактор або None."""
+        try:
+            ydlh.invalidate_video_bundle(video_url)
+            info = ydlh.extract_audio_info(video_url, prefer_compat=bool(self._prefer_compat_audio))
+        except Exception as e:
+            print(f"[AUDIO] cache re-resolve failed: {e}")
+            return None
+        audio_url = str((info or {}).get("audio_url") or "")
+        if not audio_url:
             return None
+        headers = dict((info or {}).get("http_headers") or {})
+        self._put_cache(video_url, audio_url, headers, (info or {}).get("expire_ts"))
+        print("[AUDIO] cache download re-resolved expired URL")
+        return audio_url, headers
 
     def _cache_audio_async(self, video_url: str, audio_url: str, headers: dict | None = None):
         if not video_url or not audio_url:
@@ -2553,6 +2691,7 @@ class AudioPlayerScreen(Screen):
             path = urllib.parse.unquote(urllib.parse.urlparse(stream_url).path or "")
             if path and os.path.isfile(path):
                 os.remove(path)
+                audio_cache_index.forget_path(path)
                 print(f"[AUDIO] removed broken cached stream: {path}")
         except Exception as e:
             print(f"[AUDIO] failed to remove broken cached stream: {e}")
@@ -2571,12 +2710,14 @@ class AudioPlayerScreen(Screen):
             os.makedirs(cache_dir, exist_ok=True)
         except Exception:
             pass
+        media_cache.register("video", cache_dir)
 
         safe_name = hashlib.md5(video_url.encode("utf-8")).hexdigest() + ".mp4"
         path = os.path.join(cache_dir, safe_name)
 
         try:
             if os.path.exists(path) and os.path.getsize(path) > 0:
+                media_cache.touch(path)
                 return path
         except Exception:
             pass
@@ -2585,18 +2726,11 @@ class AudioPlayerScreen(Screen):
             "User-Agent": headers.get("User-Agent") or "Mozilla/5.0 (Linux; Android 12; Mobile) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Mobile Safari/537.36",
             "Referer": headers.get("Referer") or "https://www.youtube.com",
             "Accept-Language": headers.get("Accept-Language") or "en-US,en;q=0.9",
-            "Connection": headers.get("Connection") or "keep-alive",
         }
 
         try:
-            ctx = ssl._create_unverified_context()
-            req = urllib.request.Request(video_url, headers=req_headers)
-            with urllib.request.urlopen(req, timeout=30, context=ctx) as resp, open(path, "wb") as f:
-                while True:
-                    chunk = resp.read(512 * 1024)
-                    if not chunk:
-                        break
-                    f.write(chunk)
+            http_transport.download(video_url, path, headers=req_headers, timeout=30)
+            media_cache.note_added("video")
             return path if os.path.exists(path) and os.path.getsize(path) > 0 else None
         except Exception as e:
             try:
@@ -2775,7 +2909,7 @@ class AudioPlayerScreen(Screen):
             # якщо ми відновлюємось - стрибнемо в останню позицію (не дуже близько до кінця)
             try:
                 if self._resume_pos_ms and dur and self._resume_pos_ms < (dur - 5000):
-                    ma._mp_seek_to(int(self._resume_pos_ms))
+                    ma._mp_seek_to(int(self._resume_pos_ms), exact=True)
                     print(f"[AUDIO] resume from {self._resume_pos_ms} ms")
             except Exception:
                 pass
@@ -2832,7 +2966,7 @@ class AudioPlayerScreen(Screen):
             # відновлення з останньої позиції, якщо не майже кінець
             try:
                 if self._resume_pos_ms and dur and self._resume_pos_ms < (dur - 5000):
-                    ma._mp_seek_to(int(self._resume_pos_ms))
+                    ma._mp_seek_to(int(self._resume_pos_ms), exact=True)
                     print(f"[AUDIO] resume (audio-only) from {self._resume_pos_ms} ms")
             except Exception:
                 pass
@@ -2882,39 +3016,9 @@ class AudioPlayerScreen(Screen):
             ma.log(f"audio-only start err: {e}")
 
     def _prefetch_next_track_audio(self):
-        if not self.playlist or len(self.playlist) < 2:
-            return
-        try:
-            next_idx = (int(self.playlist.index) + 1) % len(self.playlist.tracks)
-            nxt = self.playlist.tracks[next_idx]
-            next_url = str(nxt.get("url") or "")
-        except Exception:
-            return
-        if not next_url or next_url == self._last_video_url:
-            return
-        if next_url in self._prefetch_inflight:
-            return
-        fast = self._url_cache.get(next_url)
-        if fast and fast.get("audio_url"):
-            return
-
-        self._prefetch_inflight.add(next_url)
-
-        def _job():
-            try:
-                info = ydlh.extract_audio_info(next_url)
-                aurl = info.get("audio_url") or ""
-                headers = info.get("http_headers") or {}
-                exp = info.get("expire_ts")
-                if aurl:
-                    self._put_cache(next_url, aurl, headers, exp)
-                    self._cache_audio_async(next_url, aurl, headers)
-            except Exception:
-                pass
-            finally:
-                self._prefetch_inflight.discard(next_url)
-
-        threading.Thread(target=_job, daemon=True).start()
+        # Не лише наступний трек: вікно з кількох наступних (і повтор поточного)
+        # тримається розрезолвленим спільним пулом, див. queue_resolver.
+        queue_resolver.sync(self)
 
     # ==================== extract & start ====================
 # TODO в нас дуже багато подібних екстаріктів і gen оптимізуй їх
@@ -2980,6 +3084,9 @@ class AudioPlayerScreen(Screen):
             if cthumb:
                 self._channel_thumb = cthumb
                 self._download_channel_avatar_async(cthumb)
+            elif info.get("channel_url"):
+                # fast path не віддає аватар - добираємо зі сторінки каналу
+                self._resolve_channel_avatar_async(info.get("channel_url"), gen)
             vc = info.get("view_count")
             if vc:
                 self._views_text = self._fmt_views(vc)
@@ -3061,9 +3168,6 @@ class AudioPlayerScreen(Screen):
 
     def _put_cache(self, url, audio_url, headers, expire_ts):
         try:
-            if len(self._url_cache) >= self._URL_CACHE_MAX:
-                old_key = next(iter(self._url_cache.keys()))
-                self._url_cache.pop(old_key, None)
             self._url_cache[url] = {
                 "audio_url": audio_url,
                 "headers": dict(headers or {}),
@@ -3451,16 +3555,61 @@ class AudioPlayerScreen(Screen):
             Clock.schedule_once(lambda dt: self._ui_set_playing(False), 0)
             return
 
-        if force_fresh and self._last_video_url:
+        # URL, оновлений заздалегідь, - без повторної екстракції.
+        if self._swap_to_fresh_stream(self._resume_pos_ms, reason):
+            return
+
+        video_url = self._last_video_url
+        gen = self._load_gen
+        rejected = None
+        if force_fresh and video_url:
             self._discard_current_cached_stream()
-            self._url_cache.pop(self._last_video_url, None)
-        elif self._last_video_url and self._try_start_cached_audio(self._last_video_url, self._load_gen):
+            stale = self._url_cache.pop(video_url, None) or {}
+            # -1004 - будь-яка IO-помилка, а network-restored - просто обрив
+            # мережі; кеш плеєра підозрюємо лише коли перший range справді
+            # відхилено (перевіряється у фоні перед новою екстракцією).
+            if self._resume_pos_ms <= 0 and reason != "network-restored":
+                rejected = (stale.get("audio_url"), stale.get("headers"))
+        elif video_url and self._try_start_cached_audio(video_url, gen):
             return
-        if self._last_video_url:
-            threading.Thread(
-                target=lambda: self._extract_and_start_gen(self._last_video_url, self._load_gen),
-                daemon=True,
-            ).start()
+        if video_url:
+            def job():
+                if force_fresh:
+                    if rejected:
+                        self._report_rejected_first_range(video_url, *rejected)
+                    ydlh.invalidate_video_bundle(video_url)
+                self._extract_and_start_gen(video_url, gen)
+
+            threading.Thread(target=job, daemon=True).start()
+
+    def _first_range_status(self, audio_url, headers) -> int | None:
+        """HTTP-статус першого range виданого URL; None - мережі немає або транспорт упав."""
+        if not str(audio_url or "").startswith("http"):
+            return None
+        try:
+            if not ma.is_network_available():
+                return None
+        except Exception:
+            pass
+        req_headers = dict(headers or {})
+        req_headers["Range"] = "bytes=0-0"
+        try:
+            with http_transport.stream(
+                "GET", audio_url, headers=req_headers, timeout=self.STREAM_PROBE_TIMEOUT_SEC,
+            ) as resp:
+                return resp.status_code
+        except Exception as e:
+            print(f"[AUDIO] first range probe failed: {e}")
+            return None
+
+    def _report_rejected_first_range(self, video_url, audio_url, headers):
+        status = self._first_range_status(audio_url, headers)
+        if status in (403, 410):
+            # потік не віддав навіть першого range - підозра на кеш плеєра
+            print(f"[AUDIO] first range rejected with HTTP {status}")
+            # URL з fast path не підписується плеєром - кеш плеєра тут ні до чого.
+            if not ydlh.report_fast_path_rejected(video_url, audio_url, status):
+                ydlh.report_stream_rejected(video_url, status)
 
     def _tick(self, dt):
         if not ma.android_player:
@@ -3547,16 +3696,85 @@ class AudioPlayerScreen(Screen):
         except Exception:
             pass
 
-    def _schedule_expiry(self):
-        if not self._expire_ts:
+    def _schedule_expiry(self, expire_ts=None):
+        """
+        Заздалегідь (за ~10 хв до expire) тягне свіжий URL у фоні, НЕ чіпаючи
+        MediaPlayer: поки старий URL віддає дані, трек грає без розриву.
+        Threading.Timer, а не Clock - має спрацювати і при вимкненому екрані.
+        """
+        expire_ts = expire_ts or self._expire_ts
+        if not expire_ts or str(self._stream_url or "").startswith("file://"):
             return
-        now = int(time.time())
-        # Не перезапускати надто часто, інакше при короткому TTL отримуємо цикли ресетів.
-        dt = max(30, self._expire_ts - now - 60)
-        self._refresh_ev = Clock.schedule_once(
-            lambda _: self._extract_and_start_gen(self._last_video_url, self._load_gen),
-            dt
-        )
+        try:
+            if self._refresh_ev:
+                self._refresh_ev.cancel()
+        except Exception:
+            pass
+        # Не частіше ніж раз на 30 с, інакше при короткому TTL отримуємо цикли.
+        dt = max(30, int(expire_ts) - int(time.time()) - 600)
+        gen = self._load_gen
+        timer = threading.Timer(dt, lambda: self._refresh_stream_url(gen))
+        timer.daemon = True
+        timer.start()
+        self._refresh_ev = timer
+
+    def _refresh_stream_url(self, gen: int):
+        video_url = str(self._last_video_url or "")
+        if not video_url or not self._is_current_gen(gen):
+            return
+        try:
+            ydlh.invalidate_video_bundle(video_url)
+            info = ydlh.extract_audio_info(video_url, prefer_compat=bool(self._prefer_compat_audio))
+        except Exception as e:
+            print(f"[AUDIO] background URL refresh failed: {e}")
+            info = None
+        if not self._is_current_gen(gen) or self._last_video_url != video_url:
+            return
+        audio_url = str((info or {}).get("audio_url") or "")
+        if not audio_url:
+            # Ще спроба пізніше; якщо не вийде - спрацює звичайний recover на помилці.
+            timer = threading.Timer(60, lambda: self._refresh_stream_url(gen))
+            timer.daemon = True
+            timer.start()
+            self._refresh_ev = timer
+            return
+        headers = dict((info or {}).get("http_headers") or {})
+        expire_ts = (info or {}).get("expire_ts")
+        self._put_cache(video_url, audio_url, headers, expire_ts)
+        self._fresh_stream = {
+            "gen": gen,
+            "video_url": video_url,
+            "audio_url": audio_url,
+            "headers": headers,
+            "expire_ts": expire_ts,
+        }
+        print("[AUDIO] fresh stream URL ready (swap on seek/error/stall)")
+        # Якщо сесія довга (пауза) - тримаємо свіжим уже новий URL.
+        self._schedule_expiry(expire_ts)
+
+    def _swap_to_fresh_stream(self, pos, reason: str) -> bool:
+        """Перезапуск на заздалегідь отриманому URL з точної позиції pos."""
+        fresh = self._fresh_stream
+        if (
+            not fresh
+            or not self._playback_desired
+            or self._user_paused
+            or fresh.get("gen") != self._load_gen
+            or fresh.get("video_url") != self._last_video_url
+        ):
+            return False
+        self._fresh_stream = None
+        self._stream_url = fresh["audio_url"]
+        self._headers = dict(fresh.get("headers") or {})
+        self._expire_ts = fresh.get("expire_ts")
+        self._resume_pos_ms = max(0, int(pos or 0))
+        print(f"[AUDIO] swap to fresh stream URL ({reason}) pos={self._resume_pos_ms}")
+        gen = self._load_gen
+        threading.Thread(
+            target=lambda: self._start_from_known_stream(gen),
+            daemon=True,
+        ).start()
+        return True
 
     # ==================== buttons ====================
 
@@ -3570,6 +3788,8 @@ class AudioPlayerScreen(Screen):
 
     def toggle_repeat(self, *a):
         self.repeat = not self.repeat
+        if self._last_video_url:
+            self._prefetch_next_track_audio()
         try:
             self.ids.repeat_btn.source = "ico/icorepeat_active.png" if self.repeat else "ico/icorepeat.png"
             inline_repeat = self.ids.get("repeat_inline_btn")
@@ -3620,6 +3840,7 @@ class AudioPlayerScreen(Screen):
                 cached = self._find_cached_audio(url)
                 if cached and os.path.exists(cached):
                     os.remove(cached)
+                    audio_cache_index.forget_path(cached)
             except Exception:
                 pass
             update_recent_cache(url, None)
@@ -3658,6 +3879,9 @@ class AudioPlayerScreen(Screen):
     def seek(self, value):
         try:
             ms = int(value * 1000)
+            # Seek однаково робить новий range-запит - слушний момент підмінити URL.
+            if self._swap_to_fresh_stream(ms, "seek"):
+                return
             ma._mp_seek_to(ms)
             self._resume_pos_ms = ms
             try:
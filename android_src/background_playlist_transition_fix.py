@@ -5,7 +5,8 @@ playlist model.  This patch only fixes three background-specific latency/race
 points:
 
 * the fallback completion guard must not sleep for up to 10 seconds;
-* next-track URL prefetch must not depend on Kivy Clock while Activity is paused;
+* next-track URL prefetch must not depend on Kivy Clock while Activity is paused
+  (it now goes through queue_resolver's own worker threads);
 * a completion callback must not perform the whole next-track transition inline
   on MediaPlayer's callback thread.
 """
@@ -27,7 +28,7 @@ def install_background_playlist_transition_fix() -> bool:
 
         try:
             import audio_screen
-            import ytdlp_helpers as ydlh
+            import queue_resolver
         except Exception as exc:
             print("[BG-NEXT] import failed:", exc)
             return False
@@ -43,86 +44,15 @@ def install_background_playlist_transition_fix() -> bool:
         media = audio_screen.ma
 
         # --------------------------------------------------------------
-        # Fast independent prefetch.
+        # Queue window prefetch.
         # --------------------------------------------------------------
         def prefetch_next_background_safe(self):
+            # The resolver runs on its own pool, so unlike Clock.schedule_once
+            # it keeps working while PythonActivity is paused by screen-off.
             try:
-                playlist = getattr(self, "playlist", None)
-                tracks = getattr(playlist, "tracks", None) if playlist else None
-                if not tracks or len(tracks) < 2:
-                    return None
-
-                current_index = int(getattr(playlist, "index", 0) or 0)
-                next_index = (current_index + 1) % len(tracks)
-                next_item = tracks[next_index] or {}
-                next_url = str(next_item.get("url") or "")
-                current_url = str(getattr(self, "_last_video_url", "") or "")
-                expected_gen = int(getattr(self, "_load_gen", 0) or 0)
-
-                if not next_url or next_url == current_url:
-                    return None
-
-                cached = getattr(self, "_url_cache", {}).get(next_url)
-                if cached and cached.get("audio_url"):
-                    return None
-
-                inflight = getattr(self, "_prefetch_inflight", None)
-                if inflight is None:
-                    self._prefetch_inflight = set()
-                    inflight = self._prefetch_inflight
-                if next_url in inflight:
-                    return None
-                inflight.add(next_url)
-            except Exception:
-                return None
-
-            def job():
-                try:
-                    # A short delay avoids competing with the current track's
-                    # prepare/start, but unlike Clock.schedule_once it continues
-                    # to run when PythonActivity is paused by screen-off.
-                    time.sleep(0.35)
-
-                    if int(getattr(self, "_load_gen", -1)) != expected_gen:
-                        return
-                    if str(getattr(self, "_last_video_url", "") or "") != current_url:
-                        return
-
-                    cached_now = getattr(self, "_url_cache", {}).get(next_url)
-                    if cached_now and cached_now.get("audio_url"):
-                        return
-
-                    try:
-                        info = ydlh.extract_audio_info(
-                            next_url,
-                            prefer_compat=bool(
-                                getattr(self, "_prefer_compat_audio", False)
-                            ),
-                        )
-                    except TypeError:
-                        info = ydlh.extract_audio_info(next_url)
-
-                    audio_url = str((info or {}).get("audio_url") or "")
-                    if not audio_url:
-                        return
-
-                    headers = dict((info or {}).get("http_headers") or {})
-                    expire_ts = (info or {}).get("expire_ts")
-                    self._put_cache(next_url, audio_url, headers, expire_ts)
-
-                    # Do not download the whole next song here.  A full-file
-                    # prefetch competes for mobile bandwidth with the current
-                    # stream.  The direct URL cache is enough for instant start.
-                    print(f"[BG-NEXT] prefetched next URL: {next_url}")
-                except Exception as exc:
-                    print("[BG-NEXT] prefetch failed:", exc)
-                finally:
-                    try:
-                        inflight.discard(next_url)
-                    except Exception:
-                        pass
-
-            threading.Thread(target=job, daemon=True).start()
+                queue_resolver.sync(self)
+            except Exception as exc:
+                print("[BG-NEXT] prefetch failed:", exc)
             return None
 
         # --------------------------------------------------------------
@@ -8,14 +8,15 @@ playback or hide the thumbnail.
 from __future__ import annotations
 
 import threading
-import time
+
+import format_select
+import stage_metrics
+import stream_cache
 
 _INSTALLED = False
 _LOCK = threading.RLock()
 _MUXED_URLS: set[str] = set()
-_MUXED_INFO_CACHE: dict[str, tuple[float, dict]] = {}
 _MUXED_PREFETCH_INFLIGHT: set[str] = set()
-_MUXED_CACHE_TTL_SEC = 15 * 60
 
 
 def install_core_player_fix() -> bool:
@@ -48,16 +49,8 @@ def install_core_player_fix() -> bool:
 
         def get_cached_muxed(video_url: str):
             try:
-                key = str(video_url or "")
-                cached = _MUXED_INFO_CACHE.get(key)
-                if not cached:
-                    return None
-                created_at, info = cached
-                if (time.monotonic() - float(created_at)) > _MUXED_CACHE_TTL_SEC:
-                    _MUXED_INFO_CACHE.pop(key, None)
-                    return None
-                result = dict(info or {})
-                direct_url = str(result.get("video_url") or "")
+                result = stream_cache.get_stream(str(video_url or ""), "muxed")
+                direct_url = str((result or {}).get("video_url") or "")
                 if direct_url:
                     _MUXED_URLS.add(direct_url)
                     return result
@@ -65,112 +58,85 @@ def install_core_player_fix() -> bool:
                 pass
             return None
 
-        def extract_muxed_video(video_url: str):
+        def extract_muxed_video(video_url: str, *, fresh: bool = False):
             source_url = str(video_url or "")
-            cached = get_cached_muxed(source_url)
-            if cached:
-                print("[CORE-V4] muxed cache hit")
-                return cached
-
-            opts = {
-                "quiet": True,
-                "skip_download": True,
-                "noplaylist": True,
-                "nocheckcertificate": True,
-                "logger": ydlh.YDLLogger(),
-                "format": (
-                    "best[ext=mp4][vcodec!=none][acodec!=none][height<=720]/"
-                    "best[vcodec!=none][acodec!=none][height<=720]/"
-                    "best[vcodec!=none][acodec!=none]"
-                ),
-                "http_headers": {
-                    "User-Agent": getattr(
-                        ydlh,
-                        "_ANDROID_YT_UA",
-                        "com.google.android.youtube/19.20.0 (Linux; U; Android 12) gzip",
-                    ),
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Referer": "https://www.youtube.com",
-                    "Connection": "keep-alive",
-                },
-                "extractor_retries": 2,
-                "ignoreerrors": "only_download",
-            }
-            try:
-                extract = getattr(ydlh, "_extract_info_with_clients", None)
-                if not callable(extract):
-                    raise RuntimeError("yt-dlp client helper missing")
-                info, err = extract(source_url, opts, ("android",))
-                if not info:
-                    raise RuntimeError(repr(err))
-
-                chosen = info
-                url = str(chosen.get("url") or "")
-                if (
-                    not url
-                    or str(chosen.get("acodec") or "none") == "none"
-                    or str(chosen.get("vcodec") or "none") == "none"
-                ):
-                    candidates = []
-                    for fmt in info.get("formats") or []:
-                        if not isinstance(fmt, dict):
-                            continue
-                        furl = str(fmt.get("url") or "")
-                        if not furl:
-                            continue
-                        if str(fmt.get("acodec") or "none") == "none":
-                            continue
-                        if str(fmt.get("vcodec") or "none") == "none":
-                            continue
-                        height = int(fmt.get("height") or 0)
-                        ext = str(fmt.get("ext") or "")
-                        protocol = str(fmt.get("protocol") or "")
-                        score = (
-                            1 if ext == "mp4" else 0,
-                            1 if protocol in {"https", "http"} else 0,
-                            1 if 0 < height <= 720 else 0,
-                            min(height or 0, 720),
-                            float(fmt.get("tbr") or 0),
-                        )
-                        candidates.append((score, fmt))
-                    if not candidates:
-                        raise RuntimeError("no progressive audio+video format")
-                    candidates.sort(key=lambda item: item[0], reverse=True)
-                    chosen = candidates[0][1]
+            with stage_metrics.span(
+                "muxed.total", video_id=ydlh._extract_video_id_from_url(source_url),
+            ) as total:
+                cached = None if fresh else get_cached_muxed(source_url)
+                if cached:
+                    print("[CORE-V4] muxed cache hit")
+                    total.outcome = "cache_hit"
+                    return cached
+
+                default_headers = dict(ydlh._YT_HTTP_HEADERS)
+                try:
+                    # Same yt-dlp pass as the audio stream and metadata; the
+                    # progressive format is picked from its format list below.
+                    with stage_metrics.span("muxed.bundle", video_id=total.video_id):
+                        info = ydlh.extract_video_bundle(source_url)["info"]
+                    total.client = str(info.get("_pymusic_client") or "")
+
+                    chosen = info
                     url = str(chosen.get("url") or "")
+                    if (
+                        not url
+                        or str(chosen.get("acodec") or "none") == "none"
+                        or str(chosen.get("vcodec") or "none") == "none"
+                    ):
+                        # Height follows the SurfaceView size and the measured
+                        # link instead of a fixed 720p cap.
+                        with stage_metrics.span(
+                            "muxed.format_select", video_id=total.video_id, client=total.client,
+                        ):
+                            chosen = format_select.choose_video(
+                                info.get("formats") or [], muxed_only=True,
+                            )
+                        if chosen is None:
+                            raise RuntimeError("no progressive audio+video format")
+                        url = str(chosen.get("url") or "")
+
+                    headers_fn = getattr(ydlh, "_best_effort_headers", None)
+                    if callable(headers_fn):
+                        headers = headers_fn(
+                            chosen.get("http_headers") or info.get("http_headers"),
+                            default_headers,
+                        )
+                    else:
+                        headers = dict(
+                            chosen.get("http_headers")
+                            or info.get("http_headers")
+                            or default_headers
+                        )
 
-                headers_fn = getattr(ydlh, "_best_effort_headers", None)
-                if callable(headers_fn):
-                    headers = headers_fn(
-                        chosen.get("http_headers") or info.get("http_headers"),
-                        opts["http_headers"],
-                    )
-                else:
-                    headers = dict(
-                        chosen.get("http_headers")
-                        or info.get("http_headers")
-                        or opts["http_headers"]
+                    result = {
+                        "video_url": url,
+                        "http_headers": headers,
+                        "thumb": info.get("thumbnail", "") or "",
+                        "muxed_av": True,
+                        "expire_ts": ydlh._parse_expire_ts(url),
+                    }
+                    _MUXED_URLS.add(url)
+                    stream_cache.put_stream(source_url, "muxed", result)
+                    print(
+                        "[CORE-V4] muxed format "
+                        f"id={chosen.get('format_id')} ext={chosen.get('ext')} "
+                        f"height={chosen.get('height')}"
                     )
+                    return result
+                except Exception as exc:
+                    print("[CORE-V4] muxed extraction fallback:", exc)
+                    total.outcome = "fallback"
+                    return old_safe_video(source_url)
 
-                result = {
-                    "video_url": url,
-                    "http_headers": headers,
-                    "thumb": info.get("thumbnail", "") or "",
-                    "muxed_av": True,
-                }
-                _MUXED_URLS.add(url)
-                _MUXED_INFO_CACHE[source_url] = (time.monotonic(), dict(result))
-                print(
-                    "[CORE-V4] muxed format "
-                    f"id={chosen.get('format_id')} ext={chosen.get('ext')} "
-                    f"height={chosen.get('height')}"
-                )
-                return result
-            except Exception as exc:
-                print("[CORE-V4] muxed extraction fallback:", exc)
-                return old_safe_video(source_url)
+        def revalidate_muxed(video_url: str):
+            ydlh.invalidate_video_bundle(video_url)
+            result = extract_muxed_video(video_url, fresh=True)
+            # The old-path fallback has no muxed flag; keep the cached entry then.
+            return result if (result or {}).get("muxed_av") else None
 
         ydlh.safe_extract_video_info = extract_muxed_video
+        stream_cache.register_revalidator("muxed", revalidate_muxed)
 
         def set_audio_volume(audio, value: float) -> None:
             try:
@@ -72,32 +72,17 @@ def _current_url(owner) -> str:
 def _fetch_comments(video_url: str, limit: int = 3):
     """Fetch a tiny top-comment sample in a background thread.
 
-    TLS verification stays enabled; this path intentionally does not use
-    nocheckcertificate/unverified SSL contexts.
+    Reuses the shared per-video yt-dlp pass from ``ytdlp_helpers``: the comment
+    count comes with the page metadata and the deferred comment extractor only
+    requests the comment threads themselves. TLS verification stays enabled:
+    the shared bundle options do not set nocheckcertificate.
     """
     try:
         import ytdlp_helpers as ydlh
 
-        opts = {
-            "quiet": True,
-            "skip_download": True,
-            "noplaylist": True,
-            "getcomments": True,
-            "extractor_retries": 1,
-            "socket_timeout": 9,
-            "logger": ydlh.YDLLogger(),
-            "extractor_args": {
-                "youtube": {
-                    "comment_sort": ["top"],
-                    "max_comments": [f"{int(limit)},all,all,0"],
-                    "skip": ["hls", "dash"],
-                }
-            },
-        }
-        with ydlh.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(video_url, download=False) or {}
+        bundle = ydlh.extract_video_bundle(video_url)
         out = []
-        for raw in (info.get("comments") or [])[: max(1, int(limit))]:
+        for raw in ydlh.extract_bundle_comments(video_url)[: max(1, int(limit))]:
             if not isinstance(raw, dict):
                 continue
             text = str(raw.get("text") or raw.get("content") or "").strip()
@@ -110,12 +95,7 @@ def _fetch_comments(video_url: str, limit: int = 3):
                     "likes": int(raw.get("like_count") or 0),
                 }
             )
-        count = info.get("comment_count")
-        try:
-            count = int(count) if count is not None else None
-        except Exception:
-            count = None
-        return out, count
+        return out, bundle.get("comment_count")
     except Exception as exc:
         print("[CURRENT-V4] comments failed:", exc)
         return [], None
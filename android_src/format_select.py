@@ -0,0 +1,257 @@
+"""Bandwidth-aware choice of YouTube audio/video formats.
+
+Inputs are the recent download throughput (fed by :func:`record_transfer`
+from the app's own downloads), whether the active network is metered, and
+the on-screen size of the video surface (fed by
+``AndroidVideoPlayer.set_bounds`` via :func:`note_surface`).  From those a
+quality target is derived - an audio bitrate and a video height - and the
+cheapest format that still meets it wins.  When nothing meets the target the
+best format below it is used, so a pick is always made if any format fits.
+
+Formats are yt-dlp style dicts (``url``, ``ext``, ``acodec``, ``vcodec``,
+``abr``/``tbr``, ``height``).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+# Throughput EWMA; samples below _MIN_SAMPLE_BYTES are mostly latency.
+_ALPHA = 0.3
+_MIN_SAMPLE_BYTES = 64 * 1024
+# A throughput sample older than this no longer describes the current link.
+_SAMPLE_TTL_SEC = 10 * 60
+_METERED_TTL_SEC = 30.0
+
+_HEIGHT_LADDER = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+# Assumed bitrate (kbps) for formats that do not report one.
+_UNKNOWN_ABR = 128.0
+
+_LOCK = threading.Lock()
+_STATE: dict[str, Any] = {
+    "kbps": None,
+    "kbps_at": 0.0,
+    "metered": None,
+    "metered_at": 0.0,
+    "surface": None,
+}
+
+
+def record_transfer(nbytes: int, seconds: float) -> None:
+    """Feed one download sample (bytes read in *seconds*) into the estimate."""
+    if nbytes < _MIN_SAMPLE_BYTES or seconds <= 0:
+        return
+    kbps = nbytes * 8.0 / 1000.0 / seconds
+    now = time.monotonic()
+    with _LOCK:
+        prev = _STATE["kbps"]
+        if prev is None or now - _STATE["kbps_at"] > _SAMPLE_TTL_SEC:
+            _STATE["kbps"] = kbps
+        else:
+            _STATE["kbps"] = prev + _ALPHA * (kbps - prev)
+        _STATE["kbps_at"] = now
+
+
+def note_surface(width: int, height: int) -> None:
+    """Remember the video SurfaceView size in pixels."""
+    if width > 0 and height > 0:
+        with _LOCK:
+            _STATE["surface"] = (int(width), int(height))
+
+
+def _is_metered() -> bool:
+    now = time.monotonic()
+    with _LOCK:
+        if _STATE["metered"] is not None and now - _STATE["metered_at"] < _METERED_TTL_SEC:
+            return bool(_STATE["metered"])
+    try:
+        import media_android
+
+        metered = bool(media_android.is_network_metered())
+    except Exception:
+        metered = False
+    with _LOCK:
+        _STATE["metered"] = metered
+        _STATE["metered_at"] = now
+    return metered
+
+
+def network_profile() -> dict[str, Any]:
+    now = time.monotonic()
+    with _LOCK:
+        kbps = _STATE["kbps"] if now - _STATE["kbps_at"] <= _SAMPLE_TTL_SEC else None
+        surface = _STATE["surface"]
+    return {"kbps": kbps, "metered": _is_metered(), "surface": surface}
+
+
+def audio_target_kbps(profile: dict[str, Any] | None = None) -> float:
+    profile = profile or network_profile()
+    kbps = profile.get("kbps")
+    target = 160.0
+    if profile.get("metered"):
+        target = 96.0
+    if kbps is not None:
+        # Leave most of the link for the rest of the stream and the UI.
+        if kbps < 400:
+            target = min(target, 64.0)
+        elif kbps < 1000:
+            target = min(target, 96.0)
+    return target
+
+
+def video_target_height(profile: dict[str, Any] | None = None) -> int:
+    profile = profile or network_profile()
+    cap = 1080
+    kbps = profile.get("kbps")
+    if kbps is not None:
+        if kbps < 800:
+            cap = 360
+        elif kbps < 1500:
+            cap = 480
+        elif kbps < 3500:
+            cap = 720
+    if profile.get("metered"):
+        cap = min(cap, 480)
+    surface = profile.get("surface")
+    if surface:
+        width, height = surface
+        # 16:9 content fitted into the surface.
+        needed = min(height, width * 9.0 / 16.0)
+        rung = next((h for h in _HEIGHT_LADDER if h >= needed * 0.9), _HEIGHT_LADDER[-1])
+        cap = min(cap, rung)
+    return cap
+
+
+def _abr(fmt: dict[str, Any]) -> float:
+    for key in ("abr", "tbr"):
+        try:
+            value = float(fmt.get(key) or 0)
+        except (TypeError, ValueError):
+            value = 0.0
+        if value > 0:
+            return value
+    return _UNKNOWN_ABR
+
+
+def _audio_quality(fmt: dict[str, Any]) -> float:
+    # Opus reaches AAC quality at a lower bitrate; MP3 needs more.
+    acodec = str(fmt.get("acodec", "")).lower()
+    if acodec.startswith("opus"):
+        return _abr(fmt) * 1.4
+    if acodec.startswith("mp3") or fmt.get("ext") == "mp3":
+        return _abr(fmt) * 0.8
+    return _abr(fmt)
+
+
+def _height(fmt: dict[str, Any]) -> float:
+    return float(fmt.get("height") or 0)
+
+
+def _tbr(fmt: dict[str, Any]) -> float:
+    try:
+        value = float(fmt.get("tbr") or 0)
+    except (TypeError, ValueError):
+        value = 0.0
+    # Without a bitrate, height is the best cost proxy available.
+    return value if value > 0 else _height(fmt) * 3.0
+
+
+def _pick(
+    formats: list[dict[str, Any]],
+    quality: Callable[[dict[str, Any]], float],
+    cost: Callable[[dict[str, Any]], float],
+    target: float,
+    rank: Callable[[dict[str, Any]], int],
+) -> dict[str, Any] | None:
+    """Cheapest format meeting *target*, else the best one below it.
+
+    *rank* orders codec/container preference (lower is better) among formats
+    of equal cost, so ties keep the previous fixed-priority behaviour.
+    """
+    if not formats:
+        return None
+    meeting = [f for f in formats if quality(f) >= target]
+    if meeting:
+        return min(meeting, key=lambda f: (cost(f), rank(f)))
+    return max(formats, key=lambda f: (quality(f), -rank(f), -cost(f)))
+
+
+def _is_audio(fmt: dict[str, Any]) -> bool:
+    return (
+        fmt.get("vcodec") in (None, "none")
+        and fmt.get("acodec") not in (None, "none")
+        and bool(fmt.get("url"))
+    )
+
+
+def _is_compat_audio(fmt: dict[str, Any]) -> bool:
+    acodec = str(fmt.get("acodec", "")).lower()
+    return fmt.get("ext") in ("m4a", "mp4", "mp3", "aac") or "mp4a" in acodec or acodec == "aac"
+
+
+def _audio_rank(fmt: dict[str, Any]) -> int:
+    acodec = str(fmt.get("acodec", "")).lower()
+    if acodec.startswith("opus"):
+        return 0
+    if fmt.get("ext") == "webm":
+        return 1
+    if fmt.get("ext") == "m4a":
+        return 2
+    return 3
+
+
+def choose_audio(
+    formats: Iterable[dict[str, Any]],
+    *,
+    prefer_compat: bool = False,
+    profile: dict[str, Any] | None = None,
+) -> dict[str, Any] | None:
+    """Audio-only format for MediaPlayer.
+
+    ``prefer_compat`` restricts the choice to AAC/M4A/MP3 when any exist.
+    """
+    audio = [f for f in formats or [] if isinstance(f, dict) and _is_audio(f)]
+    if prefer_compat:
+        audio = [f for f in audio if _is_compat_audio(f)] or audio
+    return _pick(audio, _audio_quality, _abr, audio_target_kbps(profile), _audio_rank)
+
+
+def _video_class(fmt: dict[str, Any]) -> int:
+    """0 = HLS, 1 = muxed mp4, 2 = any other video stream."""
+    if "m3u8" in str(fmt.get("url") or ""):
+        return 0
+    if fmt.get("acodec") not in (None, "none") and fmt.get("ext") == "mp4":
+        return 1
+    return 2
+
+
+def choose_video(
+    formats: Iterable[dict[str, Any]],
+    *,
+    muxed_only: bool = False,
+    profile: dict[str, Any] | None = None,
+) -> dict[str, Any] | None:
+    """Video format sized for the surface and the link.
+
+    The container class keeps its old priority (HLS, muxed mp4, anything
+    else); within the best available class the height target decides.
+    With ``muxed_only`` only progressive audio+video formats qualify, mp4
+    over http(s) preferred.
+    """
+    video = [
+        f for f in formats or []
+        if isinstance(f, dict) and f.get("url") and f.get("vcodec") not in (None, "none")
+    ]
+    if muxed_only:
+        video = [f for f in video if f.get("acodec") not in (None, "none")]
+        preferred = [
+            f for f in video
+            if f.get("ext") == "mp4" and str(f.get("protocol") or "https") in ("https", "http")
+        ]
+        video = preferred or video
+    if not video:
+        return None
+    best_class = min(_video_class(f) for f in video)
+    pool = [f for f in video if _video_class(f) == best_class]
+    return _pick(pool, _height, _tbr, float(video_target_height(profile)), lambda f: 0)
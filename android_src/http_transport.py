@@ -0,0 +1,301 @@
+"""One pooled HTTP client for every request the app makes.
+
+Search, watch-next, the Innertube player call, page scrapes, Return YouTube
+Dislike votes and the art/avatar/audio/video downloads all share a single
+long-lived ``httpx.Client``:
+
+* connections are kept alive per host, so repeated requests to youtube.com,
+  i.ytimg.com and googlevideo skip the TCP and TLS handshakes;
+* HTTP/2 is negotiated when the ``h2`` package is available, multiplexing
+  parallel requests to one host over a single connection;
+* a single certifi-backed ``ssl.SSLContext`` is used for every connection;
+* response cookies are not stored, so requests stay independent of each
+  other as they were with one-off clients.
+
+The client is thread-safe and created lazily on first use.
+"""
+from __future__ import annotations
+
+import contextlib
+import http.cookiejar
+import json
+import os
+import re
+import ssl
+import threading
+import time
+from typing import Any, Callable, Iterator
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=6.0)
+MAX_CONNECTIONS = 24
+MAX_KEEPALIVE_CONNECTIONS = 12
+KEEPALIVE_EXPIRY_SEC = 90.0
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
+
+# Hop-by-hop headers are managed by the pool and are invalid on HTTP/2.
+_HOP_BY_HOP = ("connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade")
+
+_LOCK = threading.Lock()
+_CLIENT: httpx.Client | None = None
+_SSL_CONTEXT: ssl.SSLContext | None = None
+
+
+def ssl_context() -> ssl.SSLContext:
+    global _SSL_CONTEXT
+    with _LOCK:
+        if _SSL_CONTEXT is None:
+            try:
+                import certifi
+
+                _SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where())
+            except Exception:
+                _SSL_CONTEXT = ssl.create_default_context()
+        return _SSL_CONTEXT
+
+
+def client() -> httpx.Client:
+    global _CLIENT
+    context = ssl_context()
+    with _LOCK:
+        if _CLIENT is None:
+            _CLIENT = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                verify=context,
+                timeout=DEFAULT_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SEC,
+                ),
+                cookies=http.cookiejar.CookieJar(
+                    policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[]),
+                ),
+            )
+            print(f"[HTTP] pooled client ready http2={HTTP2_AVAILABLE}")
+        return _CLIENT
+
+
+def _clean_headers(headers: Any) -> dict[str, str] | None:
+    if not headers:
+        return None
+    return {
+        str(k): str(v)
+        for k, v in dict(headers).items()
+        if v is not None and str(k).lower() not in _HOP_BY_HOP
+    }
+
+
+def request(method: str, url: str, *, headers: Any = None, **kwargs: Any) -> httpx.Response:
+    """Send a request on the shared pool; the body is read before returning."""
+    return client().request(method, url, headers=_clean_headers(headers), **kwargs)
+
+
+def get(url: str, **kwargs: Any) -> httpx.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> httpx.Response:
+    return request("POST", url, **kwargs)
+
+
+@contextlib.contextmanager
+def stream(method: str, url: str, *, headers: Any = None, **kwargs: Any) -> Iterator[httpx.Response]:
+    """Streamed response; leaving the block early returns the connection."""
+    with client().stream(method, url, headers=_clean_headers(headers), **kwargs) as response:
+        yield response
+
+
+def fetch_bytes(
+    url: str,
+    *,
+    headers: Any = None,
+    timeout: Any = None,
+    limit: int | None = None,
+) -> bytes:
+    """Body of a successful GET, truncated to ``limit`` bytes when given."""
+    kwargs = {} if timeout is None else {"timeout": timeout}
+    with stream("GET", url, headers=headers, **kwargs) as response:
+        response.raise_for_status()
+        if limit is None:
+            return response.read()
+        parts: list[bytes] = []
+        read = 0
+        for chunk in response.iter_bytes():
+            parts.append(chunk)
+            read += len(chunk)
+            if read >= limit:
+                break
+        return b"".join(parts)[:limit]
+
+
+def download(
+    url: str,
+    path: str,
+    *,
+    headers: Any = None,
+    timeout: Any = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    on_chunk: Callable[[int, float], None] | None = None,
+) -> int:
+    """Write a successful GET body to ``path``; returns the byte count.
+
+    ``on_chunk(nbytes, seconds)`` gets the time spent waiting for each chunk.
+    Raises ``IOError`` when fewer bytes than ``Content-Length`` arrived.
+    """
+    kwargs = {} if timeout is None else {"timeout": timeout}
+    written = 0
+    with stream("GET", url, headers=headers, **kwargs) as response:
+        response.raise_for_status()
+        try:
+            expected = int(response.headers.get("Content-Length") or 0)
+        except ValueError:
+            expected = 0
+        # Content-Length counts encoded bytes; only compare for identity bodies.
+        if response.headers.get("Content-Encoding"):
+            expected = 0
+        with open(path, "wb") as f:
+            started = time.monotonic()
+            for chunk in response.iter_bytes(chunk_size):
+                if on_chunk is not None:
+                    on_chunk(len(chunk), time.monotonic() - started)
+                f.write(chunk)
+                written += len(chunk)
+                started = time.monotonic()
+    if expected > 0 and written < expected:
+        raise IOError(f"incomplete download: {written}/{expected} bytes")
+    return written
+
+
+def _read_meta(meta_path: str) -> dict[str, Any]:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _write_meta(meta_path: str, meta: dict[str, Any]) -> None:
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _content_range(value: str | None) -> tuple[int, int] | None:
+    """(first byte, complete length) from ``bytes a-b/total``."""
+    match = re.match(r"\s*bytes\s+(\d+)-\d+/(\d+)", value or "")
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def download_resumable(
+    url: str,
+    part_path: str,
+    *,
+    headers: Any = None,
+    timeout: Any = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    on_chunk: Callable[[int, float], None] | None = None,
+) -> int:
+    """Download into ``part_path``, continuing an earlier partial download.
+
+    Validators of the first response (complete length, ETag, Last-Modified)
+    are kept in ``<part_path>.meta``.  With a partial file and its metadata
+    the request asks for the remaining bytes with ``Range`` (plus ``If-Range``
+    when a validator is known); a response for a different resource - a full
+    200, or a 206 whose total length differs - starts over from byte 0.  On
+    errors both files are left in place for the next attempt.
+
+    Returns the complete length.  Raises ``IOError`` if the part file does not
+    end up exactly ``Content-Length`` long; ``httpx.HTTPStatusError`` for
+    error statuses (e.g. an expired signed URL) so the caller can re-resolve.
+    """
+    meta_path = f"{part_path}.meta"
+    meta = _read_meta(meta_path)
+    try:
+        have = os.path.getsize(part_path)
+    except OSError:
+        have = 0
+    known_total = int(meta.get("total") or 0)
+    if not known_total or have > known_total:
+        have = 0
+    kwargs = {} if timeout is None else {"timeout": timeout}
+
+    while True:
+        req_headers = dict(headers or {})
+        if have:
+            req_headers["Range"] = f"bytes={have}-"
+            validator = meta.get("etag") or meta.get("last_modified")
+            if validator:
+                req_headers["If-Range"] = validator
+            # Range offsets count identity bytes.
+            req_headers["Accept-Encoding"] = "identity"
+
+        with stream("GET", url, headers=req_headers, **kwargs) as response:
+            if response.status_code == 416 and have and have == known_total:
+                break
+            response.raise_for_status()
+            if have and response.status_code == 206:
+                span = _content_range(response.headers.get("Content-Range"))
+                if not span or span != (have, known_total):
+                    # A different resource behind the same key: start over.
+                    print(f"[HTTP] resume rejected ({response.headers.get('Content-Range')}), restarting")
+                    have = 0
+                    continue
+                print(f"[HTTP] resuming download at {have}/{known_total} bytes")
+                mode = "ab"
+            else:
+                # Full body: a fresh start, or the validator no longer matched.
+                have = 0
+                mode = "wb"
+                try:
+                    known_total = int(response.headers.get("Content-Length") or 0)
+                except ValueError:
+                    known_total = 0
+                # Content-Length counts encoded bytes; only trust identity bodies.
+                if response.headers.get("Content-Encoding"):
+                    known_total = 0
+                meta = {
+                    "total": known_total,
+                    "etag": response.headers.get("ETag") or "",
+                    "last_modified": response.headers.get("Last-Modified") or "",
+                }
+                if known_total:
+                    _write_meta(meta_path, meta)
+                elif os.path.exists(meta_path):
+                    os.remove(meta_path)
+            with open(part_path, mode) as f:
+                started = time.monotonic()
+                for chunk in response.iter_bytes(chunk_size):
+                    if on_chunk is not None:
+                        on_chunk(len(chunk), time.monotonic() - started)
+                    f.write(chunk)
+                    started = time.monotonic()
+        break
+
+    written = os.path.getsize(part_path)
+    if known_total and written != known_total:
+        raise IOError(f"incomplete download: {written}/{known_total} bytes")
+    try:
+        os.remove(meta_path)
+    except FileNotFoundError:
+        pass
+    return written
+
+
+def close() -> None:
+    global _CLIENT
+    with _LOCK:
+        pool, _CLIENT = _CLIENT, None
+    if pool is not None:
+        pool.close()
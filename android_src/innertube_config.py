@@ -0,0 +1,154 @@
+"""Persisted Innertube client config shared by search, related and watch-next.
+
+YouTube pages publish the anonymous web API key, the current client versions
+and a ``visitorData`` token in ``ytcfg``.  Search, the related-videos feed and
+the watch-next key fallback used to derive these on their own, each with a
+page fetch.  This store keeps what any of them learned in one place and on
+disk (``INNERTUBE_CONFIG_PATH``), so a warm store lets all three go straight
+to ``youtubei/v1``:
+
+* :func:`remember_ytcfg` merges a page's ytcfg - the API key and visitorData
+  are shared, the ``INNERTUBE_CONTEXT`` is kept per ``clientName``; each of
+  them carries its own timestamp, so a bare key (:func:`remember_key`) never
+  makes an old context look fresh;
+* :func:`get` returns a ytcfg-shaped dict for one client while the key is
+  younger than ``TTL_SEC``, with the context and visitorData only while they
+  are fresh too;
+* :func:`invalidate` drops one client's context after YouTube rejects its
+  request; that client bootstraps from a page again, the others keep theirs.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any
+
+INNERTUBE_CONFIG_PATH = "innertube_config.json"
+TTL_SEC = 6 * 3600
+
+_LOCK = threading.RLock()
+_STORE: dict[str, Any] | None = None
+
+
+def _load_locked() -> dict[str, Any]:
+    global _STORE
+    if _STORE is None:
+        _STORE = {}
+        if os.path.exists(INNERTUBE_CONFIG_PATH):
+            try:
+                with open(INNERTUBE_CONFIG_PATH, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and "key_at" in data:
+                    _STORE = data
+            except Exception as exc:
+                print("[INNERTUBE-CFG] load failed:", exc)
+    return _STORE
+
+
+def _save_locked() -> None:
+    tmp_path = f"{INNERTUBE_CONFIG_PATH}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_STORE or {}, f, ensure_ascii=False)
+        os.replace(tmp_path, INNERTUBE_CONFIG_PATH)
+    except Exception as exc:
+        print("[INNERTUBE-CFG] save failed:", exc)
+
+
+def _fresh(stored_at: Any, now: float) -> bool:
+    return now - float(stored_at or 0) < TTL_SEC
+
+
+def remember_ytcfg(ytcfg: dict[str, Any] | None) -> None:
+    """Merge the key, visitorData and client context from a page's ytcfg."""
+    ytcfg = ytcfg or {}
+    api_key = str(ytcfg.get("INNERTUBE_API_KEY") or "")
+    context = ytcfg.get("INNERTUBE_CONTEXT")
+    client = (context or {}).get("client") if isinstance(context, dict) else None
+    client = client if isinstance(client, dict) else {}
+    visitor = str(ytcfg.get("VISITOR_DATA") or client.get("visitorData") or "")
+    if not (api_key or visitor or client.get("clientName")):
+        return
+    now = time.time()
+    with _LOCK:
+        store = _load_locked()
+        if api_key:
+            if api_key != store.get("api_key"):
+                print("[INNERTUBE-CFG] stored new API key")
+            store["api_key"] = api_key
+            store["key_at"] = now
+        if visitor:
+            store["visitor_data"] = visitor
+            store["visitor_at"] = now
+        name = str(client.get("clientName") or "")
+        if name:
+            store.setdefault("contexts", {})[name] = {
+                "context": copy.deepcopy(context),
+                "stored_at": now,
+            }
+            store.get("rejected", {}).pop(name, None)
+        _save_locked()
+
+
+def remember_key(api_key: str) -> None:
+    """Store a scraped key; contexts and visitorData keep their own age."""
+    if api_key:
+        remember_ytcfg({"INNERTUBE_API_KEY": api_key})
+
+
+def api_key() -> str:
+    with _LOCK:
+        store = _load_locked()
+        if not store.get("api_key") or not _fresh(store.get("key_at"), time.time()):
+            return ""
+        return str(store["api_key"])
+
+
+def get(client_name: str = "WEB") -> dict[str, Any] | None:
+    """ytcfg-shaped config for *client_name*, None when the store is cold.
+
+    ``INNERTUBE_CONTEXT`` is only present once a page of that client was seen
+    within ``TTL_SEC``.  After :func:`invalidate` for this client the result
+    stays None until a page or a new key is remembered.
+    """
+    name = str(client_name or "")
+    now = time.time()
+    with _LOCK:
+        store = _load_locked()
+        key_at = float(store.get("key_at") or 0)
+        if not store.get("api_key") or not _fresh(key_at, now):
+            return None
+        if float((store.get("rejected") or {}).get(name) or 0) >= key_at:
+            return None
+        cfg: dict[str, Any] = {"INNERTUBE_API_KEY": store["api_key"]}
+        visitor = str(store.get("visitor_data") or "") if _fresh(store.get("visitor_at"), now) else ""
+        entry = (store.get("contexts") or {}).get(name) or {}
+        context = copy.deepcopy(entry.get("context")) if _fresh(entry.get("stored_at"), now) else None
+        if isinstance(context, dict):
+            client = context.setdefault("client", {})
+            if visitor:
+                client["visitorData"] = visitor
+            cfg["INNERTUBE_CONTEXT"] = context
+            if client.get("clientVersion"):
+                cfg["INNERTUBE_CLIENT_VERSION"] = client["clientVersion"]
+        if visitor:
+            cfg["VISITOR_DATA"] = visitor
+        return cfg
+
+
+def invalidate(client_name: str, reason: str = "") -> None:
+    """Forget *client_name*'s context; its next caller bootstraps from a page.
+
+    Other clients keep their config; a key remembered afterwards (or a page
+    of this client) lifts the block.
+    """
+    name = str(client_name or "")
+    with _LOCK:
+        store = _load_locked()
+        (store.get("contexts") or {}).pop(name, None)
+        store.setdefault("rejected", {})[name] = time.time()
+        _save_locked()
+    print(f"[INNERTUBE-CFG] invalidated {name} {reason}".rstrip())
@@ -0,0 +1,376 @@
+"""SQLite store for the recent list, favorites and the search history.
+
+These used to live in ``recent.json``, ``favorites.json`` and
+``search_history.json``, each rewritten in full on every change and re-parsed
+on every lookup.  Here they are rows in ``LIBRARY_DB_PATH`` (WAL journal):
+
+* ``items`` holds the recent and favorite entries, one row per ``(list, url)``
+  with the entry dict as JSON, its position and the YouTube video ID;
+* ``search_history`` keeps the query strings in order;
+* on first open the legacy JSON files are imported in one transaction and
+  renamed to ``*.migrated``.
+
+Reads and writes go to a process-wide in-memory model loaded once from the
+database and indexed by URL and video ID, so they never touch the disk and
+concurrent updates from the art, audio-cache and favorites threads are
+applied under one lock.  Changed lists are marked dirty; a single writer thread commits them in one transaction
+``FLUSH_DELAY_SEC`` after the first change, and :func:`flush` (called from
+``on_pause``) makes it commit right away.
+
+``recent_utils`` and ``search_utils`` keep their function signatures as thin
+wrappers over this module.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+LIBRARY_DB_PATH = "library.db"
+LEGACY_LIST_FILES = {"recent": "recent.json", "favorites": "favorites.json"}
+LEGACY_HISTORY_FILE = "search_history.json"
+
+LIST_NAMES = ("recent", "favorites")
+# Changes are coalesced for this long before the writer thread commits them.
+FLUSH_DELAY_SEC = 1.0
+
+_LOCK = threading.RLock()
+_DB: sqlite3.Connection | None = None
+# In-memory model; _COND guards it together with the writer state below.
+_COND = threading.Condition(threading.RLock())
+_MODEL: dict[str, Any] | None = None
+_INDEX: dict[str, tuple[dict[str, dict], dict[str, dict]]] = {}
+_DIRTY: set[str] = set()
+_DIRTY_SINCE = 0.0
+_MUTATIONS = 0
+_FLUSHED = 0
+_FLUSH_REQUESTED = False
+_WRITER: threading.Thread | None = None
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS items (
+        list TEXT NOT NULL,
+        url TEXT NOT NULL,
+        video_id TEXT NOT NULL DEFAULT '',
+        pos INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        PRIMARY KEY (list, url)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS items_by_pos ON items (list, pos)",
+    "CREATE INDEX IF NOT EXISTS items_by_video ON items (list, video_id)",
+    "CREATE TABLE IF NOT EXISTS search_history (query TEXT PRIMARY KEY, pos INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+
+def _video_id(url: str) -> str:
+    raw = str(url or "").strip()
+    try:
+        parsed = urlparse(raw)
+        candidate = str((parse_qs(parsed.query or "").get("v") or [""])[0] or "")
+        if not candidate and "youtu.be" in (parsed.netloc or "").lower():
+            candidate = (parsed.path or "").strip("/").split("/")[0]
+        if re.fullmatch(r"[A-Za-z0-9_-]{11}", candidate):
+            return candidate
+    except Exception:
+        pass
+    match = re.search(r"(?:v=|youtu\.be/|/(?:shorts|live|embed)/)([A-Za-z0-9_-]{11})", raw)
+    return match.group(1) if match else ""
+
+
+def _read_legacy(path: str) -> list:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except Exception as exc:
+        print(f"[LIBRARY] legacy read failed {path}: {exc}")
+        return []
+
+
+def _migrate_locked(db: sqlite3.Connection) -> None:
+    if db.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+        return
+    migrated: list[str] = []
+    with db:
+        for list_name, path in LEGACY_LIST_FILES.items():
+            if os.path.exists(path):
+                _replace_items_locked(db, list_name, _read_legacy(path))
+                migrated.append(path)
+        if os.path.exists(LEGACY_HISTORY_FILE):
+            _replace_history_locked(db, _read_legacy(LEGACY_HISTORY_FILE))
+            migrated.append(LEGACY_HISTORY_FILE)
+        db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')")
+    for path in migrated:
+        try:
+            os.replace(path, f"{path}.migrated")
+        except Exception as exc:
+            print(f"[LIBRARY] could not retire {path}: {exc}")
+    if migrated:
+        print(f"[LIBRARY] migrated {', '.join(migrated)}")
+
+
+def _connect_locked() -> sqlite3.Connection:
+    global _DB
+    if _DB is None:
+        db = sqlite3.connect(LIBRARY_DB_PATH, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            db.execute(statement)
+        db.commit()
+        _migrate_locked(db)
+        _DB = db
+    return _DB
+
+
+def _row_to_item(data: str) -> dict[str, Any] | None:
+    try:
+        item = json.loads(data)
+    except Exception:
+        return None
+    return item if isinstance(item, dict) else None
+
+
+def _replace_items_locked(db: sqlite3.Connection, list_name: str, entries: list) -> None:
+    db.execute("DELETE FROM items WHERE list = ?", (list_name,))
+    for pos, item in enumerate(entries or []):
+        url = str((item or {}).get("url") or "") if isinstance(item, dict) else ""
+        if not url:
+            continue
+        db.execute(
+            "INSERT OR IGNORE INTO items (list, url, video_id, pos, data) VALUES (?, ?, ?, ?, ?)",
+            (list_name, url, _video_id(url), pos, json.dumps(item, ensure_ascii=False)),
+        )
+
+
+def _replace_history_locked(db: sqlite3.Connection, queries: list) -> None:
+    db.execute("DELETE FROM search_history")
+    for pos, query in enumerate(queries or []):
+        if isinstance(query, str) and query:
+            db.execute(
+                "INSERT OR IGNORE INTO search_history (query, pos) VALUES (?, ?)",
+                (query, pos),
+            )
+
+
+def _load_model_locked() -> dict[str, Any]:
+    global _MODEL
+    if _MODEL is None:
+        model: dict[str, Any] = {"history": []}
+        with _LOCK:
+            db = _connect_locked()
+            for list_name in LIST_NAMES:
+                rows = db.execute(
+                    "SELECT data FROM items WHERE list = ? ORDER BY pos", (list_name,),
+                ).fetchall()
+                model[list_name] = [
+                    item for item in (_row_to_item(row[0]) for row in rows) if item is not None
+                ]
+            model["history"] = [
+                row[0] for row in db.execute("SELECT query FROM search_history ORDER BY pos")
+            ]
+        _MODEL = model
+        for list_name in LIST_NAMES:
+            _reindex_locked(list_name)
+    return _MODEL
+
+
+def _reindex_locked(list_name: str) -> None:
+    by_url: dict[str, dict[str, Any]] = {}
+    by_video: dict[str, dict[str, Any]] = {}
+    for item in _MODEL[list_name]:
+        url = str(item.get("url") or "")
+        by_url.setdefault(url, item)
+        video_id = _video_id(url)
+        if video_id:
+            by_video.setdefault(video_id, item)
+    _INDEX[list_name] = (by_url, by_video)
+
+
+def _mark_dirty_locked(name: str) -> None:
+    global _MUTATIONS, _DIRTY_SINCE
+    _MUTATIONS += 1
+    if not _DIRTY:
+        _DIRTY_SINCE = time.monotonic()
+    _DIRTY.add(name)
+    _ensure_writer_locked()
+    _COND.notify_all()
+
+
+def _ensure_writer_locked() -> None:
+    global _WRITER
+    if _WRITER is None:
+        _WRITER = threading.Thread(target=_writer_loop, name="pymusic-library-writer", daemon=True)
+        _WRITER.start()
+
+
+def _write_snapshot(snapshot: dict[str, list]) -> None:
+    with _LOCK:
+        db = _connect_locked()
+        with db:
+            for name, values in snapshot.items():
+                if name == "history":
+                    _replace_history_locked(db, values)
+                else:
+                    _replace_items_locked(db, name, values)
+
+
+def _writer_loop() -> None:
+    global _FLUSHED
+    while True:
+        with _COND:
+            while not _DIRTY:
+                _COND.wait()
+            # Coalesce everything that changes within FLUSH_DELAY_SEC.
+            while not _FLUSH_REQUESTED:
+                left = _DIRTY_SINCE + FLUSH_DELAY_SEC - time.monotonic()
+                if left <= 0:
+                    break
+                _COND.wait(left)
+            snapshot = {name: [dict(v) if isinstance(v, dict) else v for v in _MODEL[name]] for name in _DIRTY}
+            _DIRTY.clear()
+            upto = _MUTATIONS
+        try:
+            _write_snapshot(snapshot)
+        except Exception as exc:
+            print("[LIBRARY] flush failed:", exc)
+            with _COND:
+                _DIRTY.update(snapshot)
+                _COND.notify_all()
+            time.sleep(FLUSH_DELAY_SEC)
+            continue
+        with _COND:
+            _FLUSHED = max(_FLUSHED, upto)
+            _COND.notify_all()
+
+
+def flush(timeout: float = 2.0) -> bool:
+    """Ask the writer to persist pending changes now and wait for it."""
+    global _FLUSH_REQUESTED
+    with _COND:
+        target = _MUTATIONS
+        if _FLUSHED >= target:
+            return True
+        _FLUSH_REQUESTED = True
+        _COND.notify_all()
+        done = _COND.wait_for(lambda: _FLUSHED >= target, timeout)
+        _FLUSH_REQUESTED = False
+    return done
+
+
+def items(list_name: str, limit: int | None = None) -> list[dict[str, Any]]:
+    with _COND:
+        values = _load_model_locked()[list_name]
+        if limit is not None:
+            values = values[:limit]
+        return [dict(item) for item in values]
+
+
+def replace_items(list_name: str, entries: list, limit: int | None = None) -> None:
+    entries = [dict(item) for item in entries or [] if isinstance(item, dict) and item.get("url")]
+    if limit is not None:
+        entries = entries[:limit]
+    with _COND:
+        _load_model_locked()[list_name] = entries
+        _reindex_locked(list_name)
+        _mark_dirty_locked(list_name)
+
+
+def get_item(list_name: str, url: str, *, same_video: bool = False) -> dict[str, Any] | None:
+    """Entry for exactly *url*.
+
+    With ``same_video`` any entry of the same video ID matches too - for
+    metadata lookups (cached file, art) only; membership checks stay exact so
+    they agree with :func:`update_item` and :func:`remove_item`.
+    """
+    if not url:
+        return None
+    with _COND:
+        _load_model_locked()
+        by_url, by_video = _INDEX[list_name]
+        item = by_url.get(url)
+        if item is None and same_video:
+            video_id = _video_id(url)
+            item = by_video.get(video_id) if video_id else None
+        return dict(item) if item is not None else None
+
+
+def upsert_item(list_name: str, item: dict[str, Any]) -> dict[str, Any] | None:
+    """Merge *item* into its entry, or insert it at the front; returns the entry."""
+    url = str((item or {}).get("url") or "")
+    if not url:
+        return None
+    with _COND:
+        values = _load_model_locked()[list_name]
+        existing = _INDEX[list_name][0].get(url)
+        if existing is not None:
+            existing.update(item)
+            merged = existing
+        else:
+            merged = dict(item)
+            values.insert(0, merged)
+            _reindex_locked(list_name)
+        _mark_dirty_locked(list_name)
+        return dict(merged)
+
+
+def update_item(list_name: str, url: str, **fields: Any) -> bool:
+    """Set fields of an existing entry; a ``None`` value removes the field."""
+    if not url:
+        return False
+    with _COND:
+        _load_model_locked()
+        item = _INDEX[list_name][0].get(url)
+        if item is None:
+            return False
+        for key, value in fields.items():
+            if value is None:
+                item.pop(key, None)
+            else:
+                item[key] = value
+        _mark_dirty_locked(list_name)
+    return True
+
+
+def remove_item(list_name: str, url: str) -> None:
+    if not url:
+        return
+    with _COND:
+        model = _load_model_locked()
+        if url not in _INDEX[list_name][0]:
+            return
+        model[list_name] = [item for item in model[list_name] if item.get("url") != url]
+        _reindex_locked(list_name)
+        _mark_dirty_locked(list_name)
+
+
+def search_history(limit: int | None = None) -> list[str]:
+    with _COND:
+        values = _load_model_locked()["history"]
+        return list(values if limit is None else values[:limit])
+
+
+def replace_search_history(queries: list, limit: int | None = None) -> None:
+    queries = [q for q in queries or [] if isinstance(q, str) and q]
+    if limit is not None:
+        queries = queries[:limit]
+    with _COND:
+        _load_model_locked()["history"] = queries
+        _mark_dirty_locked("history")
+
+
+def close() -> None:
+    global _DB
+    flush()
+    with _LOCK:
+        db, _DB = _DB, None
+    if db is not None:
+        db.close()
@@ -5,8 +5,9 @@ like/dislike percentage underneath, and makes the channel name bold.
 
 The data comes from Return YouTube Dislike's public HTTPS API because YouTube
 no longer exposes public dislike counts. Failures are isolated from playback:
-requests run off the Kivy UI thread, use certifi-backed TLS verification,
-are cached, and can retry after transient network failures.
+requests run off the Kivy UI thread, go through the shared pooled client
+(certifi-backed TLS verification), are cached, and can retry after transient
+network failures.
 """
 from __future__ import annotations
 
@@ -16,8 +17,7 @@ import time
 import urllib.parse
 from typing import Any
 
-import certifi
-import requests
+import http_transport
 from kivy.clock import Clock
 from kivy.metrics import dp
 from kivy.uix.floatlayout import FloatLayout
@@ -162,18 +162,16 @@ def _fetch_votes(video_id: str) -> tuple[int, int] | None:
         return cached
 
     try:
-        response = requests.get(
+        response = http_transport.get(
             _VOTES_ENDPOINT,
             params={"videoId": video_id},
             headers={
                 "Accept": "application/json, text/plain, */*",
                 "Pragma": "no-cache",
                 "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
                 "User-Agent": "PyMusic/1.0 (Android)",
             },
             timeout=_REQUEST_TIMEOUT_SECONDS,
-            verify=certifi.where(),
         )
         if response.status_code == 429:
             _log(f"[LIKES-UI] RYD rate limited video={video_id}")
@@ -0,0 +1,245 @@
+"""Full-text index of tracks the device already knows about.
+
+Recent items, favorites and tracks in the local audio cache are indexed by
+title and channel in a small SQLite database (``LOCAL_INDEX_PATH``), so a
+search can show matching local tracks in a few milliseconds and without a
+network connection.
+
+* ``tracks`` holds one row per video URL with the card fields and where the
+  track is known from (``recent``/``favorite`` flags, ``cache_path``);
+* ``tracks_fts`` is an FTS5 table over title + channel sharing ``tracks``'
+  rowids.  If the SQLite build has no FTS5, :func:`search` falls back to a
+  ``LIKE`` scan, which is still fast at library sizes;
+* writers update single rows (:func:`index_recent`, :func:`index_favorite`,
+  :func:`note_cached`, ...); the first open seeds the index from the
+  recent list and favorites.
+
+Rows that are no longer recent, favorite or cached stay in the table but are
+not returned.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from search_cache import normalize_query
+
+LOCAL_INDEX_PATH = "library_index.db"
+MAX_RESULTS = 20
+
+_LOCK = threading.RLock()
+_DB: sqlite3.Connection | None = None
+_HAS_FTS = False
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL DEFAULT '',
+    thumb TEXT NOT NULL DEFAULT '',
+    dur TEXT NOT NULL DEFAULT '',
+    cache_path TEXT NOT NULL DEFAULT '',
+    recent INTEGER NOT NULL DEFAULT 0,
+    favorite INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+def _connect_locked() -> sqlite3.Connection:
+    global _DB, _HAS_FTS
+    if _DB is not None:
+        return _DB
+    fresh = not os.path.exists(LOCAL_INDEX_PATH)
+    db = sqlite3.connect(LOCAL_INDEX_PATH, check_same_thread=False)
+    db.execute(_SCHEMA)
+    try:
+        db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5("
+            "title, channel, tokenize='unicode61 remove_diacritics 2')"
+        )
+        _HAS_FTS = True
+    except sqlite3.OperationalError as exc:
+        print("[LOCAL-INDEX] FTS5 unavailable, using LIKE:", exc)
+        _HAS_FTS = False
+    db.commit()
+    _DB = db
+    if fresh:
+        _seed_locked(db)
+    return db
+
+
+def _seed_locked(db: sqlite3.Connection) -> None:
+    try:
+        from recent_utils import load_favorites, load_recent
+
+        for item in load_favorites():
+            _upsert_locked(db, item, favorite=1)
+        for item in load_recent():
+            _upsert_locked(db, item, recent=1)
+        db.commit()
+        print("[LOCAL-INDEX] seeded from recent/favorites")
+    except Exception as exc:
+        print("[LOCAL-INDEX] seed failed:", exc)
+
+
+def _upsert_locked(
+    db: sqlite3.Connection,
+    item: dict[str, Any],
+    *,
+    recent: int | None = None,
+    favorite: int | None = None,
+    cache_path: str | None = None,
+) -> None:
+    url = str((item or {}).get("url") or "")
+    if not url:
+        return
+    fields = {
+        key: str(item.get(key) or "")
+        for key in ("title", "channel", "thumb", "dur")
+    }
+    if cache_path is None and item.get("cache_path"):
+        cache_path = str(item.get("cache_path"))
+    row = db.execute(
+        "SELECT id, title, channel, thumb, dur, cache_path, recent, favorite FROM tracks WHERE url = ?",
+        (url,),
+    ).fetchone()
+    if row is None:
+        cur = db.execute(
+            "INSERT INTO tracks (url, title, channel, thumb, dur, cache_path, recent, favorite, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                url, fields["title"], fields["channel"], fields["thumb"], fields["dur"],
+                cache_path or "", recent or 0, favorite or 0, time.time(),
+            ),
+        )
+        rowid = cur.lastrowid
+        title, channel = fields["title"], fields["channel"]
+    else:
+        rowid = row[0]
+        # Empty fields never overwrite metadata learned from another source.
+        title = fields["title"] or row[1]
+        channel = fields["channel"] or row[2]
+        db.execute(
+            "UPDATE tracks SET title = ?, channel = ?, thumb = ?, dur = ?, cache_path = ?,"
+            " recent = ?, favorite = ?, updated_at = ? WHERE id = ?",
+            (
+                title, channel, fields["thumb"] or row[3], fields["dur"] or row[4],
+                row[5] if cache_path is None else cache_path,
+                row[6] if recent is None else recent,
+                row[7] if favorite is None else favorite,
+                time.time(), rowid,
+            ),
+        )
+        if title == row[1] and channel == row[2]:
+            return
+    if _HAS_FTS:
+        db.execute("DELETE FROM tracks_fts WHERE rowid = ?", (rowid,))
+        db.execute(
+            "INSERT INTO tracks_fts (rowid, title, channel) VALUES (?, ?, ?)",
+            (rowid, title, channel),
+        )
+
+
+def _write(fn, *args, **kwargs) -> None:
+    with _LOCK:
+        try:
+            db = _connect_locked()
+            with db:
+                fn(db, *args, **kwargs)
+        except Exception as exc:
+            print("[LOCAL-INDEX] write failed:", exc)
+
+
+def _index_recent_locked(db: sqlite3.Connection, items: list[dict]) -> None:
+    urls = [str((item or {}).get("url") or "") for item in items or []]
+    db.execute(
+        f"UPDATE tracks SET recent = 0 WHERE recent = 1 AND url NOT IN ({','.join('?' * len(urls))})",
+        urls,
+    )
+    for item in items or []:
+        _upsert_locked(db, item, recent=1)
+
+
+def index_recent(items: list[dict]) -> None:
+    """Mark exactly *items* as the recent list."""
+    _write(_index_recent_locked, list(items or []))
+
+
+def index_favorite(item: dict) -> None:
+    _write(_upsert_locked, dict(item or {}), favorite=1)
+
+
+def unindex_favorite(url: str) -> None:
+    if url:
+        _write(lambda db: db.execute("UPDATE tracks SET favorite = 0 WHERE url = ?", (url,)))
+
+
+def note_cached(video_url: str, cache_path: str | None, **meta: Any) -> None:
+    """Record (or with ``cache_path=None`` forget) the cached file of a track."""
+    if video_url:
+        item = dict(meta, url=video_url)
+        _write(_upsert_locked, item, cache_path=cache_path or "")
+
+
+def forget_cached_file(path: str) -> None:
+    """A cached file was deleted; tracks pointing at it are no longer cached."""
+    if path:
+        _write(lambda db: db.execute("UPDATE tracks SET cache_path = '' WHERE cache_path = ?", (path,)))
+
+
+def _match_expr(tokens: list[str]) -> str:
+    # Every token must start a word in title or channel; quotes keep FTS
+    # syntax characters in user input literal.
+    return " AND ".join('"{}"*'.format(tok.replace('"', '""')) for tok in tokens)
+
+
+def search(query: str, limit: int = MAX_RESULTS) -> list[tuple[str, str, str, str, str]]:
+    """Local tracks matching *query* as ``(url, title, channel, thumb, dur)``.
+
+    Cached tracks come first, then favorites, then the rest by relevance.
+    """
+    tokens = normalize_query(query).split()
+    if not tokens:
+        return []
+    available = "(t.recent = 1 OR t.favorite = 1 OR t.cache_path != '')"
+    order = "(t.cache_path != '') DESC, t.favorite DESC"
+    with _LOCK:
+        try:
+            db = _connect_locked()
+            if _HAS_FTS:
+                rows = db.execute(
+                    "SELECT t.url, t.title, t.channel, t.thumb, t.dur"
+                    " FROM tracks_fts JOIN tracks t ON t.id = tracks_fts.rowid"
+                    f" WHERE tracks_fts MATCH ? AND {available}"
+                    f" ORDER BY {order}, bm25(tracks_fts) LIMIT ?",
+                    (_match_expr(tokens), int(limit)),
+                ).fetchall()
+            else:
+                where = " AND ".join(
+                    "(lower(t.title) LIKE ? OR lower(t.channel) LIKE ?)" for _ in tokens
+                )
+                params: list[Any] = []
+                for tok in tokens:
+                    params += [f"%{tok}%", f"%{tok}%"]
+                rows = db.execute(
+                    "SELECT t.url, t.title, t.channel, t.thumb, t.dur FROM tracks t"
+                    f" WHERE {where} AND {available} ORDER BY {order}, t.updated_at DESC LIMIT ?",
+                    (*params, int(limit)),
+                ).fetchall()
+        except Exception as exc:
+            print("[LOCAL-INDEX] search failed:", exc)
+            return []
+    return [tuple(row) for row in rows]
+
+
+def close() -> None:
+    global _DB
+    with _LOCK:
+        db, _DB = _DB, None
+    if db is not None:
+        db.close()
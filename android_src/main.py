@@ -3,13 +3,8 @@ os.environ["KIVY_AUDIO"] = "sdl2"
 
 import re
 import threading
-
-# ---- kill yt_dlp cache ----
-try:
-    import yt_dlp.cache as ytcache
-    ytcache.store = ytcache.load = ytcache.remove = (lambda *a, **k: None)
-except Exception as e:
-    print("❌ yt_dlp.cache monkey patch failed:", e)
+import time
+from collections import deque
 
 from kivymd.app import MDApp
 from kivy.lang import Builder
@@ -24,6 +19,11 @@ from android.runnable import run_on_ui_thread  # UI calls
 from kivy.app import App
 
 import media_android as ma  # <<< ДОДАНО
+import library_store
+import local_index
+import search_cache
+import search_suggest
+import stage_metrics
 
 from recent_utils import load_recent, save_recent
 from search_utils import load_search_history, save_search_history
@@ -189,6 +189,17 @@ class MarqueeLabel(MDScrollView):
 
 class YoutubeSearchScreen(MDScreen):
     _scroll_bound = False
+    # Після якої частки прокрутки наступна сторінка вантажиться наперед
+    # і скільки сторінок максимум тримати готовими до показу.
+    PREFETCH_AT_FRACTION = 0.6
+    MAX_PAGES_AHEAD = 2
+    # Пауза в наборі, після якої йде запит підказок, і скільки чипів показувати.
+    SUGGEST_DEBOUNCE_SEC = 0.25
+    MAX_SUGGESTION_CHIPS = 8
+    # Карток, що будуються одразу (перший екран), і частка кадру на решту.
+    RESULTS_FIRST_SCREEN = 5
+    RESULTS_FRAME_BUDGET_SEC = 0.008
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._search_query = ""
@@ -196,12 +207,29 @@ class YoutubeSearchScreen(MDScreen):
         self._ytcfg = {}
         self._loading_more = False
         self._scroll_bound = False
+        # token -> (videos, playlists, next_token); лише для поточного запиту
+        self._prefetched_pages = {}
+        self._page_fetch_inflight = set()
+        # Кожне натискання збільшує seq; відповідь старшого запиту відкидається.
+        self._suggester = search_suggest.SuggestDebouncer(
+            self.SUGGEST_DEBOUNCE_SEC,
+            self.show_search_history,
+            schedule=lambda delay, fn: Clock.schedule_once(lambda dt: fn(), delay),
+            deliver=lambda fn: Clock.schedule_once(lambda dt: fn()),
+        )
+        self._suggest_paused = False
+        # Черга ще не доданих карток результатів; gen відсікає старі порції.
+        self._results_render_gen = 0
+        self._results_render_queue = deque()
+        # Збіги з локального індексу для поточного запиту (показуються першими).
+        self._local_hits = []
 
     def on_kv_post(self, base_widget):
         super().on_kv_post(base_widget)
         if not self._scroll_bound:
             try:
                 self.ids.results_scroll.bind(scroll_y=self._on_results_scroll)
+                self.ids.search_input.bind(text=self._on_search_text)
                 self._scroll_bound = True
             except Exception:
                 pass
@@ -209,25 +237,53 @@ class YoutubeSearchScreen(MDScreen):
     def on_pre_enter(self):
         self.show_recent_videos()
         self.ids.search_history_box.clear_widgets()
+        search_suggest.rebuild_history_index(load_search_history())
 
     def set_search_and_run(self, query):
-        self.ids.search_input.text = query
+        self._suggest_paused = True
+        try:
+            self.ids.search_input.text = query
+        finally:
+            self._suggest_paused = False
         self.show_search_history()
         self.perform_search(from_chip=True)
 
-    def show_search_history(self):
+    def _cancel_suggestions(self):
+        self._suggester.cancel()
+
+    def _on_search_text(self, instance, text):
+        if self._suggest_paused:
+            return
+        self._cancel_suggestions()
+        query = str(text or "").strip()
+        if not query:
+            self.ids.search_history_box.clear_widgets()
+            return
+        cached = search_suggest.cached_suggestions(query)
+        # Історія - одразу з індексу; мережеві підказки - після паузи в наборі.
+        self.show_search_history(cached)
+        if cached is None:
+            self._suggester.submit(query)
+
+    def show_search_history(self, suggestions=None):
         box = self.ids.search_history_box
         box.clear_widgets()
         query = self.ids.search_input.text.strip()
-        if not query or self.ids.results_grid.children:
+        if not query:
             return
-        history = [q for q in load_search_history() if q and query.lower() in q.lower()]
-        for q in history:
+        items = search_suggest.history_matches(query, self.MAX_SUGGESTION_CHIPS)
+        for s in suggestions or []:
+            if len(items) >= self.MAX_SUGGESTION_CHIPS:
+                break
+            if s not in items:
+                items.append(s)
+        for q in items:
             chip = MDChip(text=q, icon_left="magnify",
                           on_release=lambda inst, search=q: self.set_search_and_run(search))
             box.add_widget(chip)
 
     def show_recent_videos(self):
+        self._reset_results_render()
         grid = self.ids.results_grid
         grid.clear_widgets()
         recent = load_recent()
@@ -246,16 +302,22 @@ class YoutubeSearchScreen(MDScreen):
                 card.add_widget(box); grid.add_widget(card)
 
     def perform_search(self, from_chip=False):
+        self._cancel_suggestions()
         query = self.ids.search_input.text.strip()
+        self._reset_results_render()
         self.ids.results_grid.clear_widgets(); self.ids.search_history_box.clear_widgets()
         if not query: return
         self._search_query = query
         self._continuation = None
         self._ytcfg = {}
         self._loading_more = False
+        self._prefetched_pages = {}
+        self._page_fetch_inflight = set()
+        self._local_hits = []
         if not from_chip:
             history = [q for q in load_search_history() if q != query]
             history.insert(0, query); save_search_history(history)
+            search_suggest.rebuild_history_index(history)
         threading.Thread(target=self._fetch_results_thread, args=(query,), daemon=True).start()
 
     def _fetch_results_thread(self, query):
@@ -308,51 +370,127 @@ class YoutubeSearchScreen(MDScreen):
                     return
             except Exception:
                 pass
+        # Локальні треки - до мережі: зʼявляються одразу і працюють офлайн.
+        # Той самий потік, тож на UI вони гарантовано прийдуть раніше за мережеві.
+        hits = local_index.search(query)
+        Clock.schedule_once(lambda dt: self._show_local_hits_on_ui(query, hits))
+        cached = search_cache.get_results(query)
+        if cached is not None:
+            # Кеш показуємо одразу; застарілий - оновлюємо у фоні для наступного разу.
+            Clock.schedule_once(lambda dt: self._show_results_on_ui(
+                cached["videos"], cached["playlists"], cached["continuation"], cached["cfg"],
+            ))
+            if not cached["stale"]:
+                return
+            videos, playlists, cont, cfg = fetch_youtube_results(query)
+            search_cache.put_results(query, videos, playlists, cont, cfg)
+            return
         videos, playlists, cont, cfg = fetch_youtube_results(query)
+        search_cache.put_results(query, videos, playlists, cont, cfg)
         Clock.schedule_once(lambda dt: self._show_results_on_ui(videos, playlists, cont, cfg))
 
-    def _render_results(self, grid, videos, playlists, *, add_headers: bool):
+    def _render_results(self, grid, videos, playlists, *, add_headers: bool, local=()):
+        builders = []
+        if local:
+            builders.append(lambda: MDLabel(text="На пристрої", halign="left", font_style="Subtitle1"))
+            for item in local:
+                builders.append(partial(self._make_video_card, *item))
         if add_headers and playlists:
-            grid.add_widget(MDLabel(text="Збірки", halign="left", font_style="Subtitle1"))
-        for url, title, channel, thumb, count in playlists:
-            card = MDCard(orientation="horizontal", size_hint_y=None, height="150dp", padding="8dp")
-            card.add_widget(AsyncImage(source=thumb, size_hint=(None, 1), width="180dp"))
-            box = MDBoxLayout(orientation="vertical", spacing="4dp", padding="4dp")
-            title_w = MarqueeLabel(size_hint_y=None, height="40dp")
-            title_w._label.markup = True
-            title_w.set_text(f"[b]{title}[/b]")
-            box.add_widget(title_w)
-            box.add_widget(MDLabel(text=f"{channel} • {count} треків", theme_text_color="Secondary", size_hint_y=None, height="30dp"))
-            btn_box = MDBoxLayout(orientation="horizontal", spacing="8dp", size_hint_y=None, height="40dp")
-            open_btn = MDRaisedButton(text="▶ Відкрити", size_hint=(None, None), size=("100dp","40dp"))
-            open_btn.bind(on_press=lambda inst, u=url, t=title: self.open_playlist(u, t))
-            btn_box.add_widget(open_btn); box.add_widget(btn_box)
-            card.add_widget(box); grid.add_widget(card)
+            builders.append(lambda: MDLabel(text="Збірки", halign="left", font_style="Subtitle1"))
+        for item in playlists:
+            builders.append(partial(self._make_playlist_card, *item))
         if add_headers and videos:
-            grid.add_widget(MDLabel(text="Відео", halign="left", font_style="Subtitle1"))
-        for url, title, channel, thumb, dur in videos:
-            card = MDCard(orientation="horizontal", size_hint_y=None, height="150dp", padding="8dp")
-            card.add_widget(AsyncImage(source=thumb, size_hint=(None, 1), width="180dp"))
-            box = MDBoxLayout(orientation="vertical", spacing="4dp", padding="4dp")
-            title_w = MarqueeLabel(size_hint_y=None, height="40dp")
-            title_w._label.markup = True
-            title_w.set_text(f"[b]{title}[/b]")
-            box.add_widget(title_w)
-            box.add_widget(MDLabel(text=f"{channel} • {dur}", theme_text_color="Secondary", size_hint_y=None, height="30dp"))
-            btn_box = MDBoxLayout(orientation="horizontal", spacing="8dp", size_hint_y=None, height="40dp")
-            play_btn = MDRaisedButton(text="♫ Audio", size_hint=(None, None), size=("100dp","40dp"))
-            play_btn.bind(on_press=partial(self.play_audio, url, title, channel, dur, thumb))
-            btn_box.add_widget(play_btn); box.add_widget(btn_box)
-            card.add_widget(box); grid.add_widget(card)
+            builders.append(lambda: MDLabel(text="Відео", halign="left", font_style="Subtitle1"))
+        for item in videos:
+            builders.append(partial(self._make_video_card, *item))
+        self._queue_result_widgets(grid, builders)
+
+    def _make_playlist_card(self, url, title, channel, thumb, count):
+        card = MDCard(orientation="horizontal", size_hint_y=None, height="150dp", padding="8dp")
+        card.add_widget(AsyncImage(source=thumb, size_hint=(None, 1), width="180dp"))
+        box = MDBoxLayout(orientation="vertical", spacing="4dp", padding="4dp")
+        title_w = MarqueeLabel(size_hint_y=None, height="40dp")
+        title_w._label.markup = True
+        title_w.set_text(f"[b]{title}[/b]")
+        box.add_widget(title_w)
+        box.add_widget(MDLabel(text=f"{channel} • {count} треків", theme_text_color="Secondary", size_hint_y=None, height="30dp"))
+        btn_box = MDBoxLayout(orientation="horizontal", spacing="8dp", size_hint_y=None, height="40dp")
+        open_btn = MDRaisedButton(text="▶ Відкрити", size_hint=(None, None), size=("100dp","40dp"))
+        open_btn.bind(on_press=lambda inst, u=url, t=title: self.open_playlist(u, t))
+        btn_box.add_widget(open_btn); box.add_widget(btn_box)
+        card.add_widget(box)
+        return card
+
+    def _make_video_card(self, url, title, channel, thumb, dur):
+        card = MDCard(orientation="horizontal", size_hint_y=None, height="150dp", padding="8dp")
+        card.add_widget(AsyncImage(source=thumb, size_hint=(None, 1), width="180dp"))
+        box = MDBoxLayout(orientation="vertical", spacing="4dp", padding="4dp")
+        title_w = MarqueeLabel(size_hint_y=None, height="40dp")
+        title_w._label.markup = True
+        title_w.set_text(f"[b]{title}[/b]")
+        box.add_widget(title_w)
+        box.add_widget(MDLabel(text=f"{channel} • {dur}", theme_text_color="Secondary", size_hint_y=None, height="30dp"))
+        btn_box = MDBoxLayout(orientation="horizontal", spacing="8dp", size_hint_y=None, height="40dp")
+        play_btn = MDRaisedButton(text="♫ Audio", size_hint=(None, None), size=("100dp","40dp"))
+        play_btn.bind(on_press=partial(self.play_audio, url, title, channel, dur, thumb))
+        btn_box.add_widget(play_btn); box.add_widget(btn_box)
+        card.add_widget(box)
+        return card
+
+    def _reset_results_render(self):
+        # Недобудовані картки попереднього показу більше не потрібні.
+        self._results_render_gen += 1
+        self._results_render_queue.clear()
+
+    def _queue_result_widgets(self, grid, builders):
+        if not builders:
+            return
+        idle = not self._results_render_queue
+        self._results_render_queue.extend(builders)
+        if idle:
+            # Перший екран будуємо в цьому ж кадрі, решту - порціями.
+            self._drain_results_queue(grid, self._results_render_gen, first_screen=True)
+
+    def _drain_results_queue(self, grid, gen, first_screen=False):
+        if gen != self._results_render_gen:
+            return
+        queue = self._results_render_queue
+        started = time.perf_counter()
+        built = 0
+        try:
+            while queue:
+                if first_screen:
+                    if built >= self.RESULTS_FIRST_SCREEN:
+                        break
+                elif built and time.perf_counter() - started >= self.RESULTS_FRAME_BUDGET_SEC:
+                    break
+                grid.add_widget(queue.popleft()())
+                built += 1
+        except Exception as e:
+            ma.log(f"[SEARCH] render results failed: {e}")
+        if queue:
+            Clock.schedule_once(lambda dt: self._drain_results_queue(grid, gen), 0)
+
+    def _show_local_hits_on_ui(self, query, hits):
+        if query != self._search_query:
+            return
+        self._local_hits = hits
+        if hits:
+            self._render_results(self.ids.results_grid, [], [], add_headers=True, local=hits)
 
     def _show_results_on_ui(self, videos, playlists, continuation=None, cfg=None):
+        self._reset_results_render()
         grid = self.ids.results_grid; grid.clear_widgets()
         self._continuation = continuation
         self._ytcfg = cfg or {}
         self._loading_more = False
-        if not videos and not playlists:
+        local = self._local_hits
+        if local:
+            local_urls = {item[0] for item in local}
+            videos = [v for v in videos if v[0] not in local_urls]
+        if not videos and not playlists and not local:
             grid.add_widget(MDLabel(text="No results found", halign="center")); return
-        self._render_results(grid, videos, playlists, add_headers=True)
+        self._render_results(grid, videos, playlists, add_headers=True, local=local)
 
     def _append_results_on_ui(self, videos, playlists, continuation=None):
         grid = self.ids.results_grid
@@ -360,20 +498,65 @@ class YoutubeSearchScreen(MDScreen):
         self._loading_more = False
         if not videos and not playlists:
             return
-        add_headers = len(grid.children) == 0
+        add_headers = len(grid.children) == 0 and not self._results_render_queue
         self._render_results(grid, videos, playlists, add_headers=add_headers)
 
     def _on_results_scroll(self, scrollview, value):
-        if value > 0.05:
+        if not self._continuation or not self._search_query:
             return
-        if self._loading_more or not self._continuation or not self._search_query:
+        # scroll_y: 1 - верх списку, 0 - низ.
+        if (1.0 - value) >= self.PREFETCH_AT_FRACTION:
+            self._prefetch_pages_ahead()
+        if value > 0.05 or self._loading_more:
             return
         self._loading_more = True
-        threading.Thread(target=self._fetch_more_thread, daemon=True).start()
+        if not self._append_prefetched_page():
+            # Якщо сторінка вже в дорозі - її додасть _on_page_fetched.
+            self._start_page_fetch(self._continuation)
+
+    def _prefetch_pages_ahead(self):
+        token = self._continuation
+        ahead = 0
+        while token and token in self._prefetched_pages:
+            token = self._prefetched_pages[token][2]
+            ahead += 1
+        if token and ahead < self.MAX_PAGES_AHEAD:
+            self._start_page_fetch(token)
+
+    def _start_page_fetch(self, token):
+        if not token or token in self._page_fetch_inflight or token in self._prefetched_pages:
+            return
+        self._page_fetch_inflight.add(token)
+        threading.Thread(
+            target=self._fetch_page_thread,
+            args=(self._search_query, token, dict(self._ytcfg or {})),
+            daemon=True,
+        ).start()
 
-    def _fetch_more_thread(self):
-        videos, playlists, cont = fetch_youtube_continuation(self._continuation, self._ytcfg or {})
-        Clock.schedule_once(lambda dt: self._append_results_on_ui(videos, playlists, cont))
+    def _fetch_page_thread(self, query, token, cfg):
+        cached = search_cache.get_continuation(query, token)
+        if cached is not None:
+            page = cached
+        else:
+            page = fetch_youtube_continuation(token, cfg)
+            search_cache.put_continuation(query, token, *page)
+        Clock.schedule_once(lambda dt: self._on_page_fetched(query, token, page))
+
+    def _on_page_fetched(self, query, token, page):
+        self._page_fetch_inflight.discard(token)
+        if query != self._search_query:
+            return
+        self._prefetched_pages[token] = page
+        if self._loading_more:
+            self._append_prefetched_page()
+
+    def _append_prefetched_page(self) -> bool:
+        page = self._prefetched_pages.pop(self._continuation, None)
+        if page is None:
+            return False
+        videos, playlists, cont = page
+        self._append_results_on_ui(videos, playlists, cont)
+        return True
 
     def open_playlist(
         self,
@@ -410,8 +593,7 @@ class YoutubeSearchScreen(MDScreen):
         already_started=False,
     ):
         try:
-            from yt_dlp import YoutubeDL
-            from ytdlp_helpers import YDLLogger
+            from ytdlp_helpers import YDLLogger, borrow_ydl
             import re
             from urllib.parse import urlparse, parse_qs
 
@@ -492,7 +674,7 @@ class YoutubeSearchScreen(MDScreen):
                 best_len = 0
                 for op in candidates:
                     try:
-                        with YoutubeDL(op) as ydl_mix:
+                        with borrow_ydl(op) as ydl_mix:
                             info_mix = ydl_mix.extract_info(mix_watch_url, download=False)
                         if not isinstance(info_mix, dict):
                             continue
@@ -515,7 +697,7 @@ class YoutubeSearchScreen(MDScreen):
                 'ignoreerrors': True,
                 'playlistend': 250,
             }
-            with YoutubeDL(opts) as ydl:
+            with borrow_ydl(opts) as ydl:
                 info = ydl.extract_info(playlist_url, download=False)
                 entries = info.get('entries') or []
                 playlist_id = _playlist_id_from_url(playlist_url)
@@ -529,7 +711,7 @@ class YoutubeSearchScreen(MDScreen):
                             'ignoreerrors': True,
                             'playlistend': 250,
                         }
-                        with YoutubeDL(opts2) as ydl2:
+                        with borrow_ydl(opts2) as ydl2:
                             info2 = ydl2.extract_info(playlist_url, download=False)
                         if isinstance(info2, dict):
                             info = info2
@@ -1044,6 +1226,12 @@ class YoutubeSearchApp(MDApp):
             pass
         # інші runtime-права
         request_runtime_permissions_safely()
+        # прогріваємо YoutubeDL у фоні, щоб перший трек не платив за конструктор
+        try:
+            from ytdlp_helpers import warm_ydl_pool
+            threading.Thread(target=warm_ydl_pool, daemon=True).start()
+        except Exception:
+            pass
         try:
             ma.bind_intent_router()
         except Exception:
@@ -1064,6 +1252,16 @@ class YoutubeSearchApp(MDApp):
                 root.handle_app_pause()
         except Exception:
             pass
+        try:
+            # Зведення таймінгів екстракції (p50/p90/p99 по етапах) у лог.
+            stage_metrics.dump_summary()
+        except Exception:
+            pass
+        try:
+            # Відкладені зміни бібліотеки - на диск, поки процес ще живий.
+            library_store.flush()
+        except Exception:
+            pass
         return True
 
     def on_resume(self):
@@ -693,6 +693,14 @@ def is_network_available():
     except Exception:
         return False
 
+def is_network_metered():
+    """True on cellular/metered Wi-Fi; False when unknown."""
+    try:
+        cm = activity.getSystemService(Context.CONNECTIVITY_SERVICE)
+        return bool(cm.isActiveNetworkMetered())
+    except Exception:
+        return False
+
 # ===================== MediaPlayer listeners =====================
 
 class OnCompletionListener(PythonJavaClass):
@@ -857,12 +865,16 @@ def _mp_set_volume(vol: float):
 
 
 @run_on_ui_thread
-def _mp_seek_to(ms):
+def _mp_seek_to(ms, exact=False):
+    """exact=True: кадр саме на ms (SEEK_CLOSEST, API 26+), а не на sync-кадр перед ним."""
     global android_player, _mp_prepared
     if android_player and _mp_prepared:
         try:
-            android_player.seekTo(int(ms))
-            vlog(f"[MP] seekTo {ms}ms")
+            if exact and Build_VERSION.SDK_INT >= 26:
+                android_player.seekTo(int(ms), MediaPlayer.SEEK_CLOSEST)
+            else:
+                android_player.seekTo(int(ms))
+            vlog(f"[MP] seekTo {ms}ms exact={exact}")
         except Exception as e:
             log(f"[MP] seek err: {e}")
     else:
@@ -0,0 +1,246 @@
+"""Byte budgets and LRU eviction for the on-disk media caches.
+
+The audio, art and video caches are plain directories of ``<md5 key>.<ext>``
+files that used to grow without bound.  Each directory is registered here
+under a name with a byte budget (``PYMUSIC_CACHE_<NAME>_MB`` overrides the
+default); a background thread keeps every cache under its budget:
+
+* the last access of a file is its mtime - :func:`touch` bumps it whenever a
+  cached file is reused, so eviction order is least recently used first;
+* a resumable download's ``.part`` and ``.part.meta`` are evicted together;
+* keys returned by the pin provider (favorites, the current queue) are never
+  evicted, nor are files written in the last ``BUSY_GRACE_SEC`` (downloads in
+  progress);
+* enforcement runs every ``ENFORCE_INTERVAL_SEC`` and shortly after
+  :func:`note_added` reports a new file.
+
+:func:`usage_report` returns per-cache usage for logs and settings screens.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable
+
+DEFAULT_BUDGETS_MB = {"audio": 1024, "art": 64, "video": 512}
+ENFORCE_INTERVAL_SEC = 10 * 60
+# Let startup and the first track settle before the first sweep.
+_FIRST_SWEEP_DELAY_SEC = 30.0
+_AFTER_ADD_DELAY_SEC = 5.0
+BUSY_GRACE_SEC = 60.0
+
+_LOCK = threading.RLock()
+_WAKE = threading.Event()
+_CACHES: dict[str, dict[str, Any]] = {}
+_PIN_PROVIDER: Any = None
+_SWEEPER: threading.Thread | None = None
+_NEXT_SWEEP = 0.0
+_STATS = {"evicted_files": 0, "evicted_bytes": 0, "sweeps": 0}
+
+
+def _budget_bytes(name: str) -> int:
+    default = DEFAULT_BUDGETS_MB.get(name, 256)
+    try:
+        mb = float(os.environ.get(f"PYMUSIC_CACHE_{name.upper()}_MB", "") or default)
+    except ValueError:
+        mb = default
+    return max(0, int(mb * 1024 * 1024))
+
+
+def register(
+    name: str,
+    directory: str,
+    *,
+    on_evict: Callable[[str], None] | None = None,
+) -> None:
+    """Put *directory* under the ``name`` budget; cheap to call repeatedly."""
+    if not directory:
+        return
+    with _LOCK:
+        entry = _CACHES.get(name)
+        if entry is not None and entry["dir"] == directory:
+            return
+        _CACHES[name] = {
+            "dir": directory,
+            "budget": _budget_bytes(name),
+            "on_evict": on_evict,
+        }
+        print(f"[MEDIA-CACHE] {name} -> {directory} budget={_CACHES[name]['budget'] // (1024 * 1024)}MB")
+    _ensure_sweeper(_FIRST_SWEEP_DELAY_SEC)
+
+
+def set_pin_provider(fn: Callable[[], set[str]]) -> None:
+    """``fn()`` returns file keys (name before the first dot) never to evict.
+
+    Bound methods are held weakly so the provider does not keep a screen alive.
+    """
+    global _PIN_PROVIDER
+    with _LOCK:
+        _PIN_PROVIDER = weakref.WeakMethod(fn) if hasattr(fn, "__self__") else (lambda: fn)
+
+
+def touch(path: str | None) -> None:
+    """Record an access to a cached file."""
+    if not path:
+        return
+    try:
+        os.utime(path, None)
+    except Exception:
+        pass
+
+
+def note_added(name: str) -> None:
+    """A file was added to cache *name*; sweep soon instead of on schedule."""
+    if name in _CACHES:
+        _ensure_sweeper(_AFTER_ADD_DELAY_SEC)
+
+
+def _pinned_keys() -> set[str]:
+    with _LOCK:
+        ref = _PIN_PROVIDER
+    fn = ref() if ref is not None else None
+    if fn is None:
+        return set()
+    try:
+        return {str(key) for key in (fn() or ()) if key}
+    except Exception as exc:
+        print("[MEDIA-CACHE] pin provider failed:", exc)
+        return set()
+
+
+def _scan(directory: str) -> list[tuple[str, int, float]]:
+    files: list[tuple[str, int, float]] = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        files.append((entry.path, st.st_size, st.st_mtime))
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return files
+
+
+def _key_of(path: str) -> str:
+    return os.path.basename(path).split(".", 1)[0]
+
+
+def _units(files: list[tuple[str, int, float]]) -> list[tuple[str, list[str], int, float]]:
+    """Group files into eviction units ``(path, files, size, last_access)``.
+
+    A resumable download's ``.part`` and ``.part.meta`` are one unit: evicting
+    only one of them would drop the resume state or orphan the metadata.
+    """
+    units: dict[str, list[Any]] = {}
+    for path, size, mtime in files:
+        base = path[: -len(".meta")] if path.endswith(".part.meta") else path
+        unit = units.setdefault(base, [base, [], 0, 0.0])
+        unit[1].append(path)
+        unit[2] += size
+        unit[3] = max(unit[3], mtime)
+    return [(base, paths, size, mtime) for base, paths, size, mtime in units.values()]
+
+
+def enforce(name: str | None = None) -> dict[str, int]:
+    """Evict LRU files until each cache fits its budget; returns bytes freed."""
+    with _LOCK:
+        caches = {n: dict(c) for n, c in _CACHES.items() if name is None or n == name}
+    pinned = _pinned_keys()
+    now = time.time()
+    freed: dict[str, int] = {}
+    for cache_name, cache in caches.items():
+        files = _scan(cache["dir"])
+        total = sum(size for _path, size, _mtime in files)
+        budget = cache["budget"]
+        freed[cache_name] = 0
+        if total <= budget:
+            continue
+        for path, paths, size, mtime in sorted(_units(files), key=lambda u: u[3]):
+            if total <= budget:
+                break
+            if _key_of(path) in pinned or now - mtime < BUSY_GRACE_SEC:
+                continue
+            removed = 0
+            for member in paths:
+                try:
+                    os.remove(member)
+                except FileNotFoundError:
+                    pass
+                except Exception as exc:
+                    print(f"[MEDIA-CACHE] evict failed {member}: {exc}")
+                    continue
+                removed += 1
+            if not removed:
+                continue
+            total -= size
+            freed[cache_name] += size
+            with _LOCK:
+                _STATS["evicted_files"] += removed
+                _STATS["evicted_bytes"] += size
+            if callable(cache["on_evict"]):
+                try:
+                    cache["on_evict"](path)
+                except Exception as exc:
+                    print(f"[MEDIA-CACHE] on_evict failed {path}: {exc}")
+        if freed[cache_name]:
+            print(
+                f"[MEDIA-CACHE] {cache_name}: freed {freed[cache_name] // 1024}KB, "
+                f"now {total // 1024}KB of {budget // 1024}KB"
+            )
+    with _LOCK:
+        _STATS["sweeps"] += 1
+    return freed
+
+
+def usage_report() -> dict[str, Any]:
+    """``{cache: {dir, bytes, files, budget, pinned_bytes}, "stats": {...}}``."""
+    with _LOCK:
+        caches = {n: dict(c) for n, c in _CACHES.items()}
+        report: dict[str, Any] = {"stats": dict(_STATS)}
+    pinned = _pinned_keys()
+    for cache_name, cache in caches.items():
+        files = _scan(cache["dir"])
+        report[cache_name] = {
+            "dir": cache["dir"],
+            "bytes": sum(size for _path, size, _mtime in files),
+            "files": len(files),
+            "budget": cache["budget"],
+            "pinned_bytes": sum(size for path, size, _mtime in files if _key_of(path) in pinned),
+        }
+    return report
+
+
+def _sweep_loop() -> None:
+    global _NEXT_SWEEP
+    while True:
+        with _LOCK:
+            delay = _NEXT_SWEEP - time.monotonic()
+        if delay > 0:
+            _WAKE.wait(delay)
+            _WAKE.clear()
+            continue
+        with _LOCK:
+            _NEXT_SWEEP = time.monotonic() + ENFORCE_INTERVAL_SEC
+        try:
+            enforce()
+        except Exception as exc:
+            print("[MEDIA-CACHE] sweep failed:", exc)
+
+
+def _ensure_sweeper(delay: float) -> None:
+    global _SWEEPER, _NEXT_SWEEP
+    with _LOCK:
+        due = time.monotonic() + delay
+        if _SWEEPER is None:
+            _NEXT_SWEEP = due
+            _SWEEPER = threading.Thread(target=_sweep_loop, name="pymusic-media-cache", daemon=True)
+            _SWEEPER.start()
+            return
+        if due < _NEXT_SWEEP:
+            _NEXT_SWEEP = due
+            _WAKE.set()
@@ -0,0 +1,263 @@
+"""Keep the upcoming part of the play queue resolved ahead of time.
+
+The player used to resolve only the single next track, on a fresh thread per
+call.  This resolver keeps a look-ahead window - the next
+``PYMUSIC_QUEUE_LOOKAHEAD`` tracks of the playlist plus the repeat successor
+(the current track itself while repeat is on) - resolved and fresh in the
+persistent stream cache, so skipping several tracks in a row starts each one
+from a cached URL instead of a new extraction.
+
+* resolves run on a small shared pool (``PYMUSIC_QUEUE_WORKERS``) and are
+  de-duplicated per URL; a queued job whose track left the window by the time
+  a worker picks it up is dropped;
+* extractions towards the same host are spaced at least
+  ``PYMUSIC_QUEUE_HOST_INTERVAL`` seconds apart;
+* one refresher thread sleeps until the earliest window entry gets close to
+  its ``expire`` time and re-resolves it before it goes stale.
+
+Only URLs are resolved; downloading whole files would compete with the current
+stream for bandwidth.  Call :func:`sync` whenever the current track, the
+playlist or the repeat mode changes.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import urlparse
+
+import stream_cache
+
+# Re-resolve an entry once less than this is left; stays ahead of the stream
+# cache's own revalidate-on-read window.
+REFRESH_BEFORE_SEC = 35 * 60
+# Give the current track's prepare/start a head start on the network.
+_START_DELAY_SEC = 0.35
+_MIN_REFRESH_SLEEP_SEC = 5.0
+_MAX_REFRESH_SLEEP_SEC = 10 * 60
+
+_LOCK = threading.RLock()
+_WAKE = threading.Event()
+_POOL: ThreadPoolExecutor | None = None
+_REFRESHER: threading.Thread | None = None
+_SCREEN_REF: Any = None
+_WINDOW: list[str] = []
+_INFLIGHT: set[str] = set()
+_HOST_NEXT: dict[str, float] = {}
+_STATS = {"resolved": 0, "refreshed": 0, "dropped": 0, "failed": 0}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, str(default)) or default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, str(default)) or default))
+    except ValueError:
+        return default
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(
+                max_workers=_env_int("PYMUSIC_QUEUE_WORKERS", 2),
+                thread_name_prefix="pymusic-queue-resolve",
+            )
+        return _POOL
+
+
+def queue_window(screen: Any, lookahead: int | None = None) -> list[str]:
+    """Track URLs that may start next, nearest first."""
+    if lookahead is None:
+        lookahead = _env_int("PYMUSIC_QUEUE_LOOKAHEAD", 3)
+    current = str(getattr(screen, "_last_video_url", "") or "")
+    urls: list[str] = []
+    if current and bool(getattr(screen, "repeat", False)):
+        # Repeat-one restarts the same track from its cached URL.
+        urls.append(current)
+
+    playlist = getattr(screen, "playlist", None)
+    tracks = getattr(playlist, "tracks", None) if playlist else None
+    if tracks and len(tracks) > 1:
+        try:
+            index = int(getattr(playlist, "index", 0) or 0)
+        except Exception:
+            index = 0
+        for step in range(1, min(lookahead, len(tracks) - 1) + 1):
+            item = tracks[(index + step) % len(tracks)] or {}
+            url = str(item.get("url") or "")
+            if url and url != current and url not in urls:
+                urls.append(url)
+    return urls
+
+
+def _needs_resolve(url: str) -> bool:
+    remaining = stream_cache.expires_in(url, "audio")
+    return remaining is None or remaining <= REFRESH_BEFORE_SEC
+
+
+def _host_of(url: str) -> str:
+    try:
+        return (urlparse(url).netloc or "").lower() or "youtube"
+    except Exception:
+        return "youtube"
+
+
+def _throttle(host: str) -> None:
+    interval = _env_float("PYMUSIC_QUEUE_HOST_INTERVAL", 1.0)
+    with _LOCK:
+        now = time.monotonic()
+        slot = max(now, _HOST_NEXT.get(host, 0.0))
+        _HOST_NEXT[host] = slot + interval
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def _current_screen() -> Any:
+    with _LOCK:
+        return _SCREEN_REF() if _SCREEN_REF is not None else None
+
+
+def _in_window(url: str) -> bool:
+    with _LOCK:
+        return url in _WINDOW
+
+
+def _resolve(url: str) -> None:
+    try:
+        time.sleep(_START_DELAY_SEC)
+        if not _in_window(url) or not _needs_resolve(url):
+            with _LOCK:
+                _STATS["dropped"] += 1
+            return
+        _throttle(_host_of(url))
+        screen = _current_screen()
+        if screen is None or not _in_window(url):
+            with _LOCK:
+                _STATS["dropped"] += 1
+            return
+
+        import ytdlp_helpers as ydlh
+
+        refresh = stream_cache.expires_in(url, "audio") is not None
+        if refresh:
+            # The bundle cache still holds the info behind the expiring URL.
+            ydlh.invalidate_video_bundle(url)
+        try:
+            info = ydlh.extract_audio_info(
+                url,
+                prefer_compat=bool(getattr(screen, "_prefer_compat_audio", False)),
+            )
+        except TypeError:
+            info = ydlh.extract_audio_info(url)
+
+        audio_url = str((info or {}).get("audio_url") or "")
+        if not audio_url:
+            raise RuntimeError("no audio url")
+        screen._put_cache(
+            url,
+            audio_url,
+            dict((info or {}).get("http_headers") or {}),
+            (info or {}).get("expire_ts"),
+        )
+        with _LOCK:
+            _STATS["refreshed" if refresh else "resolved"] += 1
+        print(f"[QUEUE] {'refreshed' if refresh else 'resolved'} {url}")
+    except Exception as exc:
+        with _LOCK:
+            _STATS["failed"] += 1
+        print(f"[QUEUE] resolve failed {url}: {exc}")
+    finally:
+        with _LOCK:
+            _INFLIGHT.discard(url)
+
+
+def _submit(url: str) -> bool:
+    if not _needs_resolve(url):
+        return False
+    with _LOCK:
+        if url in _INFLIGHT:
+            return False
+        _INFLIGHT.add(url)
+    try:
+        _pool().submit(_resolve, url)
+    except Exception as exc:
+        with _LOCK:
+            _INFLIGHT.discard(url)
+        print("[QUEUE] submit failed:", exc)
+        return False
+    return True
+
+
+def _next_refresh_in(window: list[str]) -> float:
+    due = _MAX_REFRESH_SLEEP_SEC
+    for url in window:
+        remaining = stream_cache.expires_in(url, "audio")
+        if remaining is not None:
+            due = min(due, remaining - REFRESH_BEFORE_SEC)
+    return min(_MAX_REFRESH_SLEEP_SEC, max(_MIN_REFRESH_SLEEP_SEC, due))
+
+
+def _refresh_loop() -> None:
+    global _REFRESHER
+    while True:
+        with _LOCK:
+            window = list(_WINDOW)
+            if not window or _current_screen() is None:
+                _REFRESHER = None
+                return
+        _WAKE.wait(_next_refresh_in(window))
+        _WAKE.clear()
+        with _LOCK:
+            window = list(_WINDOW)
+        for url in window:
+            _submit(url)
+
+
+def _ensure_refresher() -> None:
+    global _REFRESHER
+    with _LOCK:
+        if _REFRESHER is not None:
+            return
+        _REFRESHER = threading.Thread(
+            target=_refresh_loop,
+            name="pymusic-queue-refresh",
+            daemon=True,
+        )
+        _REFRESHER.start()
+
+
+def sync(screen: Any) -> list[str]:
+    """Retarget the resolver at *screen*'s current queue; returns the window."""
+    global _SCREEN_REF, _WINDOW
+    try:
+        window = queue_window(screen)
+    except Exception as exc:
+        print("[QUEUE] window failed:", exc)
+        return []
+    with _LOCK:
+        _SCREEN_REF = weakref.ref(screen)
+        _WINDOW = window
+    for url in window:
+        _submit(url)
+    if window:
+        _ensure_refresher()
+        _WAKE.set()
+    return window
+
+
+def stats() -> dict[str, Any]:
+    with _LOCK:
+        result: dict[str, Any] = dict(_STATS)
+        result["window"] = list(_WINDOW)
+        result["inflight"] = len(_INFLIGHT)
+    return result
@@ -1,10 +1,11 @@
 # recent_utils.py
 
-import os
-import json
 import threading
 import time
 
+import library_store
+import local_index
+
 # AudioPlayerScreen imports this module while its class is still being defined.
 # Patch modules therefore poll sys.modules until the class exists.  Keep the
 # patch chain intentionally small: aggressive AV synchronizers used to seek
@@ -59,84 +60,78 @@ except Exception as _hotfix_error:
     print("[HOTFIX] loader failed:", _hotfix_error)
 
 
-RECENT_PATH = "recent.json"
-FAVORITES_PATH = "favorites.json"
+# Списки живуть у library_store (SQLite); тут лише старі сигнатури.
 MAX_RECENT = 10
 
 
 def load_recent():
-    if os.path.exists(RECENT_PATH):
-        try:
-            with open(RECENT_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
+    try:
+        return library_store.items("recent", MAX_RECENT)
+    except Exception as e:
+        print("[RECENT] Error loading recent list:", e)
+        return []
+
+
+def get_recent(url: str, *, same_video: bool = False):
+    """Запис recent для url (індексований пошук) або None.
+
+    same_video=True - підійде запис того ж відео з іншим url (для кешу/обкладинки).
+    """
+    try:
+        return library_store.get_item("recent", url, same_video=same_video)
+    except Exception as e:
+        print("[RECENT] Error reading recent item:", e)
+        return None
 
 
 def save_recent(recent_list):
     try:
-        with open(RECENT_PATH, "w", encoding="utf-8") as f:
-            json.dump(recent_list[:MAX_RECENT], f, ensure_ascii=False)
+        library_store.replace_items("recent", recent_list, MAX_RECENT)
     except Exception as e:
         print("[RECENT] Error saving recent list:", e)
+    local_index.index_recent(recent_list[:MAX_RECENT])
 
 
 def update_recent_cache(url: str, cache_path: str | None):
     if not url:
         return
     try:
-        recent = load_recent()
-        updated = False
-        for r in recent:
-            if r.get("url") == url:
-                if cache_path:
-                    r["cache_path"] = cache_path
-                else:
-                    r.pop("cache_path", None)
-                updated = True
-                break
-        if updated:
-            save_recent(recent)
+        library_store.update_item("recent", url, cache_path=cache_path or None)
     except Exception as e:
         print("[RECENT] Error updating cache path:", e)
+    if not cache_path:
+        # Нові файли індексує сам завантажувач разом з назвою/каналом.
+        local_index.note_cached(url, None)
 
 
 def update_recent_art(url: str, art_path: str | None):
     if not url:
         return
     try:
-        recent = load_recent()
-        updated = False
-        for r in recent:
-            if r.get("url") == url:
-                if art_path:
-                    r["art_path"] = art_path
-                else:
-                    r.pop("art_path", None)
-                updated = True
-                break
-        if updated:
-            save_recent(recent)
+        library_store.update_item("recent", url, art_path=art_path or None)
     except Exception as e:
         print("[RECENT] Error updating art path:", e)
 
 
 def load_favorites():
-    if os.path.exists(FAVORITES_PATH):
-        try:
-            with open(FAVORITES_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else []
-        except Exception:
-            return []
-    return []
+    try:
+        return library_store.items("favorites")
+    except Exception as e:
+        print("[FAV] Error loading favorites:", e)
+        return []
+
+
+def get_favorite(url: str):
+    try:
+        return library_store.get_item("favorites", url)
+    except Exception as e:
+        print("[FAV] Error reading favorite:", e)
+        return None
 
 
 def save_favorites(items):
     try:
-        with open(FAVORITES_PATH, "w", encoding="utf-8") as f:
-            json.dump(items, f, ensure_ascii=False)
+        library_store.replace_items("favorites", items)
     except Exception as e:
         print("[FAV] Error saving favorites:", e)
 
@@ -145,50 +140,39 @@ def is_favorite(url: str) -> bool:
     if not url:
         return False
     try:
-        for it in load_favorites():
-            if it.get("url") == url:
-                return True
+        return library_store.get_item("favorites", url) is not None
     except Exception:
-        pass
-    return False
+        return False
 
 
 def upsert_favorite(item: dict):
     url = str((item or {}).get("url") or "")
     if not url:
         return
-    favs = load_favorites()
-    found = False
-    for i, f in enumerate(favs):
-        if f.get("url") == url:
-            favs[i] = dict(favs[i], **item)
-            found = True
-            break
-    if not found:
-        favs.insert(0, dict(item))
-    save_favorites(favs)
+    try:
+        merged = library_store.upsert_item("favorites", dict(item))
+    except Exception as e:
+        print("[FAV] Error saving favorite:", e)
+        return
+    local_index.index_favorite(merged)
 
 
 def remove_favorite(url: str):
     if not url:
         return
-    favs = load_favorites()
-    favs = [f for f in favs if f.get("url") != url]
-    save_favorites(favs)
+    try:
+        library_store.remove_item("favorites", url)
+    except Exception as e:
+        print("[FAV] Error removing favorite:", e)
+    local_index.unindex_favorite(url)
 
 
 def update_favorite_cache(url: str, cache_path: str | None):
     if not url:
         return
-    favs = load_favorites()
-    updated = False
-    for f in favs:
-        if f.get("url") == url:
-            if cache_path:
-                f["cache_path"] = cache_path
-            else:
-                f.pop("cache_path", None)
-            updated = True
-            break
-    if updated:
-        save_favorites(favs)
+    try:
+        library_store.update_item("favorites", url, cache_path=cache_path or None)
+    except Exception as e:
+        print("[FAV] Error updating cache path:", e)
+    if not cache_path:
+        local_index.note_cached(url, None)
@@ -9,13 +9,17 @@ The watch page's ``ytInitialData`` is retained only as a same-page fallback.
 
 import copy
 import html
-import json
 import re
 import urllib.parse
 from typing import Any
 
 import httpx
 
+import http_transport
+import innertube_config
+import stage_metrics
+import yt_json
+
 _DESKTOP_UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -82,41 +86,6 @@ def _video_id(value: str) -> str:
     return match.group(1) if match else ""
 
 
-def _json_after(text: str, marker: str) -> Any | None:
-    """Read one balanced JSON object immediately following *marker*."""
-    try:
-        position = text.find(marker)
-        if position < 0:
-            return None
-        start = text.find("{", position + len(marker))
-        if start < 0:
-            return None
-        depth = 0
-        in_string = False
-        escaped = False
-        for index in range(start, len(text)):
-            char = text[index]
-            if in_string:
-                if escaped:
-                    escaped = False
-                elif char == "\\":
-                    escaped = True
-                elif char == '"':
-                    in_string = False
-                continue
-            if char == '"':
-                in_string = True
-            elif char == "{":
-                depth += 1
-            elif char == "}":
-                depth -= 1
-                if depth == 0:
-                    return json.loads(text[start : index + 1])
-    except Exception:
-        pass
-    return None
-
-
 def _text(node: Any) -> str:
     if isinstance(node, str):
         return html.unescape(node)
@@ -469,10 +438,11 @@ def _headers_for(profile: dict[str, Any]) -> dict[str, str]:
 
 
 def _watch_bootstrap(
-    client: httpx.Client,
+    headers: dict[str, str],
     video_id: str,
+    timeout: httpx.Timeout,
 ) -> tuple[dict[str, Any], dict[str, Any] | None, str]:
-    """Return (ytcfg, ytInitialData, raw_text) from the same watch page."""
+    """Return (ytcfg, ytInitialData, text read up to the end of both)."""
     url = "https://www.youtube.com/watch?" + urllib.parse.urlencode(
         {
             "v": video_id,
@@ -481,22 +451,15 @@ def _watch_bootstrap(
             "persist_hl": "1",
         }
     )
-    response = client.get(url)
-    response.raise_for_status()
-    text = response.text
-
-    ytcfg = _json_after(text, "ytcfg.set(") or {}
-    initial = None
-    for marker in (
-        "var ytInitialData =",
-        "ytInitialData =",
-        'window["ytInitialData"] =',
-        "window['ytInitialData'] =",
-    ):
-        initial = _json_after(text, marker)
-        if initial:
-            break
-    return ytcfg, initial, text
+    # Stream the page and stop once ytcfg and ytInitialData have closed;
+    # the rest of the document is never downloaded.
+    with http_transport.stream("GET", url, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        found, text = yt_json.scan_stream(
+            response.iter_bytes(),
+            {"ytcfg": yt_json.YTCFG_MARKERS, "initial": yt_json.INITIAL_DATA_MARKERS},
+        )
+    return found.get("ytcfg") or {}, found.get("initial") or None, text
 
 
 def _merge_page_config(
@@ -533,77 +496,112 @@ def _merge_page_config(
     return context, visitor, api_key
 
 
-def _fetch_next_for_profile(
+def _next_request(
     profile: dict[str, Any],
+    headers: dict[str, str],
+    ytcfg: dict[str, Any],
     video_id: str,
     limit: int,
-) -> list[dict[str, Any]]:
-    headers = _headers_for(profile)
-    timeout = httpx.Timeout(9.0, connect=7.0)
+    timeout: httpx.Timeout,
+) -> tuple[list[dict[str, Any]], bool]:
+    """POST youtubei/v1/next; returns (items, rejected by YouTube)."""
+    context, visitor, api_key = _merge_page_config(profile, ytcfg)
+    client_info = context.get("client") or {}
+    version = str(client_info.get("clientVersion") or "")
+    name = str(profile.get("name") or "")
+
+    api_headers = dict(headers)
+    api_headers["X-YouTube-Client-Version"] = version
+    if visitor:
+        api_headers["X-Goog-Visitor-Id"] = visitor
 
-    with httpx.Client(
-        headers=headers,
-        timeout=timeout,
-        follow_redirects=True,
-    ) as client:
-        ytcfg: dict[str, Any] = {}
-        initial: dict[str, Any] | None = None
-        try:
-            ytcfg, initial, _text_raw = _watch_bootstrap(client, video_id)
-        except Exception as exc:
-            print(
-                f"[RELATED] {profile.get('name')} watch bootstrap failed: {exc}"
-            )
+    payload = {
+        "context": context,
+        "videoId": video_id,
+        "contentCheckOk": True,
+        "racyCheckOk": True,
+    }
 
-        context, visitor, api_key = _merge_page_config(profile, ytcfg)
-        client_info = context.get("client") or {}
-        version = str(client_info.get("clientVersion") or "")
+    endpoint = (
+        f"https://{profile.get('host') or 'www.youtube.com'}"
+        "/youtubei/v1/next?prettyPrint=false"
+    )
+    if api_key:
+        endpoint += "&" + urllib.parse.urlencode({"key": api_key})
 
-        api_headers = dict(headers)
-        api_headers["X-YouTube-Client-Version"] = version
-        if visitor:
-            api_headers["X-Goog-Visitor-Id"] = visitor
+    try:
+        with stage_metrics.span("related.next_api", video_id=video_id, client=name) as sp:
+            response = http_transport.post(
+                endpoint, headers=api_headers, json=payload, timeout=timeout,
+            )
+            if response.status_code in (400, 401, 403):
+                sp.outcome = "rejected"
+                print(
+                    f"[RELATED] {name} youtubei/next rejected config "
+                    f"({response.status_code})"
+                )
+                return [], True
+            response.raise_for_status()
+            data = response.json()
+            items = _items_from_watch_data(data, video_id, limit)
+            sp.outcome = "ok" if items else "empty"
+        print(
+            "[RELATED] YouTube watch-next "
+            f"client={name} version={version} "
+            f"returned={len(items)}"
+        )
+        return items, False
+    except Exception as exc:
+        print(
+            f"[RELATED] {name} youtubei/next failed: {exc}"
+        )
+    return [], False
 
-        payload = {
-            "context": context,
-            "videoId": video_id,
-            "contentCheckOk": True,
-            "racyCheckOk": True,
-        }
 
-        endpoint = (
-            f"https://{profile.get('host') or 'www.youtube.com'}"
-            "/youtubei/v1/next?prettyPrint=false"
+def _fetch_next_for_profile(
+    profile: dict[str, Any],
+    video_id: str,
+    limit: int,
+) -> list[dict[str, Any]]:
+    headers = _headers_for(profile)
+    timeout = httpx.Timeout(9.0, connect=7.0)
+    name = str(profile.get("name") or "")
+    client_name = str(((profile.get("context") or {}).get("client") or {}).get("clientName") or "")
+
+    # A warm config store already has the key and visitorData the watch page
+    # would provide, so go straight to youtubei/next.
+    stored = innertube_config.get(client_name)
+    if stored:
+        items, rejected = _next_request(profile, headers, stored, video_id, limit, timeout)
+        if items:
+            return items
+        if rejected:
+            innertube_config.invalidate(client_name, f"(watch-next rejected {name} config)")
+
+    ytcfg: dict[str, Any] = {}
+    initial: dict[str, Any] | None = None
+    try:
+        with stage_metrics.span("related.bootstrap", video_id=video_id, client=name):
+            ytcfg, initial, _text_raw = _watch_bootstrap(headers, video_id, timeout)
+        innertube_config.remember_ytcfg(ytcfg)
+    except Exception as exc:
+        print(
+            f"[RELATED] {profile.get('name')} watch bootstrap failed: {exc}"
         )
-        if api_key:
-            endpoint += "&" + urllib.parse.urlencode({"key": api_key})
 
-        try:
-            response = client.post(endpoint, headers=api_headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            items = _items_from_watch_data(data, video_id, limit)
-            print(
-                "[RELATED] YouTube watch-next "
-                f"client={profile.get('name')} version={version} "
-                f"returned={len(items)}"
-            )
-            if items:
-                return items
-        except Exception as exc:
-            print(
-                f"[RELATED] {profile.get('name')} youtubei/next failed: {exc}"
-            )
+    items, _rejected = _next_request(profile, headers, ytcfg, video_id, limit, timeout)
+    if items:
+        return items
 
-        # Same YouTube watch page, not search. This keeps the semantics exact
-        # even when the next endpoint changes temporarily.
-        if initial:
-            items = _items_from_watch_data(initial, video_id, limit)
-            print(
-                f"[RELATED] {profile.get('name')} ytInitialData returned={len(items)}"
-            )
-            if items:
-                return items
+    # Same YouTube watch page, not search. This keeps the semantics exact
+    # even when the next endpoint changes temporarily.
+    if initial:
+        items = _items_from_watch_data(initial, video_id, limit)
+        print(
+            f"[RELATED] {profile.get('name')} ytInitialData returned={len(items)}"
+        )
+        if items:
+            return items
 
     return []
 
@@ -627,15 +625,18 @@ def fetch_related_videos(
         print("[RELATED] invalid current YouTube URL:", video_url)
         return []
 
-    for profile in _client_profiles():
-        try:
-            items = _fetch_next_for_profile(profile, current_id, limit)
-            if items:
-                return items[:limit]
-        except Exception as exc:
-            print(
-                f"[RELATED] watch-next profile {profile.get('name')} failed: {exc}"
-            )
+    with stage_metrics.span("related.total", video_id=current_id) as total:
+        for profile in _client_profiles():
+            try:
+                items = _fetch_next_for_profile(profile, current_id, limit)
+                if items:
+                    total.client = str(profile.get("name") or "")
+                    return items[:limit]
+            except Exception as exc:
+                print(
+                    f"[RELATED] watch-next profile {profile.get('name')} failed: {exc}"
+                )
+        total.outcome = "empty"
 
     print(
         f"[RELATED] YouTube watch-next returned no related videos for {current_id}"
@@ -0,0 +1,190 @@
+"""Memory + disk cache of YouTube search results.
+
+Entries are keyed by the normalised query (NFKC, case-folded, whitespace
+collapsed) and hold every page fetched for it: the first results page with
+its ytcfg, followed by the continuation pages in scroll order.  Each page
+keeps the parsed videos/playlists and the continuation token that leads to
+the next one, so scrolling through already-seen pages is answered locally.
+
+* a first page younger than ``FRESH_TTL_SEC`` is served as-is; an older one
+  (up to ``MAX_AGE_SEC``) is still served, flagged ``stale`` so the caller
+  can refresh it in the background;
+* at most ``MAX_QUERIES`` queries are kept, least recently used first out,
+  each with up to ``MAX_PAGES`` pages.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any
+
+SEARCH_CACHE_PATH = "search_cache.json"
+MAX_QUERIES = 50
+MAX_PAGES = 10
+FRESH_TTL_SEC = 10 * 60
+MAX_AGE_SEC = 24 * 3600
+
+_LOCK = threading.RLock()
+_ENTRIES: dict[str, dict[str, Any]] | None = None
+
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize("NFKC", str(query or ""))
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def _load_locked() -> dict[str, dict[str, Any]]:
+    global _ENTRIES
+    if _ENTRIES is None:
+        _ENTRIES = {}
+        if os.path.exists(SEARCH_CACHE_PATH):
+            try:
+                with open(SEARCH_CACHE_PATH, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    _ENTRIES = {
+                        str(k): v for k, v in data.items()
+                        if isinstance(v, dict) and v.get("pages")
+                    }
+            except Exception as exc:
+                print("[SEARCH-CACHE] load failed:", exc)
+        _evict_locked(time.time())
+    return _ENTRIES
+
+
+def _save_locked() -> None:
+    tmp_path = f"{SEARCH_CACHE_PATH}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_ENTRIES or {}, f, ensure_ascii=False)
+        os.replace(tmp_path, SEARCH_CACHE_PATH)
+    except Exception as exc:
+        print("[SEARCH-CACHE] save failed:", exc)
+
+
+def _evict_locked(now: float) -> None:
+    entries = _ENTRIES or {}
+    for key in [k for k, e in entries.items() if now - float(e.get("stored_at") or 0) > MAX_AGE_SEC]:
+        entries.pop(key, None)
+    if len(entries) > MAX_QUERIES:
+        by_use = sorted(entries, key=lambda k: float(entries[k].get("used_at") or 0))
+        for key in by_use[: len(entries) - MAX_QUERIES]:
+            entries.pop(key, None)
+
+
+def _page(videos: list, playlists: list, continuation: str | None) -> dict[str, Any]:
+    return {
+        "videos": [list(v) for v in videos or []],
+        "playlists": [list(p) for p in playlists or []],
+        "continuation": continuation or None,
+    }
+
+
+def _unpack(page: dict[str, Any]) -> tuple[list[tuple], list[tuple], str | None]:
+    return (
+        [tuple(v) for v in page.get("videos") or []],
+        [tuple(p) for p in page.get("playlists") or []],
+        page.get("continuation") or None,
+    )
+
+
+def get_results(query: str) -> dict[str, Any] | None:
+    """First page for *query*: ``{videos, playlists, continuation, cfg, stale}``."""
+    key = normalize_query(query)
+    if not key:
+        return None
+    now = time.time()
+    with _LOCK:
+        entry = _load_locked().get(key)
+        if entry is None:
+            return None
+        age = now - float(entry.get("stored_at") or 0)
+        if age > MAX_AGE_SEC:
+            _ENTRIES.pop(key, None)
+            _save_locked()
+            return None
+        entry["used_at"] = now
+        videos, playlists, continuation = _unpack(entry["pages"][0])
+        cfg = dict(entry.get("cfg") or {})
+    return {
+        "videos": videos,
+        "playlists": playlists,
+        "continuation": continuation,
+        "cfg": cfg,
+        "stale": age > FRESH_TTL_SEC,
+    }
+
+
+def put_results(
+    query: str,
+    videos: list,
+    playlists: list,
+    continuation: str | None,
+    cfg: dict | None,
+) -> None:
+    """Store a fresh first page; continuation pages of the old one are dropped
+    because their tokens no longer chain from it."""
+    key = normalize_query(query)
+    if not key or not (videos or playlists):
+        return
+    now = time.time()
+    with _LOCK:
+        entries = _load_locked()
+        entries[key] = {
+            "query": str(query),
+            "pages": [_page(videos, playlists, continuation)],
+            "cfg": dict(cfg or {}),
+            "stored_at": now,
+            "used_at": now,
+        }
+        _evict_locked(now)
+        _save_locked()
+
+
+def get_continuation(query: str, token: str | None) -> tuple[list, list, str | None] | None:
+    """Cached page reached through *token*, as ``(videos, playlists, next_token)``."""
+    if not token:
+        return None
+    with _LOCK:
+        entry = _load_locked().get(normalize_query(query))
+        if entry is None:
+            return None
+        pages = entry["pages"]
+        for index, page in enumerate(pages[:-1]):
+            if page.get("continuation") == token:
+                entry["used_at"] = time.time()
+                return _unpack(pages[index + 1])
+    return None
+
+
+def put_continuation(
+    query: str,
+    token: str | None,
+    videos: list,
+    playlists: list,
+    next_token: str | None,
+) -> None:
+    """Append the page *token* led to, if it extends the cached chain."""
+    if not token or not (videos or playlists):
+        return
+    with _LOCK:
+        entry = _load_locked().get(normalize_query(query))
+        if entry is None:
+            return
+        pages = entry["pages"]
+        if pages[-1].get("continuation") != token or len(pages) >= MAX_PAGES:
+            return
+        pages.append(_page(videos, playlists, next_token))
+        entry["used_at"] = time.time()
+        _save_locked()
+
+
+def clear() -> None:
+    global _ENTRIES
+    with _LOCK:
+        _ENTRIES = {}
+        _save_locked()
@@ -0,0 +1,201 @@
+"""Search-as-you-type suggestions: local history index + YouTube's suggest API.
+
+* :func:`rebuild_history_index` indexes the search history by every word
+  start, so :func:`history_matches` answers a typed prefix with a bisect
+  instead of scanning the history on each keystroke;
+* :func:`fetch_suggestions` asks the suggest endpoint (``SUGGEST_URL``,
+  overridable with ``PYMUSIC_SUGGEST_URL`` to point at a local stub) and
+  caches the answer per normalised prefix for ``CACHE_TTL_SEC``.  A
+  ``cancelled`` callable lets the caller abandon a superseded request: it is
+  checked before the request and while the body streams in;
+* :class:`SuggestDebouncer` sequences keystrokes: a request starts only after
+  a pause in typing, superseded requests are abandoned and their answers
+  dropped.
+
+Nothing here touches Kivy: the screen hands the debouncer ``Clock``-based
+``schedule``/``deliver`` callables.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import http_transport
+from search_cache import normalize_query
+
+SUGGEST_URL = "https://suggestqueries-clients6.youtube.com/complete/search"
+CACHE_TTL_SEC = 10 * 60
+MAX_CACHED_PREFIXES = 200
+REQUEST_TIMEOUT_SEC = 3.0
+
+_LOCK = threading.Lock()
+_CACHE: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+# Sorted (normalised text from a word start, history position, original query).
+_HISTORY_INDEX: list[tuple[str, int, str]] = []
+
+
+def rebuild_history_index(history: list[str]) -> None:
+    index: list[tuple[str, int, str]] = []
+    for position, original in enumerate(history or []):
+        norm = normalize_query(original)
+        if not norm:
+            continue
+        start = 0
+        while start < len(norm):
+            index.append((norm[start:], position, original))
+            space = norm.find(" ", start)
+            if space < 0:
+                break
+            start = space + 1
+    index.sort()
+    with _LOCK:
+        _HISTORY_INDEX[:] = index
+
+
+def history_matches(prefix: str, limit: int = 8) -> list[str]:
+    """History queries with a word starting with *prefix*, most recent first."""
+    key = normalize_query(prefix)
+    if not key:
+        return []
+    with _LOCK:
+        index = _HISTORY_INDEX
+        found: dict[str, int] = {}
+        pos = bisect.bisect_left(index, (key,))
+        while pos < len(index) and index[pos][0].startswith(key):
+            _text, position, original = index[pos]
+            found[original] = min(position, found.get(original, position))
+            pos += 1
+    return sorted(found, key=found.__getitem__)[:limit]
+
+
+def cached_suggestions(prefix: str) -> list[str] | None:
+    key = normalize_query(prefix)
+    with _LOCK:
+        hit = _CACHE.get(key)
+        if hit is None:
+            return None
+        if time.time() - hit[0] > CACHE_TTL_SEC:
+            _CACHE.pop(key, None)
+            return None
+        _CACHE.move_to_end(key)
+        return list(hit[1])
+
+
+def _remember(key: str, suggestions: list[str]) -> None:
+    with _LOCK:
+        _CACHE[key] = (time.time(), list(suggestions))
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > MAX_CACHED_PREFIXES:
+            _CACHE.popitem(last=False)
+
+
+def _parse(text: str) -> list[str]:
+    # client=firefox gives plain JSON; other clients wrap it in a JSONP call.
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return []
+    data = json.loads(text[start:end + 1])
+    items = data[1] if len(data) > 1 and isinstance(data[1], list) else []
+    out = []
+    for item in items:
+        value = item[0] if isinstance(item, list) and item else item
+        if isinstance(value, str) and value.strip():
+            out.append(value.strip())
+    return out
+
+
+def fetch_suggestions(
+    prefix: str,
+    *,
+    cancelled: Callable[[], bool] | None = None,
+    limit: int = 8,
+) -> list[str] | None:
+    """Remote suggestions for *prefix*; None if cancelled or failed."""
+    key = normalize_query(prefix)
+    if not key:
+        return []
+    cached = cached_suggestions(key)
+    if cached is not None:
+        return cached[:limit]
+    if cancelled is not None and cancelled():
+        return None
+    try:
+        with http_transport.stream(
+            "GET",
+            os.environ.get("PYMUSIC_SUGGEST_URL") or SUGGEST_URL,
+            params={"client": "firefox", "ds": "yt", "q": prefix.strip()},
+            timeout=REQUEST_TIMEOUT_SEC,
+        ) as resp:
+            resp.raise_for_status()
+            body = b""
+            for chunk in resp.iter_bytes():
+                if cancelled is not None and cancelled():
+                    return None
+                body += chunk
+            text = body.decode(resp.encoding or "utf-8", errors="replace")
+        suggestions = _parse(text)
+    except Exception as exc:
+        print(f"[SUGGEST] request failed for {key!r}: {exc}")
+        return None
+    _remember(key, suggestions)
+    return suggestions[:limit]
+
+
+class SuggestDebouncer:
+    """Debounced, cancellable remote suggestions for one search box.
+
+    Every :meth:`submit` (a keystroke) and :meth:`cancel` bumps a sequence
+    number.  A request starts only ``delay`` seconds after the last submit,
+    is abandoned mid-flight once superseded, and its answer reaches
+    ``on_result`` only while it is still current.
+
+    ``schedule(delay, fn)`` must return an object with ``cancel()``;
+    ``deliver(fn)`` must run *fn* on the UI thread.
+    """
+
+    def __init__(
+        self,
+        delay: float,
+        on_result: Callable[[list[str]], None],
+        *,
+        schedule: Callable[[float, Callable[[], None]], object],
+        deliver: Callable[[Callable[[], None]], None],
+    ):
+        self.delay = delay
+        self._on_result = on_result
+        self._schedule = schedule
+        self._deliver = deliver
+        self._seq = 0
+        self._pending = None
+
+    def cancel(self) -> None:
+        self._seq += 1
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.cancel()
+
+    def submit(self, query: str) -> None:
+        self.cancel()
+        seq = self._seq
+        self._pending = self._schedule(self.delay, lambda: self._start(seq, query))
+
+    def _start(self, seq: int, query: str) -> None:
+        if seq != self._seq:
+            return
+        self._pending = None
+
+        def job():
+            suggestions = fetch_suggestions(query, cancelled=lambda: seq != self._seq)
+            if suggestions is not None and seq == self._seq:
+                self._deliver(lambda: self._finish(seq, suggestions))
+
+        threading.Thread(target=job, name="pymusic-suggest", daemon=True).start()
+
+    def _finish(self, seq: int, suggestions: list[str]) -> None:
+        if seq == self._seq:
+            self._on_result(suggestions)
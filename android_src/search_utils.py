@@ -1,5 +1,4 @@
-import os
-import json
+import library_store
 
 # main.py imports search_utils only after audio_screen.AudioPlayerScreen has
 # finished being defined. Install the core player changes synchronously before
@@ -192,23 +191,19 @@ try:
 except Exception as exc:
     print("[VIDEO-NET-V8] install failed:", exc)
 
-SEARCH_HISTORY_PATH = "search_history.json"
 MAX_HISTORY = 10
 
 
 def load_search_history():
-    if os.path.exists(SEARCH_HISTORY_PATH):
-        try:
-            with open(SEARCH_HISTORY_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
+    try:
+        return library_store.search_history(MAX_HISTORY)
+    except Exception as e:
+        print("[SEARCH] Error loading search history:", e)
+        return []
 
 
 def save_search_history(history):
     try:
-        with open(SEARCH_HISTORY_PATH, "w", encoding="utf-8") as f:
-            json.dump(history[:MAX_HISTORY], f, ensure_ascii=False)
+        library_store.replace_search_history(history, MAX_HISTORY)
     except Exception as e:
-        print("[SEARCH] Error saving search history:", e)
\ No newline at end of file
+        print("[SEARCH] Error saving search history:", e)
@@ -0,0 +1,197 @@
+"""In-process timing spans for the extraction pipeline.
+
+Every span records a stage name, the video ID, the client/profile that ran
+it, an outcome and its duration.  Spans are kept in a bounded ring buffer and
+can be filtered with :func:`query` or summarised per stage with
+:func:`summary` / :func:`dump_summary` (count, error count, p50/p90/p99/max).
+
+Besides explicit :func:`span` blocks, yt-dlp's own progress is split into
+phases: while a :func:`phase_tracker` is active on a thread, each
+:func:`mark_phase` call closes the running phase and opens the next one, so
+the time between two yt-dlp log lines lands on the phase the first one
+announced (watch page, player JS, n/sig solving, ...).
+"""
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from collections import deque
+from typing import Any, Iterator
+
+MAX_SPANS = 2000
+
+_LOCK = threading.Lock()
+_SPANS: deque[dict[str, Any]] = deque(maxlen=MAX_SPANS)
+_LOCAL = threading.local()
+
+
+def record(
+    stage: str,
+    duration_ms: float,
+    *,
+    video_id: str = "",
+    client: str = "",
+    outcome: str = "ok",
+    **attrs: Any,
+) -> None:
+    entry = {
+        "stage": str(stage),
+        "video_id": str(video_id or ""),
+        "client": str(client or ""),
+        "outcome": str(outcome or "ok"),
+        "ms": round(float(duration_ms), 1),
+        "ts": time.time(),
+    }
+    if attrs:
+        entry["attrs"] = attrs
+    with _LOCK:
+        _SPANS.append(entry)
+
+
+class Span:
+    """Handle yielded by :func:`span`; set ``outcome``/``client`` before exit."""
+
+    def __init__(self, stage: str, video_id: str, client: str, attrs: dict[str, Any]):
+        self.stage = stage
+        self.video_id = video_id
+        self.client = client
+        self.outcome = "ok"
+        self.attrs = attrs
+
+
+@contextlib.contextmanager
+def span(stage: str, *, video_id: str = "", client: str = "", **attrs: Any) -> Iterator[Span]:
+    """Time a block; an escaping exception sets outcome ``error:<Type>``."""
+    handle = Span(stage, video_id, client, dict(attrs))
+    started = time.monotonic()
+    try:
+        yield handle
+    except BaseException as exc:
+        handle.outcome = f"error:{type(exc).__name__}"
+        raise
+    finally:
+        record(
+            handle.stage,
+            (time.monotonic() - started) * 1000.0,
+            video_id=handle.video_id,
+            client=handle.client,
+            outcome=handle.outcome,
+            **handle.attrs,
+        )
+
+
+@contextlib.contextmanager
+def phase_tracker(prefix: str, *, video_id: str = "", client: str = "") -> Iterator[None]:
+    """Attribute time between :func:`mark_phase` calls on this thread."""
+    previous = getattr(_LOCAL, "tracker", None)
+    tracker = {
+        "prefix": prefix,
+        "video_id": video_id,
+        "client": client,
+        "phase": "start",
+        "since": time.monotonic(),
+        "failed": False,
+    }
+    _LOCAL.tracker = tracker
+    try:
+        yield
+    except BaseException:
+        tracker["failed"] = True
+        raise
+    finally:
+        _close_phase(tracker, "error" if tracker["failed"] else "ok")
+        _LOCAL.tracker = previous
+
+
+def _close_phase(tracker: dict[str, Any], outcome: str = "ok") -> None:
+    now = time.monotonic()
+    record(
+        f"{tracker['prefix']}.{tracker['phase']}",
+        (now - tracker["since"]) * 1000.0,
+        video_id=tracker["video_id"],
+        client=tracker["client"],
+        outcome=outcome,
+    )
+    tracker["since"] = now
+
+
+def mark_phase(phase: str | None) -> None:
+    """Start *phase* on the current thread's tracker (no-op without one)."""
+    tracker = getattr(_LOCAL, "tracker", None)
+    if tracker is None or not phase or phase == tracker["phase"]:
+        return
+    _close_phase(tracker)
+    tracker["phase"] = phase
+
+
+def query(
+    stage: str | None = None,
+    *,
+    video_id: str | None = None,
+    client: str | None = None,
+    outcome: str | None = None,
+    since: float | None = None,
+) -> list[dict[str, Any]]:
+    """Spans matching every given filter; ``stage`` ending in ``.`` is a prefix."""
+    with _LOCK:
+        spans = list(_SPANS)
+    out = []
+    for entry in spans:
+        if stage is not None:
+            name = entry["stage"]
+            if not (name.startswith(stage) if stage.endswith(".") else name == stage):
+                continue
+        if video_id is not None and entry["video_id"] != video_id:
+            continue
+        if client is not None and entry["client"] != client:
+            continue
+        if outcome is not None and entry["outcome"] != outcome:
+            continue
+        if since is not None and entry["ts"] < since:
+            continue
+        out.append(entry)
+    return out
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summary(since: float | None = None) -> dict[str, dict[str, Any]]:
+    by_stage: dict[str, list[dict[str, Any]]] = {}
+    for entry in query(since=since):
+        by_stage.setdefault(entry["stage"], []).append(entry)
+    out: dict[str, dict[str, Any]] = {}
+    for stage, entries in sorted(by_stage.items()):
+        values = [e["ms"] for e in entries]
+        out[stage] = {
+            "count": len(entries),
+            "errors": sum(1 for e in entries if e["outcome"].startswith("error")),
+            "p50": _percentile(values, 50),
+            "p90": _percentile(values, 90),
+            "p99": _percentile(values, 99),
+            "max": max(values),
+        }
+    return out
+
+
+def dump_summary(since: float | None = None) -> None:
+    rows = summary(since)
+    if not rows:
+        return
+    print("[METRICS] stage                          n  err    p50    p90    p99    max (ms)")
+    for stage, row in rows.items():
+        print(
+            f"[METRICS] {stage:<28} {row['count']:>4} {row['errors']:>4} "
+            f"{row['p50']:>6.0f} {row['p90']:>6.0f} {row['p99']:>6.0f} {row['max']:>6.0f}"
+        )
+
+
+def clear() -> None:
+    with _LOCK:
+        _SPANS.clear()
@@ -0,0 +1,260 @@
+"""Disk-backed cache of resolved googlevideo stream URLs.
+
+Entries are keyed by YouTube video ID and a format class (``"audio"`` for the
+MediaPlayer audio stream, ``"muxed"`` for the progressive video handoff) and
+survive process death, so a cold start or a replay inside the URL lifetime can
+skip yt-dlp entirely.  Each entry keeps the ``expire_ts`` parsed from the
+signed URL: stale entries are evicted on read (in memory - only
+:func:`put_stream` and :func:`drop_stream` write the file), and entries close
+to expiry are returned as usual while a registered revalidator refreshes them
+in the background.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Any, Callable, Iterator
+from urllib.parse import parse_qs, urlparse
+
+STREAM_CACHE_PATH = "stream_cache.json"
+MAX_ENTRIES = 200
+
+# A URL this close to expiry is treated as already expired.
+_EXPIRY_MARGIN_SEC = 120
+# Refresh in the background once less than this remains.
+_REVALIDATE_BEFORE_SEC = 30 * 60
+# googlevideo URLs normally live ~6h; entries without ``expire`` get less.
+_DEFAULT_TTL_SEC = 5 * 3600
+
+_LOCK = threading.RLock()
+_ENTRIES: dict[str, dict[str, Any]] | None = None
+_REVALIDATORS: dict[str, Callable[[str], dict | None]] = {}
+_REVALIDATE_INFLIGHT: set[str] = set()
+
+
+def _video_id(video_url: str) -> str:
+    raw = str(video_url or "").strip()
+    if re.fullmatch(r"[A-Za-z0-9_-]{11}", raw):
+        return raw
+    try:
+        parsed = urlparse(raw)
+        candidate = str((parse_qs(parsed.query or "").get("v") or [""])[0] or "")
+        if not candidate and "youtu.be" in (parsed.netloc or "").lower():
+            candidate = (parsed.path or "").strip("/").split("/")[0]
+        if re.fullmatch(r"[A-Za-z0-9_-]{11}", candidate):
+            return candidate
+    except Exception:
+        pass
+    match = re.search(r"(?:v=|youtu\.be/|/(?:shorts|live|embed)/)([A-Za-z0-9_-]{11})", raw)
+    return match.group(1) if match else raw
+
+
+def _key(video_url: str, format_class: str) -> str:
+    return f"{_video_id(video_url)}:{format_class}"
+
+
+def _load_locked() -> dict[str, dict[str, Any]]:
+    global _ENTRIES
+    if _ENTRIES is None:
+        _ENTRIES = {}
+        if os.path.exists(STREAM_CACHE_PATH):
+            try:
+                with open(STREAM_CACHE_PATH, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    _ENTRIES = {
+                        str(k): v for k, v in data.items() if isinstance(v, dict)
+                    }
+            except Exception as exc:
+                print("[STREAM-CACHE] load failed:", exc)
+        _evict_stale_locked(time.time())
+    return _ENTRIES
+
+
+def _save_locked() -> None:
+    tmp_path = f"{STREAM_CACHE_PATH}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_ENTRIES or {}, f, ensure_ascii=False)
+        os.replace(tmp_path, STREAM_CACHE_PATH)
+    except Exception as exc:
+        print("[STREAM-CACHE] save failed:", exc)
+
+
+def _expires_at(entry: dict[str, Any]) -> float:
+    try:
+        expire_ts = int(entry.get("expire_ts") or 0)
+    except Exception:
+        expire_ts = 0
+    if expire_ts > 0:
+        return float(expire_ts)
+    return float(entry.get("stored_at") or 0) + _DEFAULT_TTL_SEC
+
+
+def _evict_stale_locked(now: float) -> bool:
+    entries = _ENTRIES or {}
+    stale = [
+        key for key, entry in entries.items()
+        if _expires_at(entry) - _EXPIRY_MARGIN_SEC <= now
+    ]
+    for key in stale:
+        entries.pop(key, None)
+    return bool(stale)
+
+
+def _schedule_revalidation(video_url: str, format_class: str) -> None:
+    fn = _REVALIDATORS.get(format_class)
+    key = _key(video_url, format_class)
+    if not callable(fn):
+        return
+    with _LOCK:
+        if key in _REVALIDATE_INFLIGHT:
+            return
+        _REVALIDATE_INFLIGHT.add(key)
+
+    def job():
+        try:
+            entry = fn(video_url)
+            if isinstance(entry, dict):
+                put_stream(video_url, format_class, entry)
+            print(f"[STREAM-CACHE] revalidated {key}")
+        except Exception as exc:
+            print(f"[STREAM-CACHE] revalidate failed {key}: {exc}")
+        finally:
+            with _LOCK:
+                _REVALIDATE_INFLIGHT.discard(key)
+
+    threading.Thread(target=job, name="pymusic-stream-revalidate", daemon=True).start()
+
+
+def register_revalidator(format_class: str, fn: Callable[[str], dict | None]) -> None:
+    """Register ``fn(video_url) -> entry | None`` used to refresh near-expiry entries."""
+    _REVALIDATORS[str(format_class)] = fn
+
+
+def get_stream(video_url: str, format_class: str = "audio") -> dict[str, Any] | None:
+    """Return a still-valid cached entry, or None if missing/stale."""
+    if not video_url:
+        return None
+    now = time.time()
+    with _LOCK:
+        entries = _load_locked()
+        key = _key(video_url, format_class)
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        expires_at = _expires_at(entry)
+        if expires_at - _EXPIRY_MARGIN_SEC <= now:
+            # Reads come from the UI thread: drop it in memory only; the next
+            # put/drop persists it and a reload evicts stale entries anyway.
+            entries.pop(key, None)
+            return None
+        result = dict(entry.get("value") or {})
+    if expires_at - now <= _REVALIDATE_BEFORE_SEC:
+        _schedule_revalidation(video_url, format_class)
+    return result
+
+
+def expires_in(video_url: str, format_class: str = "audio") -> float | None:
+    """Seconds until the cached entry becomes unusable, None if there is none.
+
+    Unlike :func:`get_stream` this never schedules a revalidation.
+    """
+    if not video_url:
+        return None
+    with _LOCK:
+        entry = _load_locked().get(_key(video_url, format_class))
+        if entry is None:
+            return None
+        remaining = _expires_at(entry) - _EXPIRY_MARGIN_SEC - time.time()
+    return remaining if remaining > 0 else None
+
+
+def put_stream(video_url: str, format_class: str, value: dict[str, Any]) -> None:
+    if not video_url or not isinstance(value, dict):
+        return
+    now = time.time()
+    with _LOCK:
+        entries = _load_locked()
+        key = _key(video_url, format_class)
+        entries.pop(key, None)
+        _evict_stale_locked(now)
+        while len(entries) >= MAX_ENTRIES:
+            entries.pop(next(iter(entries.keys())), None)
+        entries[key] = {
+            "value": dict(value),
+            "expire_ts": value.get("expire_ts"),
+            "stored_at": now,
+        }
+        _save_locked()
+
+
+def drop_stream(video_url: str, format_class: str | None = None) -> None:
+    if not video_url:
+        return
+    with _LOCK:
+        entries = _load_locked()
+        classes = [format_class] if format_class else [
+            key.split(":", 1)[1] for key in entries if key.startswith(f"{_video_id(video_url)}:")
+        ]
+        changed = False
+        for cls in classes:
+            changed = entries.pop(_key(video_url, cls), None) is not None or changed
+        if changed:
+            _save_locked()
+
+
+class StreamUrlCache(MutableMapping):
+    """Dict-style view of one format class, keyed by video URL.
+
+    Drop-in replacement for the old in-memory ``AudioPlayerScreen._url_cache``
+    so existing ``get``/``pop``/item assignment call sites keep working.
+    """
+
+    def __init__(self, format_class: str = "audio"):
+        self.format_class = str(format_class)
+
+    def __getitem__(self, video_url: str) -> dict[str, Any]:
+        entry = get_stream(video_url, self.format_class)
+        if entry is None:
+            raise KeyError(video_url)
+        return entry
+
+    def __setitem__(self, video_url: str, value: dict[str, Any]) -> None:
+        put_stream(video_url, self.format_class, value)
+
+    def __delitem__(self, video_url: str) -> None:
+        self._take(video_url)
+
+    def pop(self, video_url: str, *default: Any) -> Any:
+        try:
+            return self._take(video_url)
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+
+    def _take(self, video_url: str) -> dict[str, Any]:
+        # Not via get_stream: an entry being dropped must not be revalidated.
+        with _LOCK:
+            entries = _load_locked()
+            entry = entries.pop(_key(video_url, self.format_class), None) if video_url else None
+            if entry is None:
+                raise KeyError(video_url)
+            _save_locked()
+        if _expires_at(entry) - _EXPIRY_MARGIN_SEC <= time.time():
+            raise KeyError(video_url)
+        return dict(entry.get("value") or {})
+
+    def __iter__(self) -> Iterator[str]:
+        suffix = f":{self.format_class}"
+        with _LOCK:
+            keys = [key for key in _load_locked() if key.endswith(suffix)]
+        return iter(key[: -len(suffix)] for key in keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
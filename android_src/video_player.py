@@ -5,6 +5,7 @@ from android.runnable import run_on_ui_thread
 
 from kivy.clock import Clock
 
+import format_select
 import ytdlp_helpers as ydlh
 try:
     import media_android as ma
@@ -977,6 +978,7 @@ class AndroidVideoPlayer:
                 return
 
             self._frame_bounds = (int(left), int(top), int(width), int(height))
+            format_select.note_surface(int(width), int(height))
             self._apply_surface_bounds()
         except Exception as e:
             print(f"[VIDEO] set_bounds error: {e}")
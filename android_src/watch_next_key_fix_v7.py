@@ -2,22 +2,24 @@
 
 Modern yt-dlp client profiles no longer embed INNERTUBE_API_KEY.  YouTube still
 publishes the current anonymous web key in its public page bootstrap.  Scrape it
-over normal verified HTTPS only when the watch page did not provide one, cache
-it in memory, and feed it to related_videos._merge_page_config.
+over normal verified HTTPS only when the watch page did not provide one, keep
+it (with the page's ytcfg) in the shared innertube_config store, and feed it to
+related_videos._merge_page_config.
 """
 from __future__ import annotations
 
 import re
 import threading
-import time
 
 import httpx
 
+import http_transport
+import innertube_config
+import yt_json
+
 _INSTALLED = False
 _LOCK = threading.RLock()
 _KEY_LOCK = threading.Lock()
-_CACHED_KEY = ""
-_CACHED_AT = 0.0
 
 _UA = (
     "Mozilla/5.0 (Linux; Android 12; Mobile) AppleWebKit/537.36 "
@@ -39,15 +41,16 @@ def _extract_key(text: str) -> str:
 
 
 def _scrape_public_key(force: bool = False) -> str:
-    global _CACHED_KEY, _CACHED_AT
-    now = time.time()
-    if _CACHED_KEY and not force and (now - _CACHED_AT) < 6 * 3600:
-        return _CACHED_KEY
+    if not force:
+        key = innertube_config.api_key()
+        if key:
+            return key
 
     with _KEY_LOCK:
-        now = time.time()
-        if _CACHED_KEY and not force and (now - _CACHED_AT) < 6 * 3600:
-            return _CACHED_KEY
+        if not force:
+            key = innertube_config.api_key()
+            if key:
+                return key
 
         headers = {
             "User-Agent": _UA,
@@ -63,17 +66,16 @@ def _scrape_public_key(force: bool = False) -> str:
             "https://www.youtube.com/?hl=en&gl=US",
         ):
             try:
-                response = httpx.get(
-                    url,
-                    headers=headers,
-                    timeout=timeout,
-                    follow_redirects=True,
-                )
+                response = http_transport.get(url, headers=headers, timeout=timeout)
                 response.raise_for_status()
-                key = _extract_key(response.text)
+                text = response.text
+                key = _extract_key(text)
                 if key:
-                    _CACHED_KEY = key
-                    _CACHED_AT = time.time()
+                    ytcfg = yt_json.json_after(text, "ytcfg.set(") or {}
+                    if isinstance(ytcfg, dict) and ytcfg.get("INNERTUBE_API_KEY") == key:
+                        innertube_config.remember_ytcfg(ytcfg)
+                    else:
+                        innertube_config.remember_key(key)
                     print("[WATCH-NEXT-V7] scraped current YouTube Innertube key")
                     return key
             except Exception as exc:
@@ -1,8 +1,11 @@
 # youtube_search.py
-import httpx
 import json
 import re
 
+import http_transport
+import innertube_config
+import yt_json
+
 
 def _extract_text(field: dict | None) -> str:
     """
@@ -162,13 +165,7 @@ def _parse_items(items):
 
 
 def _extract_ytcfg(text: str) -> dict:
-    cfg = {}
-    try:
-        m = re.search(r"ytcfg\.set\((\{.*?\})\);", text, re.S)
-        if m:
-            cfg = json.loads(m.group(1))
-    except Exception:
-        cfg = {}
+    cfg = yt_json.json_after(text, "ytcfg.set(") or {}
 
     if not cfg:
         try:
@@ -196,47 +193,131 @@ def _build_context(cfg: dict) -> dict:
     return ctx
 
 
-def fetch_youtube_results(query):
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        )
+# ytcfg з останньої HTML-видачі (або від related/watch-next): з ним перша
+# сторінка йде через youtubei/v1/search, JSON у рази менший за HTML-сторінку.
+# Зберігається спільно в innertube_config.
+_WEB_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+)
+
+
+def _remember_cfg(cfg: dict) -> None:
+    innertube_config.remember_ytcfg(cfg)
+
+
+def _cached_cfg() -> dict:
+    cfg = innertube_config.get("WEB") or {}
+    client = (cfg.get("INNERTUBE_CONTEXT") or {}).get("client")
+    if isinstance(client, dict):
+        # Контекст міг прийти зі сторінки з hl=uk; видача парситься англійською.
+        client["hl"] = "en"
+    return cfg
+
+
+def _forget_cfg() -> None:
+    innertube_config.invalidate("WEB", "(search api rejected the key)")
+
+
+def _api_headers(context: dict) -> dict:
+    return {
+        "User-Agent": _WEB_UA,
+        "Content-Type": "application/json",
+        "Origin": "https://www.youtube.com",
+        "X-Youtube-Client-Name": "1",
+        "X-Youtube-Client-Version": context.get("client", {}).get("clientVersion", "2.20240201.00.00"),
     }
 
+
+def _parse_search_data(data: dict):
+    sections = (
+        data["contents"]["twoColumnSearchResultsRenderer"]
+        ["primaryContents"]["sectionListRenderer"]["contents"]
+    )
+
+    videos = []
+    playlists = []
+    continuation = None
+
+    for sec in sections:
+        items = sec.get("itemSectionRenderer", {}).get("contents", [])
+        v, p, c = _parse_items(items)
+        videos.extend(v)
+        playlists.extend(p)
+        if c and not continuation:
+            continuation = c
+
+    return videos, playlists, continuation
+
+
+def _search_api(query, cfg: dict):
+    """
+    Перша сторінка через youtubei/v1/search. None - ключ відхилено або
+    відповідь не тієї форми; тоді викликач іде через HTML.
+    """
+    api_key = cfg.get("INNERTUBE_API_KEY")
+    if not api_key:
+        return None
+    context = _build_context(cfg)
+    url = f"https://www.youtube.com/youtubei/v1/search?key={api_key}&prettyPrint=false"
+    try:
+        resp = http_transport.post(
+            url,
+            headers=_api_headers(context),
+            content=json.dumps({"context": context, "query": str(query)}).encode("utf-8"),
+            timeout=6.0,
+        )
+    except Exception as e:
+        print("[SEARCH] api HTTP error:", e)
+        return None
+    if resp.status_code in (400, 401, 403):
+        print(f"[SEARCH] api key rejected ({resp.status_code}), back to HTML")
+        _forget_cfg()
+        return None
+    try:
+        resp.raise_for_status()
+        return _parse_search_data(resp.json())
+    except Exception as e:
+        print("[SEARCH] api parse error:", e)
+        return None
+
+
+def fetch_youtube_results(query):
+    cfg = _cached_cfg()
+    if cfg:
+        result = _search_api(query, cfg)
+        if result is not None:
+            videos, playlists, continuation = result
+            return videos, playlists, continuation, cfg
+    return _fetch_results_html(query)
+
+
+def _fetch_results_html(query):
+    headers = {"User-Agent": _WEB_UA}
+
     url = f"https://www.youtube.com/results?search_query={query}&hl=en&persist_gl=1"
 
+    # ytcfg і ytInitialData стоять на початку сторінки: читаємо потоком
+    # і обриваємо завантаження, щойно обидва обʼєкти закрились.
     try:
-        resp = httpx.get(url, headers=headers, timeout=6.0)
+        with http_transport.stream("GET", url, headers=headers, timeout=6.0) as resp:
+            found, text = yt_json.scan_stream(
+                resp.iter_bytes(),
+                {"ytcfg": yt_json.YTCFG_MARKERS, "initial": ("var ytInitialData =",)},
+            )
     except Exception as e:
         print("[SEARCH] HTTP error:", e)
         return [], [], None, {}
 
-    match = re.search(r"var ytInitialData = ({.*?});", resp.text)
-    if not match:
+    data = found.get("initial")
+    if not data:
         print("[SEARCH] ytInitialData not found")
         return [], [], None, {}
 
     try:
-        data = json.loads(match.group(1))
-        cfg = _extract_ytcfg(resp.text)
-        sections = (
-            data["contents"]["twoColumnSearchResultsRenderer"]
-            ["primaryContents"]["sectionListRenderer"]["contents"]
-        )
-
-        videos = []
-        playlists = []
-        continuation = None
-
-        for sec in sections:
-            items = sec.get("itemSectionRenderer", {}).get("contents", [])
-            v, p, c = _parse_items(items)
-            videos.extend(v)
-            playlists.extend(p)
-            if c and not continuation:
-                continuation = c
-
+        cfg = found.get("ytcfg") or _extract_ytcfg(text)
+        videos, playlists, continuation = _parse_search_data(data)
+        _remember_cfg(cfg)
         return videos, playlists, continuation, cfg
 
     except Exception as e:
@@ -255,19 +336,10 @@ def fetch_youtube_continuation(continuation: str, cfg: dict):
     context = _build_context(cfg)
     payload = {"context": context, "continuation": continuation}
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        ),
-        "Content-Type": "application/json",
-        "Origin": "https://www.youtube.com",
-        "X-Youtube-Client-Name": "1",
-        "X-Youtube-Client-Version": context.get("client", {}).get("clientVersion", "2.20240201.00.00"),
-    }
+    headers = _api_headers(context)
 
     try:
-        resp = httpx.post(url, headers=headers, json=payload, timeout=6.0)
+        resp = http_transport.post(url, headers=headers, json=payload, timeout=6.0)
         data = resp.json()
     except Exception as e:
         print("[SEARCH] continuation HTTP error:", e)
@@ -0,0 +1,159 @@
+"""Locate JSON blobs (``ytInitialData``, ``ytcfg.set(...)``) in YouTube HTML.
+
+The object after a marker is decoded with ``json.JSONDecoder.raw_decode``
+starting at the ``{`` that directly follows it - the C scanner finds where
+the object ends, so no Python-level brace matching or regex backtracking over
+the page is needed.
+
+:func:`scan_stream` does the same over a stream of byte chunks and returns as
+soon as every requested object has closed, letting the caller stop the
+download instead of reading the rest of the page.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Mapping, Sequence
+
+INITIAL_DATA_MARKERS = (
+    "var ytInitialData =",
+    "ytInitialData =",
+    'window["ytInitialData"] =',
+    "window['ytInitialData'] =",
+)
+YTCFG_MARKERS = ("ytcfg.set(",)
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_OVERLAP = 64
+
+
+def _object_start(text: str, marker: str, offset: int = 0) -> int:
+    """Index of the ``{`` right after an occurrence of *marker* (whitespace
+    allowed), searching from *offset*.
+
+    Occurrences followed by anything else - ``ytcfg.set("KEY", value)`` calls
+    come before the one with the config object - are skipped.
+    """
+    while True:
+        position = text.find(marker, offset)
+        if position < 0:
+            return -1
+        start = _WHITESPACE.match(text, position + len(marker)).end()
+        if text.startswith("{", start):
+            return start
+        offset = position + 1
+
+
+def json_after(text: str, marker: str) -> Any | None:
+    """Decode the first JSON object that directly follows *marker* in *text*."""
+    text = text or ""
+    offset = 0
+    while True:
+        start = _object_start(text, marker, offset)
+        if start < 0:
+            return None
+        try:
+            return _DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            offset = start
+
+
+def json_after_any(text: str, markers: Sequence[str]) -> Any | None:
+    """First non-empty object found after any of *markers*, in order."""
+    for marker in markers:
+        data = json_after(text, marker)
+        if data:
+            return data
+    return None
+
+
+def scan_stream(
+    chunks: Iterable[bytes],
+    wanted: Mapping[str, Sequence[str]],
+    *,
+    max_bytes: int | None = None,
+) -> tuple[dict[str, Any], str]:
+    """Read *chunks* until each ``name -> markers`` object in *wanted* closed.
+
+    Returns ``({name: obj}, text_read)``.  Names whose object never completed
+    (end of stream or *max_bytes*) are missing from the dict.  Stops pulling
+    from *chunks* as soon as everything was found, so closing the response
+    right after this call abandons the rest of the download.
+
+    Every search resumes where the previous chunk left it (minus a short
+    overlap for markers split across chunks), so the page is scanned once.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts: list[str] = []
+    size = 0
+    # "".join(parts), rebuilt only when an object is decoded.
+    joined = ""
+    # End of the text already read, kept so a marker, its "{" or "</script>"
+    # cut off by a chunk boundary is seen again with the next chunk.
+    carry = ""
+    found: dict[str, Any] = {}
+    # name -> where the marker search resumes / where "</script>" is searched
+    marker_from = {name: 0 for name in wanted}
+    close_from: dict[str, int] = {}
+    starts: dict[str, int] = {}
+    read = 0
+
+    def haystack(position: int) -> tuple[str, int]:
+        # Searches normally cover only the new chunk (plus carry); only after
+        # a failed decode can a search go back, and then the text is joined.
+        nonlocal joined
+        if position >= base:
+            return window, base
+        if len(joined) != size:
+            joined = "".join(parts)
+        return joined, 0
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        read += len(chunk)
+        piece = decoder.decode(chunk)
+        base = size - len(carry)
+        window = carry + piece
+        parts.append(piece)
+        size += len(piece)
+        carry = window[-_OVERLAP:]
+        tail = max(0, size - _OVERLAP)
+        for name, markers in wanted.items():
+            while name not in found:
+                if name not in starts:
+                    text, offset = haystack(marker_from[name])
+                    hits = [
+                        start
+                        for start in (
+                            _object_start(text, marker, marker_from[name] - offset) for marker in markers
+                        )
+                        if start >= 0
+                    ]
+                    if not hits:
+                        marker_from[name] = max(marker_from[name], tail)
+                        break
+                    starts[name] = close_from[name] = offset + min(hits)
+                # Both objects sit inside a <script> element and YouTube
+                # escapes "<" in JSON strings, so the object is complete once
+                # its script closes; only decode after that.
+                text, offset = haystack(close_from[name])
+                if text.find("</script>", close_from[name] - offset) < 0:
+                    close_from[name] = max(close_from[name], tail)
+                    break
+                if len(joined) != size:
+                    joined = "".join(parts)
+                try:
+                    found[name] = _DECODER.raw_decode(joined, starts[name])[0]
+                except ValueError:
+                    # Not the object we want: look for the next occurrence.
+                    marker_from[name] = starts.pop(name) + 1
+        if len(found) == len(wanted):
+            break
+        if max_bytes is not None and read >= max_bytes:
+            break
+    if len(joined) != size:
+        joined = "".join(parts)
+    return found, joined
@@ -0,0 +1,316 @@
+"""Managed yt-dlp cache for YouTube player artefacts.
+
+yt-dlp keeps solved signature/n-parameter functions and preprocessed player
+JS in its on-disk cache, so a cold extraction on a known player skips
+re-downloading and re-interpreting the player.  The cache used to be disabled
+outright because stale entries got stuck; this layer keeps it on but manages
+it per player version:
+
+* entries live under ``ytdlp_cache/<yt-dlp version>/`` and are grouped by the
+  player ID embedded in their key; only the most recent ``MAX_PLAYERS``
+  players are kept and unused players expire after ``PLAYER_TTL_SEC``;
+* :func:`invalidate_player` drops every entry of one player version - it is
+  called when an extraction reports a signature/nsig failure or when the
+  stream it produced is rejected on the first range;
+* :func:`cache_stats` exposes hit/miss/invalidation counters so a stale-cache
+  regression shows up in the logs instead of as silent playback failures.
+
+Attach the cache with :func:`install` right after building a ``YoutubeDL``;
+it also routes the instance's logger through :func:`note_log_message`.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.parse
+from typing import Any
+
+from yt_dlp.cache import Cache
+from yt_dlp.version import __version__ as _YTDLP_VERSION
+
+YTDLP_CACHE_DIR = "ytdlp_cache"
+MAX_PLAYERS = 3
+PLAYER_TTL_SEC = 3 * 24 * 3600
+
+# Logger messages that mean the cached player data produced bad results.
+FAILURE_MARKERS = (
+    "nsig extraction failed",
+    "n challenge solving failed",
+    "Signature solving failed",
+    "Signature extraction failed",
+)
+
+_INDEX_NAME = "players.json"
+# last_used is only persisted when it moved by more than this.
+_TOUCH_SAVE_SEC = 3600
+
+_LOCK = threading.RLock()
+_INDEX: dict[str, dict[str, float]] | None = None
+_STATS = {"hits": 0, "misses": 0, "stores": 0, "corrupt": 0, "invalidations": 0}
+_GENERATION = 0
+
+
+def _root_dir() -> str:
+    return os.path.abspath(os.path.join(YTDLP_CACHE_DIR, _YTDLP_VERSION))
+
+
+def _player_id_of(key: str) -> str | None:
+    raw = str(key or "")
+    match = re.search(r"/s/player/([0-9a-fA-F]{8,})/", raw)
+    if match is None:
+        match = re.match(r"([0-9a-fA-F]{8,})-", raw)
+    return match.group(1) if match else None
+
+
+def _key_of_filename(name: str) -> str:
+    # Inverse of Cache._get_cache_fn: quote(key, safe='') with '%' -> ','.
+    stem = name.rsplit(".", 1)[0]
+    return urllib.parse.unquote(stem.replace(",", "%"))
+
+
+def _index_path() -> str:
+    return os.path.join(_root_dir(), _INDEX_NAME)
+
+
+def _load_index_locked() -> dict[str, dict[str, float]]:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = {}
+        try:
+            with open(_index_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                _INDEX = {str(k): v for k, v in data.items() if isinstance(v, dict)}
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            print("[YTDLP-CACHE] index load failed:", exc)
+        _drop_other_versions()
+        _prune_locked(time.time())
+    return _INDEX
+
+
+def _drop_other_versions() -> None:
+    # Entries written by another yt-dlp release are never valid for this one.
+    try:
+        names = os.listdir(YTDLP_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        if name != _YTDLP_VERSION:
+            shutil.rmtree(os.path.join(YTDLP_CACHE_DIR, name), ignore_errors=True)
+
+
+def _save_index_locked() -> None:
+    path = _index_path()
+    tmp_path = f"{path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_INDEX or {}, f)
+        os.replace(tmp_path, path)
+    except Exception as exc:
+        print("[YTDLP-CACHE] index save failed:", exc)
+
+
+def _remove_player_files_locked(player_id: str) -> int:
+    root = _root_dir()
+    removed = 0
+    try:
+        sections = os.listdir(root)
+    except OSError:
+        return 0
+    for section in sections:
+        section_dir = os.path.join(root, section)
+        if not os.path.isdir(section_dir):
+            continue
+        for name in os.listdir(section_dir):
+            if _player_id_of(_key_of_filename(name)) != player_id:
+                continue
+            try:
+                os.remove(os.path.join(section_dir, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _prune_locked(now: float) -> None:
+    index = _INDEX or {}
+    by_age = sorted(index, key=lambda pid: float(index[pid].get("last_used") or 0), reverse=True)
+    doomed = [
+        pid for pos, pid in enumerate(by_age)
+        if pos >= MAX_PLAYERS or now - float(index[pid].get("last_used") or 0) > PLAYER_TTL_SEC
+    ]
+    for pid in doomed:
+        index.pop(pid, None)
+        _remove_player_files_locked(pid)
+    if doomed:
+        print(f"[YTDLP-CACHE] pruned players {doomed}")
+        _save_index_locked()
+
+
+def _touch_player(player_id: str) -> None:
+    now = time.time()
+    with _LOCK:
+        index = _load_index_locked()
+        entry = index.get(player_id)
+        if entry is None:
+            index[player_id] = {"first_seen": now, "last_used": now}
+            _prune_locked(now)
+            _save_index_locked()
+        elif now - float(entry.get("last_used") or 0) > _TOUCH_SAVE_SEC:
+            entry["last_used"] = now
+            _save_index_locked()
+
+
+def _count(name: str) -> None:
+    with _LOCK:
+        _STATS[name] += 1
+
+
+class PlayerCache(Cache):
+    """``yt_dlp.cache.Cache`` that lives in the app dir and tracks player versions."""
+
+    def __init__(self, ydl):
+        super().__init__(ydl)
+        self.last_player_id: str | None = None
+
+    def _get_root_dir(self):
+        return _root_dir()
+
+    @property
+    def enabled(self):
+        return True
+
+    def _note_key(self, key: str) -> None:
+        player_id = _player_id_of(key)
+        if player_id:
+            self.last_player_id = player_id
+            _touch_player(player_id)
+
+    def load(self, section, key, dtype="json", default=None, *, min_ver=None):
+        self._note_key(key)
+        cache_fn = self._get_cache_fn(section, key, dtype)
+        try:
+            with open(cache_fn, encoding="utf-8") as cachef:
+                data = self._validate(json.load(cachef), min_ver)
+        except OSError:
+            data = None
+        except (ValueError, KeyError):
+            # Half-written or foreign file: drop it so it is rebuilt.
+            _count("corrupt")
+            try:
+                os.remove(cache_fn)
+            except OSError:
+                pass
+            data = None
+        if data is None:
+            _count("misses")
+            return default
+        _count("hits")
+        return data
+
+    def store(self, section, key, data, dtype="json"):
+        self._note_key(key)
+        super().store(section, key, data, dtype)
+        _count("stores")
+
+    def remove(self):
+        clear_cache()
+
+
+class _FailureWatchLogger:
+    """Wraps a YoutubeDL's logger so solver failures reach :func:`note_log_message`
+    together with the instance that emitted them."""
+
+    def __init__(self, logger: Any, ydl: Any):
+        self._logger = logger
+        self._ydl = ydl
+
+    def debug(self, msg):
+        note_log_message(msg, self._ydl)
+        self._logger.debug(msg)
+
+    def warning(self, msg):
+        note_log_message(msg, self._ydl)
+        self._logger.warning(msg)
+
+    def error(self, msg):
+        self._logger.error(msg)
+
+
+def install(ydl: Any) -> Any:
+    """Replace ``ydl.cache`` with the managed cache; returns ``ydl``."""
+    ydl.cache = PlayerCache(ydl)
+    ydl._pymusic_cache_gen = generation()
+    logger = ydl.params.get("logger")
+    if logger is not None and not isinstance(logger, _FailureWatchLogger):
+        ydl.params["logger"] = _FailureWatchLogger(logger, ydl)
+    return ydl
+
+
+def generation() -> int:
+    """Bumped on every invalidation; YoutubeDL instances from an older
+    generation still hold the dropped data in memory and must be rebuilt."""
+    return _GENERATION
+
+
+def last_player_id(ydl: Any) -> str | None:
+    """Player version last used by ``ydl``."""
+    cache = getattr(ydl, "cache", None)
+    return cache.last_player_id if isinstance(cache, PlayerCache) else None
+
+
+def invalidate_player(player_id: str | None, reason: str = "") -> bool:
+    """Drop every cached artefact of one player version."""
+    global _GENERATION
+    if not player_id:
+        return False
+    with _LOCK:
+        index = _load_index_locked()
+        index.pop(player_id, None)
+        removed = _remove_player_files_locked(player_id)
+        _save_index_locked()
+        _STATS["invalidations"] += 1
+        _GENERATION += 1
+    print(f"[YTDLP-CACHE] invalidated player {player_id} ({reason or 'failure'}), files={removed}")
+    return True
+
+
+def note_log_message(msg: str, ydl: Any = None) -> bool:
+    """Invalidate the affected player if a yt-dlp log line reports a solver failure.
+
+    The player is the one named in the message or the last one ``ydl`` (the
+    emitting instance) used; concurrent extractions may be on different
+    players, so without either nothing is invalidated.
+    """
+    text = str(msg or "")
+    if not any(marker in text for marker in FAILURE_MARKERS):
+        return False
+    player_id = _player_id_of(text) or (last_player_id(ydl) if ydl is not None else None)
+    if not player_id:
+        return False
+    return invalidate_player(player_id, reason=text.split(":", 1)[0][:60])
+
+
+def clear_cache() -> None:
+    global _INDEX, _GENERATION
+    with _LOCK:
+        shutil.rmtree(_root_dir(), ignore_errors=True)
+        _INDEX = {}
+        _GENERATION += 1
+
+
+def cache_stats() -> dict[str, Any]:
+    with _LOCK:
+        stats: dict[str, Any] = dict(_STATS)
+        stats["players"] = sorted(_load_index_locked())
+        stats["generation"] = _GENERATION
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return stats
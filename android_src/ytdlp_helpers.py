@@ -2,29 +2,55 @@
 # ytdlp_helpers.py
 from __future__ import annotations
 
+import contextlib
 import html
 import json
 import os
 import re
-import ssl
-import urllib.request
+import threading
+import time
 import urllib.parse as urlparse
 from typing import Any, Dict, Optional, Tuple, List
 
-import yt_dlp.cache
 from yt_dlp import YoutubeDL
 
-
-# ========================== CACHE OFF ==========================
-# YouTube часто міняє сторінки, кеш у APK дає "застряглі" сигнатури/формати.
-yt_dlp.cache.store  = lambda *a, **k: None
-yt_dlp.cache.load   = lambda *a, **k: None
-yt_dlp.cache.remove = lambda *a, **k: None
+# Кеш плеєра/nsig керується ytdlp_cache: ключ - версія плеєра,
+# "застряглі" сигнатури скидаються автоматично при збої.
+import format_select
+import http_transport
+import stage_metrics
+import ytdlp_cache
+import yt_json
 
 
 # ========================== LOGGER ============================
+# Фази yt-dlp за його ж повідомленнями: час між рядками логу йде фазі,
+# яку оголосив попередній рядок (див. stage_metrics.phase_tracker).
+_YTDLP_PHASES = (
+    ("Downloading webpage", "watch_page"),
+    ("player API JSON", "player_api"),
+    ("Downloading player", "player_js"),
+    ("[jsc", "nsig"),
+    ("challenge", "nsig"),
+    ("nsig", "nsig"),
+    ("n function", "nsig"),
+    ("m3u8", "manifest"),
+    ("MPD", "manifest"),
+    ("Downloading", "ytdlp_other"),
+    ("format(s)", "formats"),
+)
+
+
+def _ytdlp_phase(msg: str) -> Optional[str]:
+    for needle, phase in _YTDLP_PHASES:
+        if needle in msg:
+            return phase
+    return None
+
+
 class YDLLogger:
     def debug(self, msg: str):
+        stage_metrics.mark_phase(_ytdlp_phase(msg))
         # не шумимо; залишимо важливі маркери
         if ("Downloading webpage" in msg
             or "player =" in msg
@@ -95,41 +121,6 @@ def _extract_video_id_from_url(url: str) -> str:
     return ""
 
 
-def _json_after_marker(text: str, marker: str) -> Optional[Any]:
-    """Витягує JSON-обʼєкт після `marker` з HTML YouTube без важких залежностей."""
-    try:
-        pos = (text or "").find(marker)
-        if pos < 0:
-            return None
-        start = text.find("{", pos)
-        if start < 0:
-            return None
-        depth = 0
-        in_str = False
-        esc = False
-        for i in range(start, len(text)):
-            ch = text[i]
-            if in_str:
-                if esc:
-                    esc = False
-                elif ch == "\\":
-                    esc = True
-                elif ch == '"':
-                    in_str = False
-                continue
-            if ch == '"':
-                in_str = True
-            elif ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    return json.loads(text[start:i + 1])
-    except Exception:
-        return None
-    return None
-
-
 def _yt_text(node: Any) -> str:
     try:
         if not node:
@@ -168,31 +159,110 @@ def _yt_thumb(node: Any) -> str:
     return ""
 
 
+# ==================== PAGE DOCUMENT CACHE ====================
+# watch-page тягнуть одразу кілька скраперів (канал, аватар, схожі відео).
+# Сторінка завантажується один раз на відео і живе кілька хвилин; всі
+# читають той самий текст і той самий розпарсений ytInitialData.
+_PAGE_TTL_SEC = 5 * 60
+_PAGE_MAX = 8
+_WATCH_PAGE_READ = 900_000
+_CHANNEL_PAGE_READ = 350_000
+_PAGE_LOCK = threading.Lock()
+_PAGE_CACHE: Dict[str, Tuple[float, "_PageDoc"]] = {}
+_PAGE_INFLIGHT: Dict[str, Dict[str, Any]] = {}
+
+
+class _PageDoc:
+    """HTML сторінки YouTube + ледачий ytInitialData (парситься один раз)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._lock = threading.Lock()
+        self._parsed = False
+        self._initial_data: Optional[Any] = None
+
+    def initial_data(self) -> Optional[Any]:
+        with self._lock:
+            if not self._parsed:
+                self._initial_data = yt_json.json_after_any(self.text, yt_json.INITIAL_DATA_MARKERS)
+                self._parsed = True
+            return self._initial_data
+
+
+def _download_page(url: str, ua: str, read_limit: int) -> str:
+    started = time.monotonic()
+    raw = http_transport.fetch_bytes(
+        url,
+        headers={
+            "User-Agent": ua or _ANDROID_WEB_UA,
+            "Accept-Language": "en-US,en;q=0.9",
+            "Referer": "https://www.youtube.com",
+        },
+        timeout=8,
+        limit=read_limit,
+    )
+    format_select.record_transfer(len(raw), time.monotonic() - started)
+    return raw.decode("utf-8", errors="ignore")
+
+
+def _page_document(key: str, url: str, ua: str, read_limit: int) -> Optional[_PageDoc]:
+    """
+    Спільний документ сторінки за ключем. Паралельні запити того самого
+    ключа чекають на один download; помилки не кешуються.
+    UA береться від першого запиту - решта читають ту саму сторінку.
+    """
+    if not url:
+        return None
+    with _PAGE_LOCK:
+        cached = _PAGE_CACHE.get(key)
+        if cached and (time.monotonic() - cached[0]) <= _PAGE_TTL_SEC:
+            return cached[1]
+        waiter = _PAGE_INFLIGHT.get(key)
+        leader = waiter is None
+        if leader:
+            waiter = {"event": threading.Event(), "doc": None}
+            _PAGE_INFLIGHT[key] = waiter
+    if not leader:
+        waiter["event"].wait(10.0)
+        return waiter["doc"]
+
+    doc: Optional[_PageDoc] = None
+    try:
+        doc = _PageDoc(_download_page(url, ua, read_limit))
+    except Exception as e:
+        print(f"[YTDLP] page fetch failed {key}: {repr(e)}")
+    finally:
+        with _PAGE_LOCK:
+            if doc is not None:
+                _PAGE_CACHE.pop(key, None)
+                now = time.monotonic()
+                for old_key in [k for k, v in _PAGE_CACHE.items() if now - v[0] > _PAGE_TTL_SEC]:
+                    _PAGE_CACHE.pop(old_key, None)
+                while len(_PAGE_CACHE) >= _PAGE_MAX:
+                    _PAGE_CACHE.pop(next(iter(_PAGE_CACHE)), None)
+                _PAGE_CACHE[key] = (now, doc)
+            _PAGE_INFLIGHT.pop(key, None)
+        waiter["doc"] = doc
+        waiter["event"].set()
+    return doc
+
+
+def _watch_page(video_url: str, ua: str) -> Optional[_PageDoc]:
+    vid = _extract_video_id_from_url(video_url) or str(video_url or "")
+    return _page_document(f"watch:{vid}", video_url, ua, _WATCH_PAGE_READ)
+
+
 def _extract_related_from_watch_page(video_url: str, ua: str, limit: int = 12) -> List[Dict[str, Any]]:
     """Fallback для блоку рекомендованих відео, якщо yt-dlp не повернув related_videos."""
     if not video_url:
         return []
     current_id = _extract_video_id_from_url(video_url)
     try:
-        req = urllib.request.Request(
-            video_url,
-            headers={
-                "User-Agent": ua or _ANDROID_WEB_UA,
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://www.youtube.com",
-                "Connection": "keep-alive",
-            },
-        )
-        ctx = ssl._create_unverified_context()
-        with urllib.request.urlopen(req, timeout=8, context=ctx) as resp:
-            raw = resp.read(900_000)
-        text = raw.decode("utf-8", errors="ignore")
-
-        data = None
-        for marker in ("var ytInitialData =", "ytInitialData =", "window[\"ytInitialData\"] ="):
-            data = _json_after_marker(text, marker)
-            if data:
-                break
+        doc = _watch_page(video_url, ua)
+        if doc is None:
+            return []
+        text = doc.text
+        data = doc.initial_data()
 
         out: List[Dict[str, Any]] = []
         seen = set()
@@ -291,19 +361,10 @@ def _pick_yt3_avatar_from_text(text: str) -> str:
 
 def _extract_channel_thumb_from_watch_page(video_url: str, ua: str) -> str:
     try:
-        req = urllib.request.Request(
-            video_url,
-            headers={
-                "User-Agent": ua or _ANDROID_WEB_UA,
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://www.youtube.com",
-                "Connection": "keep-alive",
-            },
-        )
-        ctx = ssl._create_unverified_context()
-        with urllib.request.urlopen(req, timeout=8, context=ctx) as resp:
-            raw = resp.read(400_000)
-        text = raw.decode("utf-8", errors="ignore")
+        doc = _watch_page(video_url, ua)
+        if doc is None:
+            return ""
+        text = doc.text
         m = re.search(r'ytProfileIconImage[^>]+src="([^"]+)"', text)
         if not m:
             m = re.search(r'"avatar"\s*:\s*\{[^}]*"thumbnails"\s*:\s*\[\s*\{"url":"([^"]+)"', text)
@@ -321,19 +382,10 @@ def _extract_channel_meta_from_watch_page(video_url: str, ua: str) -> Tuple[str,
     Повертає (channel_name, channel_thumb) з watch-page.
     """
     try:
-        req = urllib.request.Request(
-            video_url,
-            headers={
-                "User-Agent": ua or _ANDROID_WEB_UA,
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://www.youtube.com",
-                "Connection": "keep-alive",
-            },
-        )
-        ctx = ssl._create_unverified_context()
-        with urllib.request.urlopen(req, timeout=8, context=ctx) as resp:
-            raw = resp.read(450_000)
-        text = raw.decode("utf-8", errors="ignore")
+        doc = _watch_page(video_url, ua)
+        if doc is None:
+            return "", ""
+        text = doc.text
 
         channel_name = ""
         for p in (
@@ -373,19 +425,10 @@ def _extract_channel_thumb_from_channel_page(channel_url: str, ua: str) -> str:
     if not channel_url:
         return ""
     try:
-        req = urllib.request.Request(
-            channel_url,
-            headers={
-                "User-Agent": ua or _ANDROID_WEB_UA,
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://www.youtube.com",
-                "Connection": "keep-alive",
-            },
-        )
-        ctx = ssl._create_unverified_context()
-        with urllib.request.urlopen(req, timeout=8, context=ctx) as resp:
-            raw = resp.read(350_000)
-        text = raw.decode("utf-8", errors="ignore")
+        doc = _page_document(f"channel:{channel_url}", channel_url, ua, _CHANNEL_PAGE_READ)
+        if doc is None:
+            return ""
+        text = doc.text
         m = re.search(r'<meta property="og:image" content="([^"]+)"', text)
         if not m:
             m = re.search(r'"avatar"\s*:\s*\{[^}]*"thumbnails"\s*:\s*\[\s*\{"url":"([^"]+)"', text)
@@ -422,109 +465,735 @@ def _pick_best_audio(
     prefer_compat: bool = False,
 ) -> Optional[Dict[str, Any]]:
     """
-    Пріоритезуємо аудіо потоки:
-      1) OPUS/webm
-      2) webm
-      3) m4a
-      4) будь-який audio-only
+    Аудіо-потік під поточну мережу (див. format_select.choose_audio):
+    найдешевший формат, що дотягує до цільового бітрейту. Серед рівних
+    лишається старий пріоритет OPUS/webm → webm → m4a → будь-який;
+    prefer_compat обмежує вибір AAC/M4A/MP3.
     """
-    if not formats:
-        return None
-
-    def is_audio(f: Dict[str, Any]) -> bool:
-        return f.get("vcodec") in (None, "none") and f.get("acodec") not in (None, "none") and f.get("url")
-
-    if prefer_compat:
-        # Режим сумісності для Android MediaPlayer: AAC/M4A спочатку.
-        for f in formats:
-            ac = str(f.get("acodec", "")).lower()
-            if is_audio(f) and (f.get("ext") in ("m4a", "mp4") or "mp4a" in ac or ac == "aac"):
-                return f
-        for f in formats:
-            if is_audio(f) and f.get("ext") in ("mp3", "aac"):
-                return f
-    else:
-        # 1) opus/webm
-        for f in formats:
-            if is_audio(f) and (str(f.get("acodec", "")).lower().startswith("opus") or f.get("ext") == "webm"):
-                return f
-
-        # 2) webm будь-який аудіо
-        for f in formats:
-            if is_audio(f) and f.get("ext") == "webm":
-                return f
-
-        # 3) m4a
-        for f in formats:
-            if is_audio(f) and f.get("ext") == "m4a":
-                return f
-
-    # 4) інший audio-only
-    for f in formats:
-        if is_audio(f):
-            return f
-
-    return None
+    return format_select.choose_audio(formats or [], prefer_compat=prefer_compat)
 
 
 def _pick_best_video(formats: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """
-    Відео для Android MediaPlayer:
+    Відео для Android MediaPlayer, клас за пріоритетом:
       1) HLS (m3u8) з відео
       2) muxed mp4 (vcodec!=none & acodec!=none, ext=mp4)
       3) будь-який відеопотік (vcodec!=none)
+    Всередині класу висоту визначають розмір SurfaceView і мережа
+    (див. format_select.choose_video).
+    """
+    return format_select.choose_video(formats or [])
+
+
+# ======================= YoutubeDL POOL ========================
+# Конструювання YoutubeDL (реєстр екстракторів, cookie jar, opener) дороге на
+# телефоні. Тримаємо кілька вже створених інстансів на кожен набір опцій
+# (включно з player_client). Інстанс одночасно видається лише одному потоку.
+_YDL_POOL_MAX_IDLE = 2
+_YDL_POOL_LOCK = threading.Lock()
+_YDL_POOL_IDLE: Dict[str, List[Any]] = {}
+_YDL_POOL_STATS: Dict[str, Any] = {"created": 0, "reused": 0, "construct_sec": 0.0, "saved_sec": 0.0}
+_MISSING = object()
+
+
+def _ydl_pool_key(opts: Dict[str, Any]) -> str:
+    # logger - окремий обʼєкт на кожен виклик, але без стану: в ключ не входить
+    return json.dumps(
+        {k: v for k, v in opts.items() if k != "logger"},
+        sort_keys=True,
+        default=repr,
+    )
+
+
+def _acquire_ydl(opts: Dict[str, Any]) -> Tuple[Any, str]:
+    key = _ydl_pool_key(opts)
+    stale: List[Any] = []
+    ydl = None
+    with _YDL_POOL_LOCK:
+        idle = _YDL_POOL_IDLE.get(key) or []
+        while idle:
+            candidate = idle.pop()
+            if not _ydl_is_current(candidate):
+                stale.append(candidate)
+                continue
+            created = max(1, int(_YDL_POOL_STATS["created"]))
+            _YDL_POOL_STATS["reused"] += 1
+            _YDL_POOL_STATS["saved_sec"] += _YDL_POOL_STATS["construct_sec"] / created
+            ydl = candidate
+            break
+    # close() може чекати на мережу - не під локом пулу
+    _close_ydls(stale)
+    if ydl is not None:
+        return ydl, key
+    started = time.monotonic()
+    ydl = ytdlp_cache.install(YoutubeDL(dict(opts)))
+    with _YDL_POOL_LOCK:
+        _YDL_POOL_STATS["created"] += 1
+        _YDL_POOL_STATS["construct_sec"] += time.monotonic() - started
+    return ydl, key
+
+
+def _ydl_is_current(ydl: Any) -> bool:
+    # після інвалідації кешу плеєра інстанс ще тримає старі дані в памʼяті
+    return getattr(ydl, "_pymusic_cache_gen", None) == ytdlp_cache.generation()
+
+
+def _close_ydls(ydls: List[Any]) -> None:
+    for ydl in ydls:
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+
+def _release_ydl(ydl: Any, key: str) -> None:
+    if _ydl_is_current(ydl):
+        with _YDL_POOL_LOCK:
+            idle = _YDL_POOL_IDLE.setdefault(key, [])
+            if len(idle) < _YDL_POOL_MAX_IDLE:
+                idle.append(ydl)
+                return
+    _close_ydls([ydl])
+
+
+@contextlib.contextmanager
+def borrow_ydl(opts: Dict[str, Any], overrides: Optional[Dict[str, Any]] = None):
+    """
+    Видає прогрітий YoutubeDL для `opts` замість `with YoutubeDL(opts)`.
+    `overrides` - параметри лише на цей виклик; після нього відновлюються.
+    """
+    ydl, key = _acquire_ydl(opts)
+    saved: Dict[str, Any] = {}
+    try:
+        for name, value in (overrides or {}).items():
+            saved[name] = ydl.params.get(name, _MISSING)
+            ydl.params[name] = value
+        yield ydl
+    finally:
+        for name, value in saved.items():
+            if value is _MISSING:
+                ydl.params.pop(name, None)
+            else:
+                ydl.params[name] = value
+        _release_ydl(ydl, key)
+
+
+def warm_ydl_pool() -> None:
+    """Заздалегідь створює інстанси для основної екстракції (кличеться у фоні)."""
+    for client in _allowed_clients():
+        opts = _client_opts(_bundle_opts(), client)
+        key = _ydl_pool_key(opts)
+        with _YDL_POOL_LOCK:
+            if _YDL_POOL_IDLE.get(key):
+                continue
+        try:
+            ydl, key = _acquire_ydl(opts)
+            _release_ydl(ydl, key)
+        except Exception as e:
+            print("[YTDLP] pool warm-up failed:", repr(e))
+
+
+def ydl_pool_stats() -> Dict[str, Any]:
+    """Скільки інстансів створено/перевикористано і скільки часу зекономлено."""
+    with _YDL_POOL_LOCK:
+        stats = dict(_YDL_POOL_STATS)
+        stats["idle"] = sum(len(v) for v in _YDL_POOL_IDLE.values())
+    created = max(1, int(stats["created"]))
+    stats["avg_construct_ms"] = round(stats["construct_sec"] * 1000.0 / created, 1)
+    stats["saved_ms"] = round(stats.pop("saved_sec") * 1000.0, 1)
+    stats["construct_ms"] = round(stats.pop("construct_sec") * 1000.0, 1)
+    return stats
+
+
+@contextlib.contextmanager
+def _record_comment_inputs(ydl: Any, ie_key: str = "Youtube"):
+    """
+    Поки триває екстракція, перехоплює виклик extract_comments екстрактора:
+    yt-dlp передає туди ytcfg, video_id, contents (initial data) і webpage.
+    Аргументи зберігаються у списку, що видається, а post-extractor не
+    створюється - коментарі потім перезапускаються через той самий
+    extract_comments на будь-якому YoutubeDL з пулу.
     """
-    if not formats:
+    recorded: list = []
+    ie = ydl.get_info_extractor(ie_key)
+
+    def extract_comments(*args, **kwargs):
+        if ie.get_param("getcomments"):
+            recorded.append((ie_key, args, kwargs))
         return None
 
-    # 1) HLS (m3u8)
-    for f in formats:
-        u = f.get("url") or ""
-        if "m3u8" in u and f.get("vcodec") not in (None, "none"):
-            return f
-
-    # 2) muxed mp4
-    for f in formats:
-        if (
-            f.get("url")
-            and f.get("vcodec") not in (None, "none")
-            and f.get("acodec") not in (None, "none")
-            and f.get("ext") == "mp4"
-        ):
-            return f
+    ie.extract_comments = extract_comments
+    try:
+        yield recorded
+    finally:
+        ie.__dict__.pop("extract_comments", None)
 
-    # 3) будь-який відеопотік
-    for f in formats:
-        if f.get("url") and f.get("vcodec") not in (None, "none"):
-            return f
 
-    return None
+class _DeferredPostExtract:
+    """
+    Відкладений post-extractor yt-dlp (коментарі).
+    Тримає лише ytcfg/initial data, збережені під час екстракції;
+    при першому виклику коментарі качаються через extract_comments
+    екстрактора на позиченому з пулу YoutubeDL.
+    """
+
+    def __init__(self, opts: Dict[str, Any], inputs: Optional[Tuple[str, Tuple[Any, ...], Dict[str, Any]]]):
+        self._opts = opts
+        self._inputs = inputs
+        self._lock = threading.Lock()
+        self._result: Optional[Dict[str, Any]] = None
+
+    def __call__(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._result is not None:
+                return self._result
+            inputs, self._inputs = self._inputs, None
+            result = None
+            if inputs is not None:
+                ie_key, args, kwargs = inputs
+                with borrow_ydl(self._opts) as ydl:
+                    post = ydl.get_info_extractor(ie_key).extract_comments(*args, **kwargs)
+                    result = post() if callable(post) else None
+            self._result = dict(result or {})
+            return self._result
+
+    def close(self) -> None:
+        with self._lock:
+            self._inputs = None
+
+
+# ==================== CLIENT RACE ====================
+# Замість android -> web по черзі запускаємо кілька клієнтів паралельно і
+# беремо перший результат з придатним аудіо. Порядок і склад гонки визначає
+# таблиця успішності/латентності клієнтів.
+# За замовчуванням у гонці android і клієнти з _RACE_DEFAULT_CLIENTS, яким
+# (за таблицею yt-dlp) не потрібні player JS (EJS), PO token і авторизація;
+# web-client вмикається лише явно (YTDLP_ALLOW_WEB_CLIENT / YTDLP_CLIENTS).
+_RACE_DEFAULT_CLIENTS = ("android", "visionos", "android_vr", "ios")
+# Скільки чекаємо переможця, якщо в опціях немає socket_timeout
+# (дефолт yt-dlp).
+_RACE_WAIT_SEC = 20.0
+
+
+def _client_opts(base_opts: Dict[str, Any], client: str) -> Dict[str, Any]:
+    opts = dict(base_opts)
+    extractor_args = dict(opts.get("extractor_args") or {})
+    youtube_args = dict(extractor_args.get("youtube") or {})
+    youtube_args["player_client"] = [client]
+    extractor_args["youtube"] = youtube_args
+    opts["extractor_args"] = extractor_args
+    return opts
+
+
+def _extract_with_client(
+    url: str,
+    base_opts: Dict[str, Any],
+    client: str,
+    defer_post_extract: bool,
+) -> Optional[Dict[str, Any]]:
+    opts = _client_opts(base_opts, client)
+    with stage_metrics.phase_tracker(
+        "ytdlp", video_id=_extract_video_id_from_url(url), client=client,
+    ):
+        info = _run_client_extraction(url, opts, defer_post_extract)
+    if info is not None:
+        info["_pymusic_client"] = client
+    return info
+
 
+def _run_client_extraction(
+    url: str,
+    opts: Dict[str, Any],
+    defer_post_extract: bool,
+) -> Optional[Dict[str, Any]]:
+    if defer_post_extract:
+        with borrow_ydl(opts) as ydl, _record_comment_inputs(ydl) as recorded:
+            info = ydl.extract_info(url, download=False)
+            if isinstance(info, dict):
+                info.pop("__post_extractor", None)
+                info["_pymusic_player_id"] = ytdlp_cache.last_player_id(ydl)
+                info["_pymusic_post_extract"] = _DeferredPostExtract(
+                    opts, recorded[0] if recorded else None,
+                )
+                return info
+        return None
+    with borrow_ydl(opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        if isinstance(info, dict):
+            info["_pymusic_player_id"] = ytdlp_cache.last_player_id(ydl)
+            return info
+    return None
 
 
 def _extract_info_with_clients(
     url: str,
     base_opts: Dict[str, Any],
-    clients: Tuple[str, ...]
+    clients: Tuple[str, ...],
+    *,
+    defer_post_extract: bool = False,
 ) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
     """
     По черзі пробуємо кілька player_client: ('android', 'web', ...)
     Повертаємо (info_dict | None, last_exception | None)
+
+    defer_post_extract=True: post-extractor (коментарі при getcomments) не
+    виконується під час екстракції, а кладеться в info['_pymusic_post_extract'].
     """
     last_err: Optional[Exception] = None
     for client in clients:
-        opts = dict(base_opts)
-        opts["extractor_args"] = {"youtube": {"player_client": [client]}}
+        started = time.monotonic()
         try:
-            with YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                if isinstance(info, dict):
-                    return info, None
+            info = _extract_with_client(url, base_opts, client, defer_post_extract)
         except Exception as e:
+            _record_client(client, False, time.monotonic() - started)
             last_err = e
+            continue
+        _record_client(client, _has_playable_audio(info), time.monotonic() - started)
+        if info is not None:
+            return info, None
     return None, last_err
 
 
+def _client_needs_po_token(source: Dict[str, Any]) -> bool:
+    """Клієнт з таблиці yt-dlp вимагає авторизацію або PO token (player/https)."""
+    if source.get("REQUIRE_AUTH"):
+        return True
+    player_pot = source.get("PLAYER_PO_TOKEN_POLICY")
+    if getattr(player_pot, "required", False):
+        return True
+    gvs = source.get("GVS_PO_TOKEN_POLICY") or {}
+    https_pot = next(
+        (v for k, v in gvs.items() if str(getattr(k, "value", k)) == "https"), None,
+    )
+    return bool(getattr(https_pot, "required", False))
+
+
+def _default_race_clients() -> Tuple[str, ...]:
+    try:
+        from yt_dlp.extractor.youtube._base import INNERTUBE_CLIENTS
+    except Exception:
+        return ("android",)
+    extra = tuple(
+        name for name in _RACE_DEFAULT_CLIENTS[1:]
+        if INNERTUBE_CLIENTS.get(name)
+        and not INNERTUBE_CLIENTS[name].get("REQUIRE_JS_PLAYER", True)
+        and not _client_needs_po_token(INNERTUBE_CLIENTS[name])
+    )
+    return ("android",) + extra
+
+
+def _allowed_clients() -> Tuple[str, ...]:
+    # На Android часто ламається web-client через PO Token/EJS,
+    # що дає "Only images are available" і цикл -1004/-38 у MediaPlayer.
+    # Тому за замовчуванням НЕ використовуємо web-client.
+    configured = [c.strip() for c in str(os.environ.get("YTDLP_CLIENTS") or "").split(",") if c.strip()]
+    if configured:
+        return tuple(dict.fromkeys(configured))
+    clients = _default_race_clients()
+    if _env_bool("YTDLP_ALLOW_WEB_CLIENT", False):
+        clients += ("web",)
+    return clients
+
+
+_CLIENT_STATS_LOCK = threading.Lock()
+_CLIENT_STATS: Dict[str, Dict[str, float]] = {}
+_CLIENT_LATENCY_ALPHA = 0.3
+# клієнт з такою частотою успіху (після _CLIENT_MIN_TRIES спроб) не стартує в гонці
+_CLIENT_MIN_RATE = 0.2
+_CLIENT_MIN_TRIES = 5
+
+
+def _has_playable_audio(info: Optional[Dict[str, Any]]) -> bool:
+    if not isinstance(info, dict):
+        return False
+    return _pick_best_audio(info.get("formats") or []) is not None
+
+
+def _record_client(client: str, ok: bool, latency: float) -> None:
+    with _CLIENT_STATS_LOCK:
+        row = _CLIENT_STATS.setdefault(client, {"ok": 0, "fail": 0, "latency": 0.0})
+        row["ok" if ok else "fail"] += 1
+        if row["latency"] <= 0:
+            row["latency"] = float(latency)
+        else:
+            row["latency"] += _CLIENT_LATENCY_ALPHA * (float(latency) - row["latency"])
+
+
+def _client_score(client: str) -> Tuple[float, float]:
+    row = _CLIENT_STATS.get(client) or {}
+    ok = float(row.get("ok") or 0)
+    fail = float(row.get("fail") or 0)
+    # згладжування: новий клієнт стартує з 0.5
+    rate = (ok + 1.0) / (ok + fail + 2.0)
+    return rate, float(row.get("latency") or 0.0)
+
+
+def _ranked_clients(clients: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+    """(учасники гонки, запасні) - за успішністю, потім за латентністю."""
+    with _CLIENT_STATS_LOCK:
+        scored = {c: _client_score(c) for c in clients}
+        tries = {
+            c: (_CLIENT_STATS.get(c) or {}).get("ok", 0) + (_CLIENT_STATS.get(c) or {}).get("fail", 0)
+            for c in clients
+        }
+    ordered = sorted(clients, key=lambda c: (-scored[c][0], scored[c][1]))
+    width = max(1, int(os.environ.get("YTDLP_RACE_WIDTH", "2") or 2))
+    racers: List[str] = []
+    spare: List[str] = []
+    for client in ordered:
+        weak = tries[client] >= _CLIENT_MIN_TRIES and scored[client][0] < _CLIENT_MIN_RATE
+        if len(racers) < width and not weak:
+            racers.append(client)
+        else:
+            spare.append(client)
+    if not racers:
+        racers, spare = ordered[:1], ordered[1:]
+    return racers, spare
+
+
+def client_stats() -> Dict[str, Dict[str, Any]]:
+    """Таблиця клієнтів: успіхи/невдачі, частота успіху, EWMA латентності."""
+    with _CLIENT_STATS_LOCK:
+        out = {}
+        for client, row in _CLIENT_STATS.items():
+            rate, latency = _client_score(client)
+            out[client] = {
+                "ok": int(row["ok"]),
+                "fail": int(row["fail"]),
+                "rate": round(rate, 3),
+                "latency_ms": round(latency * 1000.0, 1),
+            }
+    return out
+
+
+def _discard_info(info: Optional[Dict[str, Any]]) -> None:
+    post = (info or {}).get("_pymusic_post_extract")
+    close = getattr(post, "close", None)
+    if callable(close):
+        close()
+
+
+def _race_clients(
+    url: str,
+    base_opts: Dict[str, Any],
+    clients: Tuple[str, ...],
+    *,
+    defer_post_extract: bool = False,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+    """
+    Як _extract_info_with_clients, але учасники гонки стартують одночасно.
+    Перемагає перший info з придатним аудіо. Переможця чекаємо не довше
+    socket_timeout; після цього гонка закрита і програвші (yt-dlp не вміє
+    переривати екстракцію посеред запиту) лише відкидають свій результат.
+    """
+    if not _env_bool("YTDLP_CLIENT_RACE", True) or len(clients) < 2:
+        return _extract_info_with_clients(url, base_opts, clients, defer_post_extract=defer_post_extract)
+
+    racers, spare = _ranked_clients(clients)
+    if len(racers) < 2:
+        return _extract_info_with_clients(
+            url, base_opts, tuple(racers + spare), defer_post_extract=defer_post_extract,
+        )
+
+    lock = threading.Lock()
+    done = threading.Event()
+    state: Dict[str, Any] = {
+        "winner": None, "fallback": None, "error": None, "left": len(racers), "closed": False,
+    }
+
+    def run(client: str) -> None:
+        started = time.monotonic()
+        info: Optional[Dict[str, Any]] = None
+        err: Optional[Exception] = None
+        try:
+            info = _extract_with_client(url, base_opts, client, defer_post_extract)
+        except Exception as e:
+            err = e
+        playable = _has_playable_audio(info)
+        _record_client(client, playable, time.monotonic() - started)
+        keep = False
+        with lock:
+            state["left"] -= 1
+            if err is not None and not state["closed"]:
+                state["error"] = err
+            if state["closed"]:
+                # гонку вже закрито (переможець чи таймаут) - результат не потрібен
+                pass
+            elif state["winner"] is None and playable:
+                state["winner"] = (client, info)
+                keep = True
+                done.set()
+            elif state["winner"] is None and info is not None and state["fallback"] is None:
+                state["fallback"] = info
+                keep = True
+            if state["left"] <= 0:
+                done.set()
+        if not keep:
+            _discard_info(info)
+
+    for client in racers:
+        threading.Thread(target=run, args=(client,), name=f"pymusic-ytdlp-{client}", daemon=True).start()
+    wait_sec = float(base_opts.get("socket_timeout") or _RACE_WAIT_SEC)
+    if not done.wait(wait_sec):
+        print(f"[YTDLP] client race {racers}: no result in {wait_sec:.0f}s")
+
+    with lock:
+        state["closed"] = True
+        winner = state["winner"]
+        fallback, state["fallback"] = state["fallback"], None
+        err = state["error"]
+        if winner is None and fallback is None and err is None:
+            err = TimeoutError(f"client race timed out after {wait_sec:.0f}s")
+    if winner is not None:
+        _discard_info(fallback)
+        print(f"[YTDLP] client race won by {winner[0]} of {racers}")
+        return winner[1], None
+    if spare:
+        info, spare_err = _extract_info_with_clients(
+            url, base_opts, tuple(spare), defer_post_extract=defer_post_extract,
+        )
+        if _has_playable_audio(info) or fallback is None:
+            _discard_info(fallback)
+            return info, spare_err or err
+        _discard_info(info)
+    return fallback, (None if fallback is not None else err)
+
+
+# ==================== SHARED PER-VIDEO EXTRACTION ====================
+# Один прохід yt-dlp на відео: аудіо, muxed-відео, метадані, канал,
+# схожі відео та кількість коментарів беруться з одного info_dict.
+_YT_HTTP_HEADERS = {
+    "User-Agent": _ANDROID_YT_UA,    # підказка для бекенда
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.youtube.com",
+    "Connection": "keep-alive",
+}
+_BUNDLE_TTL_SEC = 10 * 60
+_BUNDLE_MAX = 12
+_BUNDLE_MAX_COMMENTS = 3
+_BUNDLE_LOCK = threading.Lock()
+_BUNDLE_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_BUNDLE_INFLIGHT: Dict[str, Dict[str, Any]] = {}
+# Важкі поля, які жоден споживач не читає: не тримаємо їх у памʼяті.
+_BUNDLE_DROP_KEYS = ("automatic_captions", "subtitles", "heatmap", "requested_formats", "thumbnails")
+
+
+def _bundle_key(video_url: str) -> str:
+    return _extract_video_id_from_url(video_url) or str(video_url or "").strip()
+
+
+def _bundle_opts() -> Dict[str, Any]:
+    return {
+        "quiet": True,
+        "skip_download": True,
+        "noplaylist": True,
+        # TLS-перевірку не вимикаємо: цими ж опціями качаються коментарі.
+        "logger": YDLLogger(),
+        # Формати споживачі обирають самі з info['formats'];
+        # тут лише щоб info['url'] був аудіо як крайній фолбек.
+        "format": "bestaudio/best",
+        "http_headers": dict(_YT_HTTP_HEADERS),
+        "extractor_retries": 2,
+        "ignoreerrors": "only_download",
+        # Коментарі: post-extractor відкладений, качається лише на запит.
+        "getcomments": True,
+        "extractor_args": {
+            "youtube": {
+                "comment_sort": ["top"],
+                "max_comments": [f"{_BUNDLE_MAX_COMMENTS},all,all,0"],
+            }
+        },
+    }
+
+
+def _close_bundle(bundle: Optional[Dict[str, Any]]) -> None:
+    post = (bundle or {}).get("post_extract")
+    close = getattr(post, "close", None)
+    if callable(close):
+        close()
+
+
+def _bundle_fresh(created_at: float, bundle: Dict[str, Any]) -> bool:
+    if (time.monotonic() - float(created_at)) > _BUNDLE_TTL_SEC:
+        return False
+    expire_ts = bundle.get("expire_ts")
+    if expire_ts and int(time.time()) + 120 >= int(expire_ts):
+        return False
+    return True
+
+
+def _build_video_bundle(video_url: str, key: str) -> Dict[str, Any]:
+    with stage_metrics.span("bundle.extract", video_id=key) as sp:
+        info, err = _race_clients(
+            video_url,
+            _bundle_opts(),
+            _allowed_clients(),
+            defer_post_extract=True,
+        )
+        sp.client = str((info or {}).get("_pymusic_client") or "")
+        if not info:
+            sp.outcome = "failed"
+    if not info:
+        print(f"[YTDLP] extract failed: {repr(err)}")
+        raise RuntimeError("YouTube не повернув метадані (онови yt-dlp в APK).")
+    client = str(info.get("_pymusic_client") or "")
+
+    post_extract = info.pop("_pymusic_post_extract", None)
+    for drop in _BUNDLE_DROP_KEYS:
+        info.pop(drop, None)
+
+    ua = _YT_HTTP_HEADERS.get("User-Agent", _ANDROID_WEB_UA)
+    thumb = _normalize_img_url(info.get("thumbnail", "") or "")
+    title = info.get("title") or ""
+    channel = info.get("channel") or info.get("uploader") or info.get("creator") or info.get("artist") or ""
+    channel_thumb = _normalize_img_url(
+        info.get("channel_thumbnail")
+        or info.get("uploader_thumbnail")
+        or ""
+    )
+    channel_url = (
+        info.get("channel_url")
+        or info.get("uploader_url")
+        or ""
+    )
+    channel_id = info.get("channel_id") or info.get("uploader_id") or ""
+    if not channel_url and channel_id:
+        channel_url = f"https://www.youtube.com/channel/{channel_id}"
+    if (not channel) or (not channel_thumb):
+        with stage_metrics.span("bundle.channel_meta", video_id=key, client=client) as sp:
+            page_channel, page_thumb = _extract_channel_meta_from_watch_page(str(video_url or ""), ua)
+            sp.outcome = "ok" if (page_channel or page_thumb) else "empty"
+        if (not channel) and page_channel:
+            channel = page_channel
+        if (not channel_thumb) and page_thumb:
+            channel_thumb = _normalize_img_url(page_thumb)
+    if not channel_thumb:
+        with stage_metrics.span("bundle.channel_thumb_watch", video_id=key, client=client) as sp:
+            channel_thumb = _extract_channel_thumb_from_watch_page(str(video_url or ""), ua)
+            sp.outcome = "ok" if channel_thumb else "empty"
+    if not channel_thumb:
+        with stage_metrics.span("bundle.channel_thumb_page", video_id=key, client=client) as sp:
+            channel_thumb = _extract_channel_thumb_from_channel_page(str(channel_url or ""), ua)
+            sp.outcome = "ok" if channel_thumb else "empty"
+    channel_thumb = _normalize_img_url(channel_thumb or "")
+    related_videos = info.get("related_videos") or []
+    if not related_videos:
+        with stage_metrics.span("bundle.related_fallback", video_id=key, client=client) as sp:
+            related_videos = _extract_related_from_watch_page(
+                str(video_url or ""),
+                _ANDROID_WEB_UA,
+                limit=12,
+            )
+            sp.outcome = "ok" if related_videos else "empty"
+    comment_count = info.get("comment_count")
+    try:
+        comment_count = int(comment_count) if comment_count is not None else None
+    except Exception:
+        comment_count = None
+
+    return {
+        "video_id": key,
+        "info": info,
+        "thumb": thumb,
+        "title": title,
+        "channel": channel,
+        "channel_url": channel_url,
+        "channel_thumb": channel_thumb,
+        "view_count": info.get("view_count"),
+        "related_videos": related_videos,
+        "comment_count": comment_count,
+        "expire_ts": _parse_expire_ts(str(info.get("url") or "")),
+        "post_extract": post_extract,
+        "player_id": info.get("_pymusic_player_id"),
+    }
+
+
+def extract_video_bundle(video_url: str, *, force: bool = False) -> Dict[str, Any]:
+    """
+    Єдина екстракція yt-dlp на video ID, спільна для аудіо, muxed-відео,
+    метаданих і коментарів. Паралельні запити того самого ID чекають на
+    один прохід; результат кешується на _BUNDLE_TTL_SEC.
+    Повертає dict з 'info' (сирий info_dict) та готовими метаданими.
+    """
+    key = _bundle_key(video_url)
+    if not key:
+        raise RuntimeError("Порожній URL відео.")
+
+    with _BUNDLE_LOCK:
+        cached = _BUNDLE_CACHE.get(key)
+        if cached and not force and _bundle_fresh(cached[0], cached[1]):
+            return cached[1]
+        waiter = _BUNDLE_INFLIGHT.get(key)
+        leader = waiter is None
+        if leader:
+            waiter = {"event": threading.Event(), "result": None, "error": None}
+            _BUNDLE_INFLIGHT[key] = waiter
+
+    if not leader:
+        waiter["event"].wait()
+        if waiter["error"] is not None:
+            raise waiter["error"]
+        return waiter["result"]
+
+    try:
+        bundle = _build_video_bundle(video_url, key)
+        waiter["result"] = bundle
+        print(f"[YTDLP] ydl pool {ydl_pool_stats()}")
+        print(f"[YTDLP] player cache {ytdlp_cache.cache_stats()}")
+        print(f"[YTDLP] clients {client_stats()}")
+        evicted = []
+        with _BUNDLE_LOCK:
+            old = _BUNDLE_CACHE.pop(key, None)
+            if old:
+                evicted.append(old[1])
+            while len(_BUNDLE_CACHE) >= _BUNDLE_MAX:
+                oldest = next(iter(_BUNDLE_CACHE.keys()))
+                evicted.append(_BUNDLE_CACHE.pop(oldest)[1])
+            _BUNDLE_CACHE[key] = (time.monotonic(), bundle)
+        for old_bundle in evicted:
+            _close_bundle(old_bundle)
+        return bundle
+    except Exception as e:
+        waiter["error"] = e
+        raise
+    finally:
+        with _BUNDLE_LOCK:
+            _BUNDLE_INFLIGHT.pop(key, None)
+        waiter["event"].set()
+
+
+def invalidate_video_bundle(video_url: str) -> None:
+    """Скидає кеш екстракції (напр. після 403/-1004 на виданому URL)."""
+    with _BUNDLE_LOCK:
+        cached = _BUNDLE_CACHE.pop(_bundle_key(video_url), None)
+    if cached:
+        _close_bundle(cached[1])
+
+
+def report_stream_rejected(video_url: str, status: int) -> bool:
+    """
+    Сервер відхилив перший range виданого URL (HTTP 403/410) при живій
+    мережі: підпис/nsig, найімовірніше, зібрані зі застарілого кешу плеєра -
+    скидаємо його. Інші статуси (обрив мережі, IO) ігноруються. Лічильник
+    відмов fast path веде окремо report_fast_path_rejected.
+    """
+    if status not in (403, 410):
+        return False
+    with _BUNDLE_LOCK:
+        cached = _BUNDLE_CACHE.get(_bundle_key(video_url))
+    player_id = (cached[1].get("player_id") if cached else None)
+    return ytdlp_cache.invalidate_player(player_id, reason="stream rejected on first range")
+
+
+def extract_bundle_comments(video_url: str) -> List[Dict[str, Any]]:
+    """Топ-коментарі з того ж проходу yt-dlp (догружаються лише при першому виклику)."""
+    bundle = extract_video_bundle(video_url)
+    post = bundle.get("post_extract")
+    if not callable(post):
+        return []
+    return list(post().get("comments") or [])
+
+
 # ==================== PUBLIC: HEADERS → Java HashMap ====================
 def py_headers_to_javamap(headers: Dict[str, str], HashMapClass) -> Any:
     """
@@ -549,6 +1218,230 @@ def py_headers_to_javamap(headers: Dict[str, str], HashMapClass) -> Any:
     return m
 
 
+# ==================== INNERTUBE FAST PATH ====================
+# Для звичайного публічного відео один POST youtubei/v1/player вже містить
+# streamingData з прямими аудіо-URL - без watch-page і без обробки форматів
+# yt-dlp. Клієнт береться з таблиці yt-dlp: лише той, якому не потрібні
+# player JS (підписи/nsig), авторизація та PO token для https-потоків.
+# Все, що не вкладається в ці умови, йде звичайним шляхом через yt-dlp.
+_FAST_CLIENT_PREFERENCE = ("android", "visionos", "ios", "android_vr")
+_FAST_BLOCK_SEC = 30 * 60
+_FAST_MAX_REJECTS = 3
+_FAST_LOCK = threading.Lock()
+# video_id -> audio URL, виданий fast path (щоб рахувати відмови лише по ньому)
+_FAST_SERVED: Dict[str, str] = {}
+_FAST_BLOCKED: Dict[str, float] = {}
+_FAST_STATE: Dict[str, Any] = {"rejects": 0, "disabled_until": 0.0, "profile": None}
+
+
+def _fast_client_profile() -> Optional[Dict[str, Any]]:
+    with _FAST_LOCK:
+        if _FAST_STATE["profile"] is not None:
+            return _FAST_STATE["profile"] or None
+    profile: Dict[str, Any] = {}
+    try:
+        from yt_dlp.extractor.youtube._base import INNERTUBE_CLIENTS
+
+        configured = [
+            c.strip() for c in str(os.environ.get("YTDLP_FAST_CLIENTS") or "").split(",") if c.strip()
+        ]
+        for name in configured or _FAST_CLIENT_PREFERENCE:
+            source = INNERTUBE_CLIENTS.get(name) or {}
+            if not source or source.get("REQUIRE_JS_PLAYER") or _client_needs_po_token(source):
+                continue
+            context = json.loads(json.dumps(source.get("INNERTUBE_CONTEXT") or {}))
+            client = context.setdefault("client", {})
+            profile = {
+                "name": name,
+                "host": str(os.environ.get("YTDLP_FAST_HOST") or source.get("INNERTUBE_HOST") or "www.youtube.com"),
+                "number": str(source.get("INNERTUBE_CONTEXT_CLIENT_NAME") or ""),
+                "context": context,
+                "user_agent": str(client.get("userAgent") or _ANDROID_YT_UA),
+            }
+            break
+    except Exception as e:
+        print("[YTDLP] fast path: client table unavailable:", repr(e))
+    with _FAST_LOCK:
+        _FAST_STATE["profile"] = profile
+    if profile:
+        print(f"[YTDLP] fast path client={profile['name']}")
+    else:
+        print("[YTDLP] fast path: no client without JS player/PO token, disabled")
+    return profile or None
+
+
+def _fast_path_allowed(vid: str) -> bool:
+    if not vid or not _env_bool("YTDLP_FAST_PLAYER", True):
+        return False
+    now = time.monotonic()
+    with _FAST_LOCK:
+        if now < float(_FAST_STATE["disabled_until"]):
+            return False
+        until = _FAST_BLOCKED.get(vid)
+        if until is not None and now < until:
+            return False
+        _FAST_BLOCKED.pop(vid, None)
+    return True
+
+
+def report_fast_path_rejected(video_url: str, audio_url: str, status: int) -> bool:
+    """
+    URL з fast path сервер відхилив (HTTP 403/410): відео йде через yt-dlp,
+    а після кількох відмов поспіль fast path вимикається на час
+    _FAST_BLOCK_SEC. Обриви мережі та URL, видані yt-dlp, не рахуються.
+    """
+    if status not in (403, 410) or not audio_url:
+        return False
+    vid = _extract_video_id_from_url(video_url)
+    now = time.monotonic()
+    with _FAST_LOCK:
+        if _FAST_SERVED.get(vid) != audio_url:
+            return False
+        _FAST_SERVED.pop(vid, None)
+        _FAST_BLOCKED[vid] = now + _FAST_BLOCK_SEC
+        _FAST_STATE["rejects"] += 1
+        if _FAST_STATE["rejects"] >= _FAST_MAX_REJECTS:
+            _FAST_STATE["rejects"] = 0
+            _FAST_STATE["disabled_until"] = now + _FAST_BLOCK_SEC
+            print("[YTDLP] fast path disabled after repeated stream rejects")
+    return True
+
+
+def _innertube_format(fmt: Dict[str, Any]) -> Dict[str, Any]:
+    """Формат streamingData -> dict у стилі yt-dlp (для _pick_best_*)."""
+    mime = str(fmt.get("mimeType") or "")
+    kind, _, rest = mime.partition("/")
+    subtype = rest.split(";", 1)[0].strip()
+    m = re.search(r'codecs="([^"]*)"', mime)
+    codecs = [c.strip() for c in (m.group(1) if m else "").split(",") if c.strip()]
+    if kind == "audio":
+        vcodec, acodec = "none", (codecs[0] if codecs else "none")
+        ext = "m4a" if subtype == "mp4" else subtype
+    else:
+        vcodec = codecs[0] if codecs else "none"
+        acodec = codecs[1] if len(codecs) > 1 else "none"
+        ext = subtype
+    bitrate = fmt.get("averageBitrate") or fmt.get("bitrate")
+    return {
+        "format_id": str(fmt.get("itag") or ""),
+        "url": fmt.get("url") or "",
+        "ext": ext,
+        "acodec": acodec,
+        "vcodec": vcodec,
+        "height": fmt.get("height"),
+        "tbr": (float(bitrate) / 1000.0) if bitrate else None,
+        "abr": (float(bitrate) / 1000.0) if bitrate and kind == "audio" else None,
+        "filesize": int(fmt["contentLength"]) if str(fmt.get("contentLength") or "").isdigit() else None,
+        "protocol": "https",
+        "_signature_cipher": bool(fmt.get("signatureCipher") or fmt.get("cipher")),
+    }
+
+
+def _innertube_player(vid: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {
+        "context": profile["context"],
+        "videoId": vid,
+        "contentCheckOk": True,
+        "racyCheckOk": True,
+        "playbackContext": {"contentPlaybackContext": {"html5Preference": "HTML5_PREF_WANTS"}},
+    }
+    client = profile["context"].get("client") or {}
+    headers = {
+        "User-Agent": profile["user_agent"],
+        "Content-Type": "application/json",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Origin": "https://www.youtube.com",
+        "X-YouTube-Client-Name": profile["number"],
+        "X-YouTube-Client-Version": str(client.get("clientVersion") or ""),
+    }
+    host = profile["host"]
+    base = host if host.startswith("http") else f"https://{host}"
+    resp = http_transport.post(
+        f"{base}/youtubei/v1/player?prettyPrint=false",
+        content=json.dumps(payload).encode("utf-8"),
+        headers=headers,
+        timeout=6,
+    )
+    resp.raise_for_status()
+    return json.loads(resp.content.decode("utf-8", errors="ignore"))
+
+
+def _fast_audio_info(video_url: str, *, prefer_compat: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Аудіо через прямий youtubei/v1/player. None - якщо потрібен yt-dlp
+    (не OK playability, підписи, SABR-only, немає клієнта без PO token).
+    """
+    vid = _extract_video_id_from_url(video_url)
+    if not _fast_path_allowed(vid):
+        return None
+    profile = _fast_client_profile()
+    if not profile:
+        return None
+    started = time.monotonic()
+    try:
+        data = _innertube_player(vid, profile)
+    except Exception as e:
+        print(f"[YTDLP] fast path request failed: {repr(e)}")
+        return None
+
+    status = str(((data or {}).get("playabilityStatus") or {}).get("status") or "")
+    if status != "OK":
+        print(f"[YTDLP] fast path: playability={status or '?'} -> yt-dlp")
+        return None
+    streaming = data.get("streamingData") or {}
+    fmts = [
+        _innertube_format(f)
+        for f in (streaming.get("adaptiveFormats") or []) + (streaming.get("formats") or [])
+        if isinstance(f, dict)
+    ]
+    chosen = _pick_best_audio(fmts, prefer_compat=prefer_compat)
+    if not chosen:
+        reason = "signatures" if any(f["_signature_cipher"] for f in fmts) else "no direct audio"
+        print(f"[YTDLP] fast path: {reason} -> yt-dlp")
+        return None
+
+    details = data.get("videoDetails") or {}
+    thumbs = ((details.get("thumbnail") or {}).get("thumbnails")) or []
+    thumb = _normalize_img_url(str((thumbs[-1] or {}).get("url") or "")) if thumbs else ""
+    channel_id = str(details.get("channelId") or "")
+    try:
+        view_count = int(details.get("viewCount")) if details.get("viewCount") is not None else None
+    except Exception:
+        view_count = None
+    url = chosen["url"]
+    headers = _best_effort_headers({"User-Agent": profile["user_agent"]}, _YT_HTTP_HEADERS)
+    with _FAST_LOCK:
+        _FAST_SERVED.pop(vid, None)
+        _FAST_SERVED[vid] = url
+        while len(_FAST_SERVED) > 64:
+            _FAST_SERVED.pop(next(iter(_FAST_SERVED)), None)
+    print(
+        f"[YTDLP] fast path {profile['name']} {int((time.monotonic() - started) * 1000)}ms "
+        f"audio_format={chosen['format_id']!r}/{chosen['ext']!r}/{chosen['acodec']!r}"
+    )
+    return {
+        "audio_url": url,
+        "thumb": thumb or f"https://i.ytimg.com/vi/{vid}/hqdefault.jpg",
+        "title": str(details.get("title") or ""),
+        "channel": str(details.get("author") or ""),
+        "channel_url": f"https://www.youtube.com/channel/{channel_id}" if channel_id else "",
+        "view_count": view_count,
+        # аватара немає у player-відповіді; related вантажиться окремо
+        "channel_thumb": "",
+        "related_videos": [],
+        "expire_ts": _parse_expire_ts(url),
+        "http_headers": headers,
+        "format_id": chosen["format_id"],
+        "ext": chosen["ext"],
+        "acodec": chosen["acodec"],
+    }
+
+
+def channel_thumb_for(channel_url: str) -> str:
+    """Аватар каналу зі сторінки каналу (кешується разом зі сторінкою)."""
+    return _normalize_img_url(_extract_channel_thumb_from_channel_page(str(channel_url or ""), _ANDROID_WEB_UA) or "")
+
+
 # ============================ AUDIO API ================================
 def extract_audio_info(video_url: str, *, prefer_compat: bool = False) -> Dict[str, Any]:
     """
@@ -565,58 +1458,37 @@ def extract_audio_info(video_url: str, *, prefer_compat: bool = False) -> Dict[s
         'http_headers': Dict[str, str],   # заголовки для доступу до CDN
       }
     Стійко працює при збоях nsig, пріоритет Android-клієнт.
+    Спершу пробує прямий youtubei/v1/player (_fast_audio_info), інакше -
+    екстракція спільна з відео/коментарями (див. extract_video_bundle).
     """
-    BASE_OPTS = {
-        "quiet": True,
-        "skip_download": True,
-        "noplaylist": True,
-        "nocheckcertificate": True,
-        "logger": YDLLogger(),
-        "format": (
-            "bestaudio[ext=m4a]/"
-            "bestaudio[ext=mp4]/"
-            "bestaudio[acodec*=mp4a]/"
-            "bestaudio/best/"
-            "best[protocol^=m3u8]"
-            if prefer_compat else
-            "bestaudio[acodec^=opus]/"
-            "bestaudio[ext=webm]/"
-            "bestaudio[ext=m4a]/"
-            "bestaudio/best/"
-            "best[protocol^=m3u8]"  # як крайній випадок
-        ),
-        "http_headers": {
-            "User-Agent": _ANDROID_YT_UA,    # підказка для бекенда
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://www.youtube.com",
-            "Connection": "keep-alive",
-        },
-        "extractor_retries": 2,
-        "ignoreerrors": "only_download",
-    }
-
-    # На Android часто ламається web-client через PO Token/EJS,
-    # що дає "Only images are available" і цикл -1004/-38 у MediaPlayer.
-    # Тому за замовчуванням НЕ використовуємо web-client.
-    allow_web_client = _env_bool("YTDLP_ALLOW_WEB_CLIENT", False)
-    if allow_web_client:
-        clients = ("android", "web")
-    else:
-        clients = ("android",)
-    info, err = _extract_info_with_clients(video_url, BASE_OPTS, clients)
-    if not info:
-        print(f"[AUDIO] extract failed: {repr(err)}")
-        raise RuntimeError("YouTube не повернув метадані (онови yt-dlp в APK).")
+    vid = _extract_video_id_from_url(video_url)
+    with stage_metrics.span("audio.total", video_id=vid) as total:
+        with stage_metrics.span("audio.fast_path", video_id=vid) as sp:
+            fast = _fast_audio_info(video_url, prefer_compat=prefer_compat)
+            sp.outcome = "ok" if fast is not None else "fallback"
+        if fast is not None:
+            total.client = "innertube"
+            return fast
+        return _extract_audio_info_bundle(video_url, vid, prefer_compat)
+
+
+def _extract_audio_info_bundle(video_url: str, vid: str, prefer_compat: bool) -> Dict[str, Any]:
+    with stage_metrics.span("audio.bundle", video_id=vid):
+        bundle = extract_video_bundle(video_url)
+    info = bundle["info"]
+    client = str(info.get("_pymusic_client") or "")
 
     fmts = info.get("formats") or []
-    chosen: Optional[Dict[str, Any]] = _pick_best_audio(fmts, prefer_compat=prefer_compat)
+    with stage_metrics.span("audio.format_select", video_id=vid, client=client) as sp:
+        chosen: Optional[Dict[str, Any]] = _pick_best_audio(fmts, prefer_compat=prefer_compat)
+        sp.outcome = "ok" if chosen else "none"
     if chosen and chosen.get("url"):
         url = chosen["url"]
-        headers = _best_effort_headers(chosen.get("http_headers"), BASE_OPTS["http_headers"])
+        headers = _best_effort_headers(chosen.get("http_headers"), _YT_HTTP_HEADERS)
     else:
         # fallback: інколи info['url'] вже містить audio-only
         url = info.get("url") or ""
-        headers = _best_effort_headers(info.get("http_headers"), BASE_OPTS["http_headers"])
+        headers = _best_effort_headers(info.get("http_headers"), _YT_HTTP_HEADERS)
 
     selected_format_id = str((chosen or {}).get("format_id") or info.get("format_id") or "")
     selected_ext = str((chosen or {}).get("ext") or info.get("ext") or "")
@@ -626,51 +1498,10 @@ def extract_audio_info(video_url: str, *, prefer_compat: bool = False) -> Dict[s
         # типовий випадок "Only images are available"
         raise RuntimeError("Не знайдено жодного аудіо-формату (YouTube віддав тільки зображення).")
 
-    thumb = _normalize_img_url(info.get("thumbnail", "") or "")
-    title = info.get("title") or ""
-    channel = info.get("channel") or info.get("uploader") or info.get("creator") or info.get("artist") or ""
-    view_count = info.get("view_count")
-    channel_thumb = (
-        info.get("channel_thumbnail")
-        or info.get("uploader_thumbnail")
-        or ""
-    )
-    channel_thumb = _normalize_img_url(channel_thumb or "")
-    channel_url = (
-        info.get("channel_url")
-        or info.get("uploader_url")
-        or ""
-    )
-    channel_id = info.get("channel_id") or info.get("uploader_id") or ""
-    if not channel_url and channel_id:
-        channel_url = f"https://www.youtube.com/channel/{channel_id}"
-    if (not channel) or (not channel_thumb):
-        page_channel, page_thumb = _extract_channel_meta_from_watch_page(
-            str(video_url or ""),
-            BASE_OPTS.get("http_headers", {}).get("User-Agent", _ANDROID_WEB_UA),
-        )
-        if (not channel) and page_channel:
-            channel = page_channel
-        if (not channel_thumb) and page_thumb:
-            channel_thumb = _normalize_img_url(page_thumb)
-    if not channel_thumb:
-        channel_thumb = _extract_channel_thumb_from_watch_page(
-            str(video_url or ""),
-            BASE_OPTS.get("http_headers", {}).get("User-Agent", _ANDROID_WEB_UA),
-        )
-    if not channel_thumb:
-        channel_thumb = _extract_channel_thumb_from_channel_page(
-            str(channel_url or ""),
-            BASE_OPTS.get("http_headers", {}).get("User-Agent", _ANDROID_WEB_UA),
-        )
-    channel_thumb = _normalize_img_url(channel_thumb or "")
-    related_videos = info.get("related_videos") or []
-    if not related_videos:
-        related_videos = _extract_related_from_watch_page(
-            str(video_url or ""),
-            _ANDROID_WEB_UA,
-            limit=12,
-        )
+    title = bundle.get("title") or ""
+    channel = bundle.get("channel") or ""
+    view_count = bundle.get("view_count")
+    channel_thumb = bundle.get("channel_thumb") or ""
     expire_ts = _parse_expire_ts(url)
     try:
         print(
@@ -684,12 +1515,12 @@ def extract_audio_info(video_url: str, *, prefer_compat: bool = False) -> Dict[s
 
     return {
         "audio_url": url,
-        "thumb": thumb,
+        "thumb": bundle.get("thumb") or "",
         "title": title,
         "channel": channel,
         "view_count": view_count,
         "channel_thumb": channel_thumb,
-        "related_videos": related_videos,
+        "related_videos": bundle.get("related_videos") or [],
         "expire_ts": expire_ts,
         "http_headers": headers,
         "format_id": selected_format_id,
@@ -707,42 +1538,19 @@ def extract_video_info(video_url: str) -> Dict[str, Any]:
         'http_headers': Dict[str, str],   # заголовки для setDataSource
         'thumb': str,                     # мініатюра
       }
-    Пріоритет: muxed MP4 → HLS m3u8 → будь-який відеопотік.
+    Пріоритет: HLS m3u8 → muxed MP4 → будь-який відеопотік.
+    Екстракція спільна з аудіо (див. extract_video_bundle).
     """
-    BASE_OPTS = {
-        "quiet": True,
-        "skip_download": True,
-        "noplaylist": True,
-        "nocheckcertificate": True,
-        "logger": YDLLogger(),
-        # ВАЖЛИВО: тут формат тільки для внутрішньої логіки yt-dlp,
-        # але ми все одно будемо добирати формат самі через formats.
-        "format": (
-            "bestvideo[height<=720][vcodec!*='none'][protocol^=m3u8]+bestaudio/best[ext=mp4][height<=720]/"
-            "best[protocol^=m3u8][height<=720]"
-        ),
-        "http_headers": {
-            "User-Agent": _ANDROID_YT_UA,
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://www.youtube.com",
-            "Connection": "keep-alive",
-        },
-        "extractor_retries": 2,
-        "ignoreerrors": "only_download",
-    }
-
-    # Web-client на Android часто тягне EJS/PO-token шлях і може запускати
-    # зовнішні subprocess runtime. За замовчуванням тримаємось android client.
-    allow_web_client = _env_bool("YTDLP_ALLOW_WEB_CLIENT", False)
-    clients = ("android", "web") if allow_web_client else ("android",)
-    info, err = _extract_info_with_clients(video_url, BASE_OPTS, clients)
-    if not info:
+    try:
+        bundle = extract_video_bundle(video_url)
+    except Exception as err:
         print(f"[VIDEO] extract failed: {repr(err)}")
         return {"video_url": None, "http_headers": {}, "thumb": ""}
 
-    url = info.get("url") or ""
+    info = bundle["info"]
     fmts = info.get("formats") or []
-    headers = _best_effort_headers(info.get("http_headers"), BASE_OPTS["http_headers"])
+    url = ""
+    headers = _best_effort_headers(info.get("http_headers"), _YT_HTTP_HEADERS)
 
     def _looks_playable(u: str) -> bool:
         return (
@@ -751,12 +1559,13 @@ def extract_video_info(video_url: str) -> Dict[str, Any]:
             or u.endswith(".mp4")
         )
 
-    # Якщо головний url пустий або дивний - шукаємо самі
-    if not url or not _looks_playable(url):
-        chosen = _pick_best_video(fmts)
-        if chosen and chosen.get("url"):
-            url = chosen["url"]
-            headers = _best_effort_headers(chosen.get("http_headers"), BASE_OPTS["http_headers"])
+    # info['url'] у спільній екстракції - аудіо, тому відео добираємо самі
+    chosen = _pick_best_video(fmts)
+    if chosen and chosen.get("url"):
+        url = chosen["url"]
+        headers = _best_effort_headers(chosen.get("http_headers"), _YT_HTTP_HEADERS)
+    elif str(info.get("vcodec") or "none") != "none":
+        url = info.get("url") or ""
 
     # Якщо навіть так немає відео - значить YouTube реально віддав тільки images
     if not url or not _looks_playable(url):
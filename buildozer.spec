@@ -15,7 +15,7 @@ version = 1.0
 # The current UI still uses KivyMD 1.2 APIs such as OneLineListItem,
 # MDRaisedButton and MDRoundFlatButton. KivyMD 2.x removed/reworked those APIs,
 # so keep the Android package on the compatible 1.2 release until the UI is migrated.
-requirements = python3, kivy, kivymd==1.2.0, pillow, ffpyplayer, yt_dlp>=2025.10.0, pycryptodome, httpx, beautifulsoup4, urllib3, charset-normalizer, certifi, idna, httpcore, cryptography, h11, requests, typing_extensions, pyjnius, ffpyplayer_codecs, filetype
+requirements = python3, sqlite3, kivy, kivymd==1.2.0, pillow, ffpyplayer, yt_dlp>=2025.10.0, pycryptodome, httpx, beautifulsoup4, urllib3, charset-normalizer, certifi, idna, httpcore, h2, hpack, hyperframe, cryptography, h11, requests, typing_extensions, pyjnius, ffpyplayer_codecs, filetype
 
 
 orientation = portrait
@@ -0,0 +1,170 @@
+"""Benchmark: the old regex/brace-scan ytInitialData lookups vs :mod:`yt_json`.
+
+Not collected by pytest; run it directly from the repo root::
+
+    python tests/bench_yt_json.py [--items 2000] [--chunk-kb 16] [--repeat 7]
+
+A watch/search-like page is generated: a few ``ytcfg.set(...)`` calls, a
+``var ytInitialData = {...};`` script with ``--items`` video renderers
+(~440 bytes each, the default gives the ~850 KB blob of a real results page)
+and trailing scripts/markup after it.  Every path must return the same objects
+before timings are printed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "android_src"))
+
+import yt_json  # noqa: E402
+
+
+def _video(index: int) -> dict:
+    video_id = f"v{index:010d}"
+    return {
+        "videoRenderer": {
+            "videoId": video_id,
+            "thumbnail": {"thumbnails": [
+                {"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg?sqp=-oaymwE", "width": 480, "height": 360},
+            ]},
+            "title": {"runs": [{"text": f"Track {index} \"live\" {{remix}} </b>"}]},
+            "ownerText": {"runs": [{"text": f"Channel {index % 97}", "navigationEndpoint": {
+                "browseEndpoint": {"browseId": f"UC{index % 97:022d}"},
+            }}]},
+            "lengthText": {"simpleText": f"{index % 9}:{index % 60:02d}"},
+            "viewCountText": {"simpleText": f"{index * 37:,} views"},
+        }
+    }
+
+
+def build_page(items: int) -> str:
+    initial = {
+        "responseContext": {"visitorData": "CgtzdHViVmlzaXRvcg%3D%3D"},
+        "contents": {"twoColumnSearchResultsRenderer": {"primaryContents": {"sectionListRenderer": {
+            "contents": [{"itemSectionRenderer": {"contents": [_video(i) for i in range(items)]}}],
+        }}}},
+    }
+    ytcfg = {
+        "INNERTUBE_API_KEY": "AIzaSyStubKey",
+        "INNERTUBE_CONTEXT": {"client": {"clientName": "WEB", "clientVersion": "2.20261001.00.00", "hl": "uk"}},
+        "VISITOR_DATA": "CgtzdHViVmlzaXRvcg%3D%3D",
+    }
+    # YouTube escapes "<" inside inline JSON.
+    blob = json.dumps(initial, separators=(",", ":")).replace("<", "\\u003c")
+    filler = "".join(f'<link rel="preload" href="/s/_/asset{i}.js" as="script">' for i in range(400))
+    trailing = "".join(f"<script>window.ytAct{i}=function(a){{return a+{i};}};</script>" for i in range(3000))
+    return (
+        "<!DOCTYPE html><html><head>" + filler
+        + '<script>ytcfg.set("EXPERIMENT_FLAGS", {"a": true});'
+        + "ytcfg.set(" + json.dumps(ytcfg) + ");</script></head><body>"
+        + '<script nonce="x">var ytInitialData = ' + blob + ";</script>"
+        + trailing + "</body></html>"
+    )
+
+
+# --- old paths (as they were before yt_json) ---
+
+def regex_lookup(text: str):
+    # youtube_search: non-greedy regexes over the whole page
+    data = json.loads(re.search(r"var ytInitialData = ({.*?});", text).group(1))
+    cfg = json.loads(re.search(r"ytcfg\.set\((\{.*?\})\);", text, re.S).group(1))
+    return data, cfg
+
+
+def _brace_scan(text: str, marker: str):
+    # ytdlp_helpers._json_after_marker / related_videos._json_after
+    pos = text.find(marker)
+    if pos < 0:
+        return None
+    start = text.find("{", pos)
+    depth = 0
+    in_str = False
+    esc = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return json.loads(text[start:i + 1])
+    return None
+
+
+def brace_lookup(text: str):
+    return _brace_scan(text, "var ytInitialData ="), _brace_scan(text, "ytcfg.set({")
+
+
+# --- yt_json ---
+
+def yt_json_lookup(text: str):
+    return (
+        yt_json.json_after_any(text, yt_json.INITIAL_DATA_MARKERS),
+        yt_json.json_after_any(text, yt_json.YTCFG_MARKERS),
+    )
+
+
+def stream_lookup(chunks):
+    found, _ = yt_json.scan_stream(
+        iter(chunks), {"initial": yt_json.INITIAL_DATA_MARKERS, "ytcfg": yt_json.YTCFG_MARKERS},
+    )
+    return found.get("initial"), found.get("ytcfg")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--chunk-kb", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    page = build_page(args.items)
+    raw = page.encode("utf-8")
+    size = args.chunk_kb * 1024
+    chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+    blob = len(page[page.index("var ytInitialData"):page.index(";</script>", page.index("var ytInitialData"))])
+
+    pulled = []
+
+    def counted():
+        for chunk in chunks:
+            pulled.append(chunk)
+            yield chunk
+
+    expected = yt_json_lookup(page)
+    assert expected[0] and expected[1], "generated page has no ytInitialData/ytcfg"
+    assert regex_lookup(page) == expected
+    assert brace_lookup(page) == expected
+    assert stream_lookup(counted()) == expected
+
+    print(f"page {len(raw) / 1024:.0f} KB, ytInitialData {blob / 1024:.0f} KB, "
+          f"{len(chunks)} chunks of {args.chunk_kb} KB; stream stops after {len(pulled)}")
+    cases = (
+        ("regex ({.*?}); + json.loads", lambda: regex_lookup(page)),
+        ("brace scan + json.loads", lambda: brace_lookup(page)),
+        ("yt_json.json_after_any", lambda: yt_json_lookup(page)),
+        ("yt_json.scan_stream", lambda: stream_lookup(chunks)),
+    )
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"  {name:<30} {best * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+# The app modules are flat files in android_src, imported by name.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "android_src"))
+
+
+@pytest.fixture
+def http_stub():
+    """Start a local HTTP server; ``http_stub(handle)`` returns its base URL.
+
+    ``handle(request)`` receives the ``BaseHTTPRequestHandler`` and writes the
+    whole response itself.
+    """
+    servers = []
+
+    def start(handle):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                handle(self)
+
+            do_POST = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,59 @@
+import ytdlp_helpers as ydlh
+
+URL = "https://www.youtube.com/watch?v=commentVid1"
+
+
+def _opts():
+    opts = ydlh._client_opts(ydlh._bundle_opts(), "android")
+    opts["logger"] = None
+    return opts
+
+
+def _fake_youtube(monkeypatch, calls):
+    """Youtube extractor that hands extract_comments its ytcfg/initial data, like the real one."""
+    from yt_dlp.extractor.youtube import YoutubeIE
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        info = {"id": video_id, "title": "t", "url": "https://example.invalid/a.webm", "ext": "webm"}
+        info["__post_extractor"] = self.extract_comments({"ytcfg": 1}, video_id, ["contents"], "<html>")
+        return info
+
+    def _get_comments(self, ytcfg, video_id, contents, webpage):
+        calls.append((ytcfg, video_id, contents))
+        yield {"id": "c1", "text": "hello"}
+
+    monkeypatch.setattr(YoutubeIE, "_real_extract", _real_extract)
+    monkeypatch.setattr(YoutubeIE, "_get_comments", _get_comments)
+
+
+def test_comments_rerun_from_kept_inputs_on_pooled_instance(monkeypatch):
+    calls = []
+    _fake_youtube(monkeypatch, calls)
+    opts = _opts()
+    info = ydlh._run_client_extraction(URL, opts, defer_post_extract=True)
+
+    assert calls == [] and "__post_extractor" not in info
+    # The extraction instance is back in the pool with its own extract_comments.
+    with ydlh.borrow_ydl(opts) as ydl:
+        ie = ydl.get_info_extractor("Youtube")
+        assert "extract_comments" not in vars(ie)
+
+    post = info["_pymusic_post_extract"]
+    result = post()
+    assert result["comments"] == [{"id": "c1", "text": "hello"}]
+    assert calls == [({"ytcfg": 1}, "commentVid1", ["contents"])]
+    assert post() is result and len(calls) == 1
+
+
+def test_closed_deferred_comments_do_nothing(monkeypatch):
+    calls = []
+    _fake_youtube(monkeypatch, calls)
+    info = ydlh._run_client_extraction(URL, _opts(), defer_post_extract=True)
+    ydlh._discard_info(info)
+    assert info["_pymusic_post_extract"]() == {}
+    assert calls == []
+
+
+def test_bundle_opts_keep_tls_verification():
+    assert not ydlh._bundle_opts().get("nocheckcertificate")
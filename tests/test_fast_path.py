@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+import ytdlp_helpers as ydlh
+
+OK_ID = "okVideo0001"
+UNPLAYABLE_ID = "unplayable1"
+CIPHER_ID = "cipherOnly1"
+AUDIO_URL = "https://rr1---sn-stub.googlevideo.com/videoplayback?expire=4102444800&itag=251&id=ok"
+
+
+def _player_response(video_id):
+    if video_id == UNPLAYABLE_ID:
+        return {"playabilityStatus": {"status": "UNPLAYABLE", "reason": "Video unavailable"}}
+    audio = {
+        "itag": 251,
+        "mimeType": 'audio/webm; codecs="opus"',
+        "bitrate": 135000,
+        "averageBitrate": 128000,
+        "contentLength": "3456789",
+    }
+    if video_id == CIPHER_ID:
+        audio["signatureCipher"] = "s=AOq0QJ8w&sp=sig&url=https%3A%2F%2Frr1---sn-stub.googlevideo.com%2Fvideoplayback"
+    else:
+        audio["url"] = AUDIO_URL
+    return {
+        "playabilityStatus": {"status": "OK"},
+        "streamingData": {"expiresInSeconds": "21540", "adaptiveFormats": [audio]},
+        "videoDetails": {
+            "videoId": video_id,
+            "title": "Stub title",
+            "author": "Stub channel",
+            "channelId": "UCstub",
+            "viewCount": "42",
+            "thumbnail": {"thumbnails": [{"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}]},
+        },
+    }
+
+
+@pytest.fixture
+def player_stub(http_stub, monkeypatch):
+    """YTDLP_FAST_HOST pointed at a stub youtubei/v1/player; returns requested IDs."""
+    requested = []
+
+    def handle(request):
+        length = int(request.headers.get("Content-Length") or 0)
+        video_id = json.loads(request.rfile.read(length) or b"{}").get("videoId", "")
+        requested.append(video_id)
+        body = json.dumps(_player_response(video_id)).encode("utf-8")
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    monkeypatch.setenv("YTDLP_FAST_HOST", http_stub(handle))
+    monkeypatch.delenv("YTDLP_FAST_CLIENTS", raising=False)
+    monkeypatch.setenv("YTDLP_FAST_PLAYER", "1")
+    monkeypatch.setattr(ydlh, "_FAST_SERVED", {})
+    monkeypatch.setattr(ydlh, "_FAST_BLOCKED", {})
+    monkeypatch.setattr(ydlh, "_FAST_STATE", {"rejects": 0, "disabled_until": 0.0, "profile": None})
+    if not ydlh._fast_client_profile():
+        pytest.skip("installed yt-dlp has no client without JS player/PO token")
+    return requested
+
+
+def _watch(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def test_ok_response_is_served_directly(player_stub, monkeypatch):
+    monkeypatch.setattr(ydlh, "_extract_audio_info_bundle", pytest.fail)
+    info = ydlh.extract_audio_info(_watch(OK_ID))
+    assert info["audio_url"] == AUDIO_URL
+    assert info["title"] == "Stub title" and info["channel"] == "Stub channel"
+    assert player_stub == [OK_ID]
+
+
+@pytest.mark.parametrize("video_id", [UNPLAYABLE_ID, CIPHER_ID])
+def test_unplayable_and_cipher_only_fall_back_to_ytdlp(player_stub, monkeypatch, video_id):
+    fallback = []
+    monkeypatch.setattr(
+        ydlh, "_extract_audio_info_bundle",
+        lambda url, vid, prefer_compat: fallback.append(vid) or {"audio_url": "from-ytdlp"},
+    )
+    assert ydlh._fast_audio_info(_watch(video_id)) is None
+    assert ydlh.extract_audio_info(_watch(video_id)) == {"audio_url": "from-ytdlp"}
+    assert fallback == [video_id]
+    assert player_stub == [video_id, video_id]
+
+
+def test_rejections_block_the_video_then_disable_the_fast_path(player_stub):
+    url = _watch(OK_ID)
+    served = ydlh._fast_audio_info(url)["audio_url"]
+
+    # Connectivity loss and URLs the fast path did not serve are not counted.
+    assert not ydlh.report_fast_path_rejected(url, served, 0)
+    assert not ydlh.report_fast_path_rejected(url, served + "&other", 403)
+    assert ydlh._FAST_STATE["rejects"] == 0
+
+    assert ydlh.report_fast_path_rejected(url, served, 403)
+    assert not ydlh._fast_path_allowed(OK_ID)
+    assert ydlh._fast_audio_info(url) is None
+    assert player_stub == [OK_ID]
+
+    for video_id in ("okVideo0002", "okVideo0003"):
+        served = ydlh._fast_audio_info(_watch(video_id))["audio_url"]
+        assert ydlh.report_fast_path_rejected(_watch(video_id), served, 410)
+    assert ydlh._FAST_STATE["disabled_until"] > 0
+    assert ydlh._fast_audio_info(_watch("okVideo0004")) is None
+    assert "okVideo0004" not in player_stub
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import search_suggest
+
+FIREFOX_PAYLOAD = '["lofi",["lofi hip hop","lofi girl","lofi beats to study"]]'
+JSONP_PAYLOAD = (
+    'window.google.ac.h(["lofi",[["lofi hip hop",0,[512,433]],["lofi girl",0,[512]],'
+    '[" ",0]],{"k":1,"q":"8Xq2cYp3"}])'
+)
+
+
+@pytest.fixture
+def suggest_server(http_stub, monkeypatch):
+    """Stub suggest endpoint; queries starting with "slow" stall mid-body."""
+    seen = []
+    started = threading.Event()
+
+    def handle(request):
+        query = parse_qs(urlparse(request.path).query).get("q", [""])[0]
+        seen.append(query)
+        body = json.dumps([query, [f"{query} one", f"{query} two"]]).encode("utf-8")
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        if query.startswith("slow"):
+            request.wfile.write(body[:4])
+            request.wfile.flush()
+            started.set()
+            time.sleep(0.6)
+            body = body[4:]
+        try:
+            request.wfile.write(body)
+        except OSError:
+            pass
+
+    monkeypatch.setenv("PYMUSIC_SUGGEST_URL", http_stub(handle) + "/complete/search")
+    with search_suggest._LOCK:
+        search_suggest._CACHE.clear()
+    return seen, started
+
+
+def _debouncer(delay, results):
+    def schedule(seconds, fn):
+        timer = threading.Timer(seconds, fn)
+        timer.start()
+        return timer
+
+    return search_suggest.SuggestDebouncer(
+        delay, results.append, schedule=schedule, deliver=lambda fn: fn(),
+    )
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_parse_firefox_and_jsonp_payloads():
+    assert search_suggest._parse(FIREFOX_PAYLOAD) == ["lofi hip hop", "lofi girl", "lofi beats to study"]
+    assert search_suggest._parse(JSONP_PAYLOAD) == ["lofi hip hop", "lofi girl"]
+    assert search_suggest._parse("<html>rate limited</html>") == []
+
+
+def test_history_matches_word_starts_by_recency():
+    search_suggest.rebuild_history_index(
+        ["Daft Punk Around", "around the world", "Punk Rock", "daft punk", ""]
+    )
+    assert search_suggest.history_matches("punk") == ["Daft Punk Around", "Punk Rock", "daft punk"]
+    assert search_suggest.history_matches("AROUND") == ["Daft Punk Around", "around the world"]
+    assert search_suggest.history_matches("unk") == []
+    assert search_suggest.history_matches("da", limit=1) == ["Daft Punk Around"]
+    assert search_suggest.history_matches("   ") == []
+
+
+def test_fetch_is_cached_per_normalized_prefix(suggest_server):
+    seen, _started = suggest_server
+    assert search_suggest.fetch_suggestions("Abba") == ["Abba one", "Abba two"]
+    assert search_suggest.fetch_suggestions("  abba ") == ["Abba one", "Abba two"]
+    assert search_suggest.cached_suggestions("ABBA") == ["Abba one", "Abba two"]
+    assert seen == ["Abba"]
+    search_suggest.fetch_suggestions("abbey")
+    assert seen == ["Abba", "abbey"]
+
+
+def test_debounce_requests_only_the_last_prefix(suggest_server):
+    seen, _started = suggest_server
+    results = []
+    debouncer = _debouncer(0.15, results)
+    for prefix in ("q", "qu", "que", "quee", "queen"):
+        debouncer.submit(prefix)
+        time.sleep(0.02)
+    assert _wait_for(lambda: results)
+    time.sleep(0.2)
+    assert seen == ["queen"]
+    assert results == [["queen one", "queen two"]]
+
+
+def test_superseded_request_is_abandoned(suggest_server):
+    seen, started = suggest_server
+    results = []
+    debouncer = _debouncer(0.0, results)
+    debouncer.submit("slow song")
+    assert started.wait(2.0)
+    debouncer.submit("fast song")
+    assert _wait_for(lambda: results)
+    time.sleep(0.8)
+    assert results == [["fast song one", "fast song two"]]
+    assert seen == ["slow song", "fast song"]
+    # The abandoned answer is not cached either.
+    assert search_suggest.cached_suggestions("slow song") is None
+
+
+def test_cancel_drops_pending_request(suggest_server):
+    seen, _started = suggest_server
+    results = []
+    debouncer = _debouncer(0.1, results)
+    debouncer.submit("nothing")
+    debouncer.cancel()
+    time.sleep(0.3)
+    assert seen == [] and results == []
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+import stream_cache
+
+URL = "https://www.youtube.com/watch?v=dropMe00001"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(stream_cache, "STREAM_CACHE_PATH", str(tmp_path / "stream_cache.json"))
+    monkeypatch.setattr(stream_cache, "_ENTRIES", None)
+    monkeypatch.setattr(stream_cache, "_REVALIDATORS", {})
+    revalidated = []
+    stream_cache.register_revalidator("audio", revalidated.append)
+    # Inside the revalidation window: any get_stream() would schedule a refresh.
+    expire_ts = int(time.time()) + 10 * 60
+    stream_cache.put_stream(URL, "audio", {"audio_url": "https://a", "expire_ts": expire_ts})
+    return stream_cache.StreamUrlCache("audio"), revalidated
+
+
+def test_pop_returns_entry_without_revalidating(cache):
+    urls, revalidated = cache
+    assert urls.pop(URL)["audio_url"] == "https://a"
+    assert urls.pop(URL, None) is None
+    with pytest.raises(KeyError):
+        urls.pop(URL)
+    assert stream_cache.expires_in(URL) is None
+    time.sleep(0.05)
+    assert revalidated == []
+
+
+def test_del_drops_entry_without_revalidating(cache):
+    urls, revalidated = cache
+    del urls[URL]
+    with pytest.raises(KeyError):
+        del urls[URL]
+    time.sleep(0.05)
+    assert revalidated == []
+    # Control: a read in the same window does revalidate.
+    urls[URL] = {"audio_url": "https://b", "expire_ts": int(time.time()) + 10 * 60}
+    assert urls[URL]["audio_url"] == "https://b"
+    deadline = time.monotonic() + 2
+    while not revalidated and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert revalidated == [URL]
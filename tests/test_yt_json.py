@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+import yt_json
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.fixture(scope="module")
+def watch_page():
+    with open(os.path.join(FIXTURES, "watch_page.html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _chunks(text, size, consumed=None):
+    data = text.encode("utf-8")
+    for pos in range(0, len(data), size):
+        if consumed is not None:
+            consumed.append(pos + size)
+        yield data[pos:pos + size]
+
+
+def test_ytcfg_skips_calls_without_an_object(watch_page):
+    cfg = yt_json.json_after(watch_page, "ytcfg.set(")
+    assert cfg["INNERTUBE_API_KEY"] == "AIzaFixtureKey"
+    assert cfg["INNERTUBE_CONTEXT"]["client"]["clientName"] == "WEB"
+    assert cfg["NOTE"] == "braces } { inside a string"
+
+
+def test_initial_data_any_marker(watch_page):
+    data = yt_json.json_after_any(watch_page, yt_json.INITIAL_DATA_MARKERS)
+    results = data["contents"]["twoColumnWatchNextResults"]["secondaryResults"]["secondaryResults"]["results"]
+    assert results[0]["compactVideoRenderer"]["videoId"] == "dQw4w9WgXcQ"
+
+
+def test_object_must_follow_marker():
+    assert yt_json.json_after('ytcfg.set("A", 1); var x = {"wrong": 1};', "ytcfg.set(") is None
+    assert yt_json.json_after('ytcfg.set(\n  {"ok": true})', "ytcfg.set(") == {"ok": True}
+
+
+def test_undecodable_occurrence_falls_through():
+    text = 'ytcfg.set({broken); ytcfg.set({"ok": 1});'
+    assert yt_json.json_after(text, "ytcfg.set(") == {"ok": 1}
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 65, 4096])
+def test_scan_stream_finds_both_objects(watch_page, size):
+    found, _text = yt_json.scan_stream(
+        _chunks(watch_page, size),
+        {"ytcfg": yt_json.YTCFG_MARKERS, "initial": yt_json.INITIAL_DATA_MARKERS},
+    )
+    assert found["ytcfg"]["INNERTUBE_API_KEY"] == "AIzaFixtureKey"
+    assert "twoColumnWatchNextResults" in found["initial"]["contents"]
+
+
+def test_scan_stream_stops_after_last_object(watch_page):
+    consumed = []
+    found, text = yt_json.scan_stream(
+        _chunks(watch_page, 32, consumed),
+        {"ytcfg": yt_json.YTCFG_MARKERS, "initial": yt_json.INITIAL_DATA_MARKERS},
+    )
+    assert set(found) == {"ytcfg", "initial"}
+    assert "footer" not in text
+    assert consumed[-1] < len(watch_page.encode("utf-8"))
+
+
+def test_scan_stream_missing_object_and_max_bytes(watch_page):
+    found, _text = yt_json.scan_stream(
+        _chunks(watch_page, 16),
+        {"ytcfg": yt_json.YTCFG_MARKERS, "player": ("var ytPlayerConfig =",)},
+    )
+    assert "ytcfg" in found and "player" not in found
+
+    found, text = yt_json.scan_stream(
+        _chunks(watch_page, 16),
+        {"initial": yt_json.INITIAL_DATA_MARKERS},
+        max_bytes=64,
+    )
+    assert found == {} and len(text) == 64
+
+
+def test_scan_stream_skips_undecodable_occurrence():
+    page = '<script>ytcfg.set({broken);</script>' + "x" * 5000 + '<script>ytcfg.set({"ok": 1});</script>'
+    found, text = yt_json.scan_stream(_chunks(page, 100), {"ytcfg": yt_json.YTCFG_MARKERS})
+    assert found == {"ytcfg": {"ok": 1}}
+    assert text == page
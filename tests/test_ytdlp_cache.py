@@ -0,0 +1,59 @@
+import pytest
+from yt_dlp import YoutubeDL
+
+import ytdlp_cache
+
+FAILURE = "nsig extraction failed: Some formats may be missing"
+
+
+class _Logger:
+    def __init__(self):
+        self.lines = []
+
+    def debug(self, msg):
+        self.lines.append(msg)
+
+    warning = error = debug
+
+
+@pytest.fixture
+def invalidated(tmp_path, monkeypatch):
+    monkeypatch.setattr(ytdlp_cache, "YTDLP_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ytdlp_cache, "_INDEX", None)
+    seen = []
+    real = ytdlp_cache.invalidate_player
+    monkeypatch.setattr(
+        ytdlp_cache, "invalidate_player",
+        lambda player_id, reason="": seen.append(player_id) or real(player_id, reason),
+    )
+    return seen
+
+
+def _ydl(player_id=None):
+    ydl = ytdlp_cache.install(YoutubeDL({"logger": _Logger(), "quiet": True}))
+    if player_id:
+        ydl.cache.store("youtube-sigfuncs", f"{player_id}-sig", {"f": 1})
+    return ydl
+
+
+def test_failure_invalidates_the_emitting_instances_player(invalidated):
+    first, second = _ydl("aaaaaaaa"), _ydl("bbbbbbbb")
+    first.report_warning(FAILURE)
+    assert invalidated == ["aaaaaaaa"]
+    assert ytdlp_cache.last_player_id(second) == "bbbbbbbb"
+    # The wrapped logger still receives the line.
+    assert any(FAILURE in line for line in first.params["logger"]._logger.lines)
+
+
+def test_failure_without_known_player_is_skipped(invalidated):
+    _ydl("aaaaaaaa")
+    fresh = _ydl()
+    fresh.report_warning(FAILURE)
+    assert not ytdlp_cache.note_log_message(FAILURE)
+    assert invalidated == []
+
+
+def test_player_id_in_message_wins(invalidated):
+    ydl = _ydl("aaaaaaaa")
+    ydl.report_warning(f"{FAILURE} /s/player/cccccccc/player_ias.vflset/en_US/base.js")
+    assert invalidated == ["cccccccc"]